@@ -0,0 +1,294 @@
+"""
+Higher-timeframe candles derived from closed 1m candles.
+
+Instead of one `@kline_<interval>` stream per catalog interval, the collectors
+subscribe to `@kline_1m` only and build 3m/5m/15m/30m/1h/.../1w in memory.
+A derived candle is emitted when the last 1m candle of its bucket closes (or,
+if that one is missed, when the first 1m of the next bucket arrives) and goes
+through the same writer as exchange candles.
+
+Buckets that did not see every minute (startup mid-bucket, dropped frames)
+are never written from memory: they are held as suspect until the reconciler
+fetches the exchange candle from the REST API and writes that instead. If the
+exchange has no such candle, the hold is dropped after SUSPECT_GIVE_UP_MS and
+the gap-filling backfill owns the slot. A random sample of complete buckets is
+compared against the exchange periodically.
+
+KLINE_NATIVE_INTERVALS keeps chosen intervals on their native streams;
+KLINE_AGGREGATION_ENABLED=false restores the one-stream-per-interval layout.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+
+from data_engine.config import (
+    KLINE_AGGREGATION_ENABLED,
+    KLINE_NATIVE_INTERVALS,
+    KLINE_AGG_RECONCILE_INTERVAL_SEC,
+    KLINE_AGG_RECONCILE_SAMPLE,
+)
+from data_engine.intervals import INTERVAL_MS, align_open_time
+from data_engine.stream_catalog import stream_name, parse_stream_name
+
+MINUTE_MS = INTERVAL_MS["1m"]
+RECENT_MAX = 5_000
+SUSPECT_MAX = 50_000
+SUSPECT_GIVE_UP_MS = 15 * 60_000  # after the bucket closed
+
+# Relative tolerance for the exchange comparison (the DB stores DECIMAL(18, 8))
+PRICE_TOLERANCE = 1e-8
+VOLUME_TOLERANCE = 1e-6
+
+
+class CandleAggregator:
+    def __init__(self, source: str, enabled: bool = KLINE_AGGREGATION_ENABLED,
+                 native_intervals=KLINE_NATIVE_INTERVALS):
+        self.source = source
+        self.enabled = enabled
+        self.native_intervals = frozenset(native_intervals)
+
+        self.targets = {}     # coin_id -> tuple(derived intervals)
+        self.write_1m = set() # coins whose 1m candles are in the catalog themselves
+        self.buckets = {}     # (coin_id, interval) -> [open_ms, o, h, l, c, v, minutes]
+        self.last_1m = {}     # coin_id -> last closed 1m open_ms
+        self.recent = deque(maxlen=RECENT_MAX)  # complete derived rows (reconcile sample)
+        self.suspect = {}     # (coin_id, interval, open_ms) -> row, held buckets with missing minutes
+        self._last_plan = None
+
+        # Counters
+        self.derived = 0
+        self.incomplete = 0
+        self.unheld = 0       # incomplete buckets dropped because suspect was full (backfill fills them)
+        self.duplicates = 0
+
+    def derivable(self, interval: str) -> bool:
+        return (
+            self.enabled
+            and interval != "1m"
+            and interval in INTERVAL_MS
+            and interval not in self.native_intervals
+        )
+
+    # ---------------- subscription plan ----------------
+    def plan(self, catalog_streams: set) -> set:
+        """Catalog streams -> streams to subscribe; remembers which intervals to derive per coin."""
+        subscription = set()
+        targets = {}
+        write_1m = set()
+        for s in catalog_streams:
+            parsed = parse_stream_name(s)
+            if parsed is None:
+                subscription.add(s)
+                continue
+            symbol, interval = parsed
+            if self.derivable(interval):
+                targets.setdefault(symbol, set()).add(interval)
+                subscription.add(stream_name(symbol, "1m"))
+            else:
+                subscription.add(s)
+                if interval == "1m":
+                    write_1m.add(symbol)
+
+        self.targets = {coin: tuple(sorted(ivs, key=INTERVAL_MS.get)) for coin, ivs in targets.items()}
+        self.write_1m = write_1m
+        for key in [k for k in self.buckets if k[1] not in self.targets.get(k[0], ())]:
+            del self.buckets[key]
+
+        summary = (len(catalog_streams), len(subscription))
+        if self.enabled and summary != self._last_plan and len(subscription) != len(catalog_streams):
+            print(f"📉 {self.source}: {len(catalog_streams)} katalog stream -> {len(subscription)} abonelik "
+                  f"({len(self.targets)} coin için üst intervaller 1m'den türetiliyor)")
+        self._last_plan = summary
+        return subscription
+
+    # ---------------- candle path ----------------
+    def route(self, row):
+        """
+        row: closed (coin_id, interval, open_ms, o, h, l, c, v) from the socket.
+        Returns the rows to write: the row itself if it is a catalog stream plus any derived candles.
+        """
+        coin_id, interval = row[0], row[1]
+        if interval != "1m":
+            return [row]
+        out = [row] if coin_id in self.write_1m else []
+        if coin_id in self.targets:
+            out.extend(self.on_1m(row))
+        return out
+
+    def on_1m(self, row):
+        coin_id, _, open_ms, o, h, l, c, v = row
+        last = self.last_1m.get(coin_id)
+        if last is not None and open_ms <= last:
+            self.duplicates += 1
+            return []
+        self.last_1m[coin_id] = open_ms
+
+        out = []
+        for interval in self.targets.get(coin_id, ()):
+            step = INTERVAL_MS[interval]
+            bucket_open = align_open_time(open_ms, interval)
+            key = (coin_id, interval)
+            b = self.buckets.get(key)
+            if b is not None and b[0] != bucket_open:
+                # The last minute of the previous bucket never arrived
+                self._emit(coin_id, interval, b, out)
+                b = None
+            if b is None:
+                b = self.buckets[key] = [bucket_open, o, h, l, c, v, 1]
+            else:
+                b[2] = max(b[2], h)
+                b[3] = min(b[3], l)
+                b[4] = c
+                b[5] += v
+                b[6] += 1
+            if open_ms + MINUTE_MS == bucket_open + step:
+                self._emit(coin_id, interval, b, out)
+                del self.buckets[key]
+        return out
+
+    def _emit(self, coin_id: str, interval: str, b, out: list):
+        """Complete buckets go to `out`; incomplete ones are held for the reconciler instead."""
+        row = (coin_id, interval, b[0], b[1], b[2], b[3], b[4], b[5])
+        if b[6] * MINUTE_MS < INTERVAL_MS[interval]:
+            self.incomplete += 1
+            if len(self.suspect) < SUSPECT_MAX:
+                self.suspect[(coin_id, interval, b[0])] = row
+            else:
+                self.unheld += 1
+            return
+        self.derived += 1
+        self.recent.append(row)
+        out.append(row)
+
+    def stats(self) -> dict:
+        return {
+            "coins": len(self.targets),
+            "open_buckets": len(self.buckets),
+            "derived": self.derived,
+            "incomplete": self.incomplete,
+            "suspect": len(self.suspect),
+            "unheld": self.unheld,
+            "duplicates": self.duplicates,
+        }
+
+
+# source -> aggregator (shared by the collectors and the reconciler)
+aggregators = {
+    "spot": CandleAggregator("spot"),
+    "futures": CandleAggregator("futures"),
+}
+
+
+def _differs(ours, theirs) -> bool:
+    for i in range(3, 7):
+        if abs(ours[i] - theirs[i]) > PRICE_TOLERANCE * max(abs(theirs[i]), 1.0):
+            return True
+    return abs(ours[7] - theirs[7]) > VOLUME_TOLERANCE * max(abs(theirs[7]), 1.0)
+
+
+class AggregateReconciler:
+    """
+    Writes the exchange candle for held (incomplete) buckets, and compares a sample
+    of written derived candles with the exchange's, rewriting mismatches.
+    """
+
+    def __init__(self, fetchers: dict, sample: int = KLINE_AGG_RECONCILE_SAMPLE):
+        self.fetchers = fetchers
+        self.sample = sample
+
+        # Counters
+        self.checked = 0
+        self.repaired = 0
+        self.mismatched = 0
+        self.abandoned = 0
+
+    async def reconcile(self, market: str, rows, now_ms: int) -> int:
+        from data_engine.backfill import klines_to_rows
+        from data_engine.queue_manager import data_queue
+
+        fetcher = self.fetchers[market]
+        suspect = aggregators[market].suspect
+        by_pair = {}
+        for row in rows:
+            by_pair.setdefault((row[0], row[1]), []).append(row)
+
+        async def check(pair, ours):
+            symbol, interval = pair
+            klines, failed = await fetcher.fetch_range(
+                symbol, interval, min(r[2] for r in ours), max(r[2] for r in ours)
+            )
+            exchange = {r[2]: r for r in klines_to_rows(symbol, interval, klines, now_ms)}
+            fixed = 0
+            for row in ours:
+                key = (symbol, interval, row[2])
+                held = key in suspect
+                theirs = exchange.get(row[2])
+                if theirs is None:
+                    # Not closed / not listed yet: keep holding, up to SUSPECT_GIVE_UP_MS
+                    if held and not failed and now_ms - (row[2] + INTERVAL_MS[interval]) > SUSPECT_GIVE_UP_MS:
+                        suspect.pop(key, None)
+                        self.abandoned += 1
+                    continue
+                self.checked += 1
+                if held:
+                    # Never written from memory: the exchange candle is the first write
+                    if data_queue.offer((market, *theirs)):
+                        suspect.pop(key, None)
+                        fixed += 1
+                elif _differs(row, theirs):
+                    self.mismatched += 1
+                    if data_queue.offer((market, *theirs)):
+                        fixed += 1
+            return fixed
+
+        results = await asyncio.gather(*(check(p, r) for p, r in by_pair.items()), return_exceptions=True)
+        fixed = 0
+        for r in results:
+            if isinstance(r, Exception):
+                print(f"⚠️ Aggregate reconcile {market}: {r}")
+            else:
+                fixed += r
+        self.repaired += fixed
+        return fixed
+
+    async def run_forever(self, poll_interval: float = 5.0,
+                          sample_interval: float = KLINE_AGG_RECONCILE_INTERVAL_SEC):
+        last_sample = time.monotonic()
+        while True:
+            try:
+                now_ms = int(time.time() * 1000)
+                sample_due = sample_interval > 0 and time.monotonic() - last_sample >= sample_interval
+                for market in self.fetchers:
+                    agg = aggregators[market]
+                    rows = list(agg.suspect.values())
+                    if sample_due and agg.recent:
+                        rows.extend(random.sample(list(agg.recent), min(self.sample, len(agg.recent))))
+                    if rows:
+                        fixed = await self.reconcile(market, rows, now_ms)
+                        if fixed or sample_due:
+                            print(f"🔎 {market} agregasyon kontrolü: {len(rows)} mum, {fixed} düzeltildi "
+                                  f"(toplam uyuşmazlık: {self.mismatched})")
+                if sample_due:
+                    last_sample = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Aggregate reconcile error: {e}")
+            await asyncio.sleep(poll_interval)
+
+
+async def run_reconciler(base_urls: dict | None = None):
+    """run_unified içinden, agregasyon açıkken çalıştırılır."""
+    import aiohttp
+    from data_engine.backfill import KlineFetcher, WeightBudget, MARKET_REST
+
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        # Small weight share; the backfill and the order engine use the same IP limit
+        fetchers = {
+            m: KlineFetcher(session, m, (base_urls or {}).get(m),
+                            budget=WeightBudget(MARKET_REST[m][1], fraction=0.1), concurrency=2)
+            for m in aggregators
+        }
+        await AggregateReconciler(fetchers).run_forever()
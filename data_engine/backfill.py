@@ -0,0 +1,419 @@
+"""
+Asenkron boşluk doldurma (backfill) servisi.
+
+- Her (market, symbol, interval) için eksik mumları DB'den tespit eder
+  (LEAD penceresi; sadece boşluk sınırları döner).
+- Eksik aralıkları REST'ten eşzamanlı, ağırlık (request weight) bütçesiyle çeker;
+  Binance'in X-MBX-USED-WEIGHT-1M başlığı ve 429/418 Retry-After dikkate alınır.
+- Sonuçları COPY + set-based upsert ile topluca yazar (canlı writer'dan ayrı staging tablosu).
+- Canlı collector'ın yanında sürekli çalışabilir (BACKFILL_ENABLED=true).
+
+Manuel çalıştırma:
+    python -m data_engine.backfill --once
+    python -m data_engine.backfill --once --spot-url http://127.0.0.1:8765/api/v3
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import timedelta
+
+import aiohttp
+
+from data_engine.config import (
+    BACKFILL_INTERVAL_SEC,
+    BACKFILL_LOOKBACK_CANDLES,
+    BACKFILL_CONCURRENCY,
+    BACKFILL_WEIGHT_FRACTION,
+    BINANCE_SPOT_REST_URL,
+    BINANCE_FUTURES_REST_URL,
+)
+from data_engine.intervals import INTERVAL_MS, to_ms, from_ms, align_open_time
+from data_engine.queue_manager import MARKET_TABLES, ensure_staging_table, upsert_klines_copy
+from data_engine.partitioning import ensure_partitions_for_rows
+from data_engine.stream_catalog import CATALOG_TABLE
+
+PAGE_LIMIT = 1000
+WRITE_CHUNK = 5000
+
+# market -> (REST base url, dakikalık exchange weight limiti)
+MARKET_REST = {
+    "spot": (BINANCE_SPOT_REST_URL, 6000),
+    "futures": (BINANCE_FUTURES_REST_URL, 2400),
+}
+
+
+def request_weight(market: str, limit: int) -> int:
+    """GET klines ağırlığı (spot sabit 2; futures limite göre)."""
+    if market == "spot":
+        return 2
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class WeightBudget:
+    """
+    Dakikalık request weight için token bucket.
+    Kapasite exchange limitinin `fraction` kadarıdır; kalan pay canlı servislere (order engine vs.) kalır.
+    """
+
+    def __init__(self, limit_per_minute: int, fraction: float = BACKFILL_WEIGHT_FRACTION):
+        self.limit = limit_per_minute
+        self.capacity = max(1, int(limit_per_minute * fraction))
+        self.rate = self.capacity / 60.0
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.used_weight = 0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, weight: int):
+        async with self._lock:  # FIFO: bekleyenler sırayla
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                await asyncio.sleep((weight - self.tokens) / self.rate)
+
+    def observe(self, used_weight: int):
+        """X-MBX-USED-WEIGHT-1M: IP'nin bu dakikadaki toplam kullanımı (diğer istemciler dahil)."""
+        self.used_weight = used_weight
+        if used_weight >= self.limit * 0.9:
+            self.pause(60 - time.time() % 60 + 0.5)  # bir sonraki dakikaya kadar dur
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+class KlineFetcher:
+    """Bir market için eşzamanlı, ağırlık bütçeli klines REST istemcisi."""
+
+    def __init__(self, session: aiohttp.ClientSession, market: str, base_url: str | None = None,
+                 budget: WeightBudget | None = None, concurrency: int = BACKFILL_CONCURRENCY,
+                 retry_limit: int = 3):
+        default_url, weight_limit = MARKET_REST[market]
+        self.session = session
+        self.market = market
+        self.url = f"{(base_url or default_url).rstrip('/')}/klines"
+        self.budget = budget or WeightBudget(weight_limit)
+        self.retry_limit = retry_limit
+        self._sem = asyncio.Semaphore(concurrency)
+
+        # Sayaçlar
+        self.requests = 0
+        self.rate_limited = 0
+        self.failed = 0
+
+    async def fetch_page(self, symbol: str, interval: str, start_ms: int, end_ms: int):
+        """[start_ms, end_ms] aralığındaki ham klines; başarısızsa None."""
+        params = {
+            "symbol": symbol,
+            "interval": interval,
+            "startTime": start_ms,
+            "endTime": end_ms,
+            "limit": PAGE_LIMIT,
+        }
+        weight = request_weight(self.market, PAGE_LIMIT)
+
+        for attempt in range(self.retry_limit):
+            await self.budget.acquire(weight)
+            async with self._sem:
+                try:
+                    async with self.session.get(self.url, params=params) as resp:
+                        used = resp.headers.get("X-MBX-USED-WEIGHT-1M")
+                        if used and used.isdigit():
+                            self.budget.observe(int(used))
+
+                        if resp.status in (418, 429):
+                            retry_after = resp.headers.get("Retry-After", "60")
+                            self.rate_limited += 1
+                            self.budget.pause(int(retry_after) if retry_after.isdigit() else 60)
+                            print(f"⏳ Backfill {self.market}: rate limit ({resp.status}), "
+                                  f"{retry_after}sn bekleniyor...")
+                            continue
+
+                        resp.raise_for_status()
+                        data = await resp.json()
+                        self.requests += 1
+                        if not isinstance(data, list):
+                            print(f"⚠️ Backfill {symbol} {interval}: geçersiz yanıt: {data}")
+                            return None
+                        return data
+
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    print(f"API Hatası ({symbol} {interval}): {e}, Deneme: {attempt + 1}/{self.retry_limit}")
+            await asyncio.sleep(2 * (attempt + 1))
+
+        self.failed += 1
+        return None
+
+    async def fetch_range(self, symbol: str, interval: str, start_ms: int, end_ms: int):
+        """
+        Aralığı PAGE_LIMIT mumluk sayfalara böler ve sayfaları eşzamanlı çeker.
+        Dönüş: (sıralı ham klines, başarısız sayfa sayısı)
+        """
+        page_span = PAGE_LIMIT * INTERVAL_MS[interval]
+        starts = range(start_ms, end_ms + 1, page_span)
+        pages = await asyncio.gather(*(
+            self.fetch_page(symbol, interval, s, min(s + page_span - 1, end_ms))
+            for s in starts
+        ))
+
+        klines = []
+        failed = 0
+        for page in pages:
+            if page is None:
+                failed += 1
+            else:
+                klines.extend(page)
+        return klines, failed
+
+
+def klines_to_rows(symbol: str, interval: str, klines, now_ms: int):
+    """Ham klines -> upsert satırları; henüz kapanmamış mum atlanır."""
+    rows = []
+    for k in klines:
+        if int(k[6]) >= now_ms:
+            continue
+        rows.append((
+            symbol, interval, int(k[0]),
+            float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5])
+        ))
+    return rows
+
+
+GAP_SQL = """
+    WITH t AS (
+        SELECT "timestamp" AS ts,
+               LEAD("timestamp") OVER (ORDER BY "timestamp") AS next_ts
+        FROM {table}
+        WHERE coin_id = $1 AND "interval" = $2 AND "timestamp" >= $3
+    )
+    SELECT ts, next_ts, (SELECT min(ts) FROM t) AS first_ts
+    FROM t
+    WHERE next_ts IS NULL OR next_ts - ts > $4
+    ORDER BY ts
+"""
+
+
+def gaps_from_rows(rows, window_start: int, last_closed: int, step: int):
+    """
+    rows: GAP_SQL çıktısı (ts, next_ts, first_ts), epoch ms'e çevrilmiş.
+    Dönüş: eksik açılış zamanı aralıkları [(start_ms, end_ms), ...] (uçlar dahil)
+    """
+    if window_start > last_closed:
+        return []
+    if not rows:
+        return [(window_start, last_closed)]
+
+    gaps = []
+    first_ts = rows[0][2]
+    if first_ts > window_start:
+        gaps.append((window_start, first_ts - step))
+    for ts, next_ts, _ in rows:
+        if next_ts is None:
+            if ts < last_closed:
+                gaps.append((ts + step, last_closed))
+        else:
+            gaps.append((ts + step, next_ts - step))
+    return gaps
+
+
+async def find_gaps(conn, table: str, symbol: str, interval: str, window_start: int, last_closed: int):
+    step = INTERVAL_MS[interval]
+    records = await conn.fetch(
+        GAP_SQL.format(table=table),
+        symbol, interval, from_ms(window_start), timedelta(milliseconds=step),
+    )
+    rows = [
+        (to_ms(r["ts"]), to_ms(r["next_ts"]) if r["next_ts"] is not None else None, to_ms(r["first_ts"]))
+        for r in records
+    ]
+    return gaps_from_rows(rows, window_start, last_closed, step)
+
+
+class BackfillService:
+    """Katalogdaki tüm streamler için periyodik boşluk tespiti + doldurma."""
+
+    def __init__(self, pool, session: aiohttp.ClientSession, markets=("spot", "futures"),
+                 lookback_candles: int = BACKFILL_LOOKBACK_CANDLES,
+                 concurrency: int = BACKFILL_CONCURRENCY, base_urls: dict | None = None):
+        self.pool = pool
+        self.lookback_candles = lookback_candles
+        self.fetchers = {
+            m: KlineFetcher(session, m, (base_urls or {}).get(m), concurrency=concurrency)
+            for m in markets
+        }
+        self._pair_sem = asyncio.Semaphore(concurrency)
+
+        # Exchange'de hiç olmayan aralıklar (listeleme öncesi, bakım boşlukları) her turda tekrar çekilmesin
+        self._listed_from = {}   # (market, symbol, interval) -> ilk mevcut açılış ms
+        self._unavailable = {}   # (market, symbol, interval) -> {(start_ms, end_ms), ...}
+        self._staging_ready = set()
+
+    @staticmethod
+    def staging_table(candle_table: str) -> str:
+        return f"{candle_table}_backfill_staging"
+
+    async def load_pairs(self):
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                f"""
+                SELECT market, symbol, "interval"
+                FROM {CATALOG_TABLE}
+                WHERE enabled AND market = ANY($1::varchar[])
+                ORDER BY market, symbol, "interval"
+                """,
+                list(self.fetchers),
+            )
+        return [(r["market"], r["symbol"], r["interval"]) for r in rows if r["interval"] in INTERVAL_MS]
+
+    async def write_rows(self, market: str, rows) -> int:
+        candle_table, last_price_table, _ = MARKET_TABLES[market]
+        staging = self.staging_table(candle_table)
+        async with self.pool.acquire() as conn:
+            if staging not in self._staging_ready:
+                await ensure_staging_table(conn, candle_table, staging=staging)
+                self._staging_ready.add(staging)
+            # Eski aylara yazılacaksa partition'ları önceden aç (default partition'a düşmesin)
+            await ensure_partitions_for_rows(conn, candle_table, rows)
+            for i in range(0, len(rows), WRITE_CHUNK):
+                async with conn.transaction():
+                    await upsert_klines_copy(
+                        conn, rows[i:i + WRITE_CHUNK], candle_table, last_price_table,
+                        update_last_price=False, staging=staging,
+                    )
+        return len(rows)
+
+    async def backfill_pair(self, market: str, symbol: str, interval: str, now_ms: int) -> int:
+        key = (market, symbol, interval)
+        step = INTERVAL_MS[interval]
+        last_closed = align_open_time(now_ms, interval) - step
+        window_start = last_closed - (self.lookback_candles - 1) * step
+        window_start = max(window_start, self._listed_from.get(key, window_start))
+
+        candle_table, _, _ = MARKET_TABLES[market]
+        async with self._pair_sem:
+            async with self.pool.acquire() as conn:
+                gaps = await find_gaps(conn, candle_table, symbol, interval, window_start, last_closed)
+
+            unavailable = self._unavailable.setdefault(key, set())
+            gaps = [g for g in gaps if g not in unavailable]
+            if not gaps:
+                return 0
+
+            fetcher = self.fetchers[market]
+            results = await asyncio.gather(*(
+                fetcher.fetch_range(symbol, interval, start, end) for start, end in gaps
+            ))
+
+            rows = []
+            for (start, end), (klines, failed) in zip(gaps, results):
+                if failed:
+                    rows.extend(klines_to_rows(symbol, interval, klines, now_ms))
+                    continue  # eksik sayfa var; sonraki turda tekrar denenir
+                first_open = int(klines[0][0]) if klines else end + step
+                if start == window_start and first_open > start:
+                    # Listeleme öncesi: pencere başını ilk mevcut muma çek
+                    self._listed_from[key] = first_open
+                elif not klines:
+                    unavailable.add((start, end))
+                rows.extend(klines_to_rows(symbol, interval, klines, now_ms))
+
+            if rows:
+                await self.write_rows(market, rows)
+                missing = sum((end - start) // step + 1 for start, end in gaps)
+                print(f"🩹 Backfill {market} {symbol} {interval}: {len(gaps)} boşluk, "
+                      f"{missing} eksik mum, {len(rows)} mum yazıldı.")
+            return len(rows)
+
+    async def run_once(self) -> dict:
+        started = time.monotonic()
+        pairs = await self.load_pairs()
+        now_ms = int(time.time() * 1000)
+
+        results = await asyncio.gather(
+            *(self.backfill_pair(m, s, i, now_ms) for m, s, i in pairs),
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, Exception)]
+        for e in errors[:5]:
+            print(f"❌ Backfill hatası: {e}")
+
+        summary = {
+            "pairs": len(pairs),
+            "written": sum(r for r in results if isinstance(r, int)),
+            "errors": len(errors),
+            "requests": sum(f.requests for f in self.fetchers.values()),
+            "rate_limited": sum(f.rate_limited for f in self.fetchers.values()),
+            "seconds": round(time.monotonic() - started, 2),
+        }
+        print(f"✅ Backfill turu: {summary}")
+        return summary
+
+    async def run_forever(self, interval_sec: float = BACKFILL_INTERVAL_SEC):
+        print(f"🚀 Backfill servisi başladı ({', '.join(self.fetchers)}; her {interval_sec:.0f}sn)")
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Backfill turu başarısız: {e}")
+            await asyncio.sleep(interval_sec)
+
+
+async def run_backfill(pool, base_urls: dict | None = None):
+    """run_unified içinden canlı collector'ın yanında çalıştırılır."""
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        service = BackfillService(pool, session, base_urls=base_urls)
+        await service.run_forever()
+
+
+async def _main(args):
+    import asyncpg
+
+    # config modülü .env yüklenmeden import edildiği için burada tekrar okunur
+    dsn = os.getenv("DATABASE_URL", "").replace("postgresql+asyncpg://", "postgresql://")
+    base_urls = {"spot": args.spot_url, "futures": args.futures_url}
+    markets = tuple(args.market) if args.market else ("spot", "futures")
+    pool = await asyncpg.create_pool(dsn)
+    try:
+        timeout = aiohttp.ClientTimeout(total=30)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            service = BackfillService(
+                pool, session, markets=markets,
+                lookback_candles=args.lookback, base_urls=base_urls,
+            )
+            if args.once:
+                await service.run_once()
+            else:
+                await service.run_forever()
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Kline gap-filling backfill")
+    parser.add_argument("--once", action="store_true", help="tek tur çalış ve çık")
+    parser.add_argument("--market", action="append", choices=list(MARKET_REST))
+    parser.add_argument("--lookback", type=int, default=BACKFILL_LOOKBACK_CANDLES)
+    parser.add_argument("--spot-url", default=None, help="ör. http://127.0.0.1:8765/api/v3")
+    parser.add_argument("--futures-url", default=None, help="ör. http://127.0.0.1:8765/fapi/v1")
+    asyncio.run(_main(parser.parse_args()))
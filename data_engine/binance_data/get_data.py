@@ -5,11 +5,12 @@ def get_binance_data(symbol: str, interval: str, total_limit: int = 5000, retry_
     """Binance API üzerinden belirtilen symbol ve interval için total_limit kadar mum verisi çeker."""
     base_url = "https://api.binance.com/api/v3/klines"
     limit_per_request = 1000
-    collected_candles = []
+    pages = []  # en yeni sayfa başta; sonda ters çevrilip tek seferde birleştirilir
+    collected = 0
     end_time = None
 
     try:
-        while len(collected_candles) < total_limit:
+        while collected < total_limit:
             params = {
                 "symbol": symbol.upper(),
                 "interval": interval,
@@ -47,9 +48,10 @@ def get_binance_data(symbol: str, interval: str, total_limit: int = 5000, retry_
                     "volume": float(item[5])
                 })
 
-            collected_candles = candles + collected_candles  # Eski verileri üste ekliyoruz
+            pages.append(candles)
+            collected += len(candles)
 
-            print(f"✅ {symbol} | {interval} | Toplam veri: {len(collected_candles)}")
+            print(f"✅ {symbol} | {interval} | Toplam veri: {collected}")
 
             if len(candles) < limit_per_request:
                 break  # Daha fazla veri yok
@@ -57,6 +59,8 @@ def get_binance_data(symbol: str, interval: str, total_limit: int = 5000, retry_
             end_time = candles[0]["open_time"] - 1  # Geri çek, çakışmayı önle
             time.sleep(1)  # Daha az bekleme süresi, güvenli limitte
 
+        # Eski sayfalar sonda; eskiden yeniye sıralı tek liste
+        collected_candles = [c for page in reversed(pages) for c in page]
         return collected_candles[:total_limit]
 
     except (ValueError, IndexError) as e:
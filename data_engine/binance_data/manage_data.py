@@ -1,24 +1,7 @@
-from datetime import datetime, timedelta
-import aiohttp
-import asyncio
-import websockets
-import json
-import time
-from data_engine.queue_manager import data_queue
-from .interval_maping import interval_to_minutes
+from data_engine.kline_stream import KlineStreamManager
+from data_engine.config import BINANCE_SPOT_WS_URI
 
-import asyncio, json, websockets
-from itertools import islice
-
-WS_URI = "wss://stream.binance.com:443/ws"
-
-def chunked(iterable, size):
-    it = iter(iterable)
-    while True:
-        chunk = list(islice(it, size))
-        if not chunk:
-            break
-        return chunk
+WS_URI = BINANCE_SPOT_WS_URI  # env ile replay sunucusuna yönlendirilebilir
 
 # Örnek: tüm streamleri burada topla (senin büyük listen)
 ALL_STREAMS = [
@@ -751,74 +734,11 @@ ALL_STREAMS = [
         #"pythusdt@kline_1w",   # 1 hafta
 ]
 
-async def subscribe_chunk(streams, conn_idx, db_pool):
-    payload = {"method": "SUBSCRIBE", "params": streams, "id": conn_idx}
-    
-    while True:
-        try:
-            async with websockets.connect(
-                WS_URI,
-                ping_interval=60,
-                ping_timeout=60,
-                close_timeout=10,
-                max_size=2**24
-            ) as ws:
-                await ws.send(json.dumps(payload))
-                print(f"✅ Conn{conn_idx}: {len(streams)} stream'e abone olundu.")
-    
-                while True:
-                    try:
-                        msg = await ws.recv()
-                        json_data = json.loads(msg)
-    
-                        if "k" in json_data:
-                            kline = json_data["k"]
-                            is_closed = kline["x"]
-                            interval = kline["i"]
-                            coin_id = kline["s"].upper()
-    
-                            if is_closed:
-                                timestamp   = datetime.utcfromtimestamp(kline["t"] / 1000)
-                                open_price  = float(kline["o"])
-                                high_price  = float(kline["h"])
-                                low_price   = float(kline["l"])
-                                close_price = float(kline["c"])
-                                volume      = float(kline["v"])
-    
-                                # 1) Veriyi Kuyruğa At (Non-Blocking)
-                                data_item = (
-                                    'spot', coin_id, interval, timestamp,
-                                    open_price, high_price, low_price, close_price, volume
-                                )
-                                try:
-                                    data_queue.put_nowait(data_item)
-                                except asyncio.QueueFull:
-                                    print(f"⚠️ [{conn_idx}] Kuyruk dolu! Veri atlandı: {coin_id}")
-                    
-                    except websockets.exceptions.ConnectionClosed:
-                        print(f"⚠️ Conn{conn_idx}: Bağlantı kapandı, yeniden bağlanılıyor...")
-                        break # İç döngüden çık, dış döngü tekrar bağlansın
-                    except Exception as e:
-                        print(f"❌ Conn{conn_idx}: Okuma hatası: {e}")
-                        break
-        
-        except Exception as e:
-            print(f"❌ Conn{conn_idx}: Bağlantı hatası: {e}. 5sn sonra tekrar denenecek.")
-            await asyncio.sleep(5)
-
-
-
 async def binance_websocket(db_pool):
+    """
+    Stream kümesi `data_stream_catalog` tablosundan okunur (boşsa ALL_STREAMS ile seed edilir).
+    Tablo değişince açık bağlantılarda SUBSCRIBE/UNSUBSCRIBE ile canlı uygulanır.
+    """
     CHUNK_SIZE = 80  # tek WS için ~50–100 arası pratik; gerekirse azalt/artır
-    tasks = []
-    idx = 1
-    start = 0
-    while start < len(ALL_STREAMS):
-        end = min(start + CHUNK_SIZE, len(ALL_STREAMS))
-        streams = ALL_STREAMS[start:end]
-        tasks.append(asyncio.create_task(subscribe_chunk(streams, idx, db_pool)))
-        idx += 1
-        start = end
-        await asyncio.sleep(0.3)  # çok hızlı parallel handshake yapmamak için küçük gecikme
-
-    await asyncio.gather(*tasks)
\ No newline at end of file
+    manager = KlineStreamManager(WS_URI, 'spot', seed_streams=ALL_STREAMS, max_streams_per_conn=CHUNK_SIZE)
+    await manager.run(db_pool)
@@ -15,19 +15,21 @@ async def save_binance_data(db: AsyncSession, symbol: str, interval: str, candle
             ON CONFLICT (coin_id, interval, timestamp) DO NOTHING
         """)
 
-        for candle in candles:
-            timestamp = datetime.utcfromtimestamp(candle["open_time"] / 1000)
-            params = {
+        # Parametre listesi tek execute ile executemany olarak gider
+        params = [
+            {
                 "coin_id": symbol,
                 "interval": interval,
-                "timestamp": timestamp,
+                "timestamp": datetime.utcfromtimestamp(candle["open_time"] / 1000),
                 "open": candle["open"],
                 "high": candle["high"],
                 "low": candle["low"],
                 "close": candle["close"],
                 "volume": candle["volume"],
             }
-            await db.execute(query, params)
+            for candle in candles
+        ]
+        await db.execute(query, params)
 
         await db.commit()
         return {"message": f"{len(candles)} data inserted successfully."}
@@ -0,0 +1,101 @@
+"""
+Candle fan-out: publishes just-committed candles to the trade_engine.
+
+Every writer flush sends one message per market on NOTIFY candle_feed:
+
+    {"e": "<epoch>", "q": 42, "m": "spot",
+     "c": [["BTCUSDT", "1m", 1704110400000, o, h, l, c, v], ...]}
+
+Batches that do not fit into a NOTIFY payload are stored in the UNLOGGED
+`candle_feed_overflow` table and announced with {"e", "q", "m", "o": 1, "n": count}.
+
+`e` changes on every publisher start and `q` increases by one per message,
+so subscribers can detect restarts and missed messages and fall back to the DB.
+"""
+import json
+import os
+import time
+
+from data_engine.config import CANDLE_FEED_OVERFLOW_RETENTION_SEC
+
+FEED_CHANNEL = "candle_feed"
+OVERFLOW_TABLE = "candle_feed_overflow"
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_MAX_BYTES = 7900
+
+PRUNE_INTERVAL_SEC = 60
+
+
+class CandleFeedPublisher:
+    def __init__(self, retention_sec: int = CANDLE_FEED_OVERFLOW_RETENTION_SEC):
+        self.epoch = f"{int(time.time() * 1000):x}-{os.getpid():x}"
+        self.seq = 0
+        self.retention_sec = retention_sec
+        self._last_prune = 0.0
+
+        # Counters
+        self.inline = 0
+        self.overflow = 0
+
+    async def ensure_schema(self, pool):
+        async with pool.acquire() as conn:
+            await conn.execute(
+                f"""
+                CREATE UNLOGGED TABLE IF NOT EXISTS {OVERFLOW_TABLE} (
+                    epoch      text        NOT NULL,
+                    seq        bigint      NOT NULL,
+                    payload    text        NOT NULL,
+                    created_at timestamptz NOT NULL DEFAULT now(),
+                    PRIMARY KEY (epoch, seq)
+                )
+                """
+            )
+
+    async def publish(self, conn, by_source: dict):
+        """
+        by_source: {market: [(coin_id, interval, open_ms, open, high, low, close, volume), ...]}
+        Call after the candles are committed and before the tick notification,
+        on the same connection, so subscribers see the candles first.
+        """
+        for market, rows in by_source.items():
+            if not rows:
+                continue
+            self.seq += 1
+            candles = [list(r) for r in rows]
+            body = json.dumps(
+                {"e": self.epoch, "q": self.seq, "m": market, "c": candles},
+                separators=(",", ":"),
+            )
+
+            if len(body.encode("utf-8")) <= NOTIFY_MAX_BYTES:
+                await conn.execute("SELECT pg_notify($1, $2)", FEED_CHANNEL, body)
+                self.inline += 1
+                continue
+
+            # NOTIFY is delivered on commit, so the overflow row is visible when the message arrives
+            async with conn.transaction():
+                await conn.execute(
+                    f"INSERT INTO {OVERFLOW_TABLE} (epoch, seq, payload) VALUES ($1, $2, $3)",
+                    self.epoch, self.seq, body,
+                )
+                await conn.execute(
+                    "SELECT pg_notify($1, $2)", FEED_CHANNEL,
+                    json.dumps({"e": self.epoch, "q": self.seq, "m": market, "o": 1, "n": len(candles)},
+                               separators=(",", ":")),
+                )
+            self.overflow += 1
+
+        now = time.monotonic()
+        if now - self._last_prune >= PRUNE_INTERVAL_SEC:
+            self._last_prune = now
+            await conn.execute(
+                f"DELETE FROM {OVERFLOW_TABLE} WHERE created_at < now() - $1::int * interval '1 second'",
+                self.retention_sec,
+            )
+
+    def stats(self) -> dict:
+        return {"seq": self.seq, "inline": self.inline, "overflow": self.overflow}
+
+
+candle_feed_publisher = CandleFeedPublisher()
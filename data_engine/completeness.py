@@ -0,0 +1,188 @@
+"""
+Per-(market, interval, candle) completeness watermark.
+
+The writer reports every committed candle to the tracker. When all symbols the
+catalog expects for that (market, interval) have been written, or the deadline
+after candle close passes, exactly one NOTIFY is sent on the market's channel:
+
+    {"interval": "1m", "ts": "2024-01-01T12:00:00", "close_ms": 1704110460000,
+     "written": 97, "expected": 99, "ratio": 0.9798, "complete": false,
+     "missing": ["FOOUSDT", "BARUSDT"]}
+
+`ts` is the candle open time as stored in the `timestamp` column.
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+
+from data_engine.config import KLINE_COMPLETENESS_DEADLINE_SEC
+from data_engine.intervals import INTERVAL_MS, from_ms
+from data_engine.stream_catalog import CATALOG_TABLE
+
+# market -> NOTIFY channel (same channels the leader-based notify used)
+NOTIFY_CHANNELS = {
+    "spot": "new_data",
+    "futures": "new_futures_data",
+}
+
+MAX_MISSING_LISTED = 20
+DONE_HISTORY = 10_000
+
+
+class CompletenessTracker:
+    def __init__(self, deadline_sec: float = KLINE_COMPLETENESS_DEADLINE_SEC,
+                 refresh_interval: float = 30.0):
+        self.deadline_sec = deadline_sec
+        self.refresh_interval = refresh_interval
+
+        self.expected = {}          # (market, interval) -> frozenset(symbols)
+        self.pending = {}           # (market, interval, open_ms) -> {"seen": set, "deadline": epoch sec}
+        self._done = OrderedDict()  # (market, interval, open_ms) -> None, bounded
+        self._inflight = set()      # keys whose NOTIFY is being sent by a running flush
+        self._refreshed_at = 0.0
+
+        # Counters
+        self.emitted_complete = 0
+        self.emitted_partial = 0
+        self.late = 0
+
+    # ---------------- expected set ----------------
+    async def refresh_expected(self, pool):
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                f"""
+                SELECT market, "interval", array_agg(symbol) AS symbols
+                FROM {CATALOG_TABLE}
+                WHERE enabled
+                GROUP BY market, "interval"
+                """
+            )
+        self.expected = {(r["market"], r["interval"]): frozenset(r["symbols"]) for r in rows}
+        self._refreshed_at = time.monotonic()
+
+    # ---------------- write side ----------------
+    def _deadline(self, interval: str, open_ms: int, now: float) -> float:
+        step = INTERVAL_MS.get(interval)
+        close = (open_ms + step) / 1000 if step else now
+        # Late arrivals (spill replay, restart) still get a short window for the rest of their batch
+        return max(close + self.deadline_sec, now + min(self.deadline_sec, 1.0))
+
+    def observe(self, market: str, rows, now: float | None = None):
+        """rows: committed (coin_id, interval, open_ms, ...) tuples for `market`."""
+        now = time.time() if now is None else now
+        for row in rows:
+            coin_id, interval, open_ms = row[0], row[1], row[2]
+            expected = self.expected.get((market, interval))
+            if not expected or coin_id not in expected:
+                continue
+            key = (market, interval, open_ms)
+            if key in self._done:
+                self.late += 1
+                continue
+            entry = self.pending.get(key)
+            if entry is None:
+                entry = self.pending[key] = {"seen": set(), "deadline": self._deadline(interval, open_ms, now)}
+            entry["seen"].add(coin_id)
+
+    # ---------------- emit side ----------------
+    def due(self, now: float | None = None):
+        """
+        Complete or expired candles, oldest first, as (key, channel, payload) triples.
+        Nothing is removed here: a candle leaves `pending` only through `mark_sent`,
+        once its NOTIFY has actually gone out. Candles already being sent are skipped.
+        """
+        now = time.time() if now is None else now
+        ready = []
+        for key, entry in self.pending.items():
+            if key in self._inflight:
+                continue
+            market, interval, _ = key
+            expected = self.expected.get((market, interval), frozenset())
+            complete = expected <= entry["seen"]
+            if complete or now >= entry["deadline"]:
+                ready.append((key, entry, expected, complete))
+
+        out = []
+        for key, entry, expected, complete in sorted(ready, key=lambda r: r[0][2]):
+            market, interval, open_ms = key
+            written = len(entry["seen"] & expected)
+            missing = sorted(expected - entry["seen"])
+            step = INTERVAL_MS.get(interval)
+            payload = {
+                "interval": interval,
+                "ts": from_ms(open_ms).isoformat(),
+                "close_ms": open_ms + step if step else None,
+                "written": written,
+                "expected": len(expected),
+                "ratio": round(written / len(expected), 4) if expected else 1.0,
+                "complete": complete,
+                "missing": missing[:MAX_MISSING_LISTED],
+            }
+            out.append((key, NOTIFY_CHANNELS[market], payload))
+        return out
+
+    def mark_sent(self, key, complete: bool):
+        """The candle's NOTIFY went out: retire it so it is never emitted twice."""
+        self.pending.pop(key, None)
+        self._done[key] = None
+        if len(self._done) > DONE_HISTORY:
+            self._done.popitem(last=False)
+        if complete:
+            self.emitted_complete += 1
+        else:
+            self.emitted_partial += 1
+
+    async def flush(self, conn, now: float | None = None) -> int:
+        """
+        Sends the due NOTIFYs. If one fails, it and every later candle stay pending
+        and are retried by the next flush (writer batch or the deadline task).
+        """
+        due = self.due(now)
+        keys = [key for key, _, _ in due]
+        self._inflight.update(keys)
+        sent = 0
+        try:
+            for key, channel, payload in due:
+                await conn.execute("SELECT pg_notify($1, $2)", channel, json.dumps(payload, separators=(",", ":")))
+                self.mark_sent(key, payload["complete"])
+                sent += 1
+                if not payload["complete"]:
+                    print(f"⏰ {channel} {payload['interval']} {payload['ts']}: deadline, "
+                          f"{payload['written']}/{payload['expected']} yazıldı (eksik: {payload['missing'][:5]})")
+        finally:
+            self._inflight.difference_update(keys)
+        return sent
+
+    def has_expired(self, now: float | None = None) -> bool:
+        now = time.time() if now is None else now
+        return any(now >= e["deadline"] for e in self.pending.values())
+
+    async def run(self, pool, poll_interval: float = 0.2):
+        """Background task: refreshes the expected sets and emits deadline-expired candles."""
+        while True:
+            try:
+                stale = time.monotonic() - self._refreshed_at >= self.refresh_interval
+                if stale or (not self.expected and time.monotonic() - self._refreshed_at >= 1.0):
+                    await self.refresh_expected(pool)
+
+                if self.has_expired():
+                    async with pool.acquire() as conn:
+                        await self.flush(conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Completeness tracker error: {e}")
+                self._refreshed_at = time.monotonic()
+            await asyncio.sleep(poll_interval)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.pending),
+            "complete": self.emitted_complete,
+            "partial": self.emitted_partial,
+            "late": self.late,
+        }
+
+
+completeness_tracker = CompletenessTracker()
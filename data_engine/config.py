@@ -6,3 +6,65 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 # asyncpg için URL düzeltmesi
 if DATABASE_URL and DATABASE_URL.startswith("postgresql+asyncpg://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
+
+# Kline writer
+# "executemany": row-by-row INSERT ... ON CONFLICT (legacy path)
+# "copy":        COPY into an unlogged staging table + one set-based upsert
+KLINE_WRITER_MODE = os.getenv("KLINE_WRITER_MODE", "executemany").strip().lower()
+KLINE_WRITER_BATCH_SIZE = int(os.getenv("KLINE_WRITER_BATCH_SIZE", "200"))
+KLINE_WRITER_FLUSH_INTERVAL = float(os.getenv("KLINE_WRITER_FLUSH_INTERVAL", "1.0"))
+
+# Shared kline queue + on-disk spill journal (absorbs bursts while Postgres is slow)
+KLINE_QUEUE_MAXSIZE = int(os.getenv("KLINE_QUEUE_MAXSIZE", "20000"))
+KLINE_SPILL_ENABLED = os.getenv("KLINE_SPILL_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+KLINE_SPILL_DIR = os.getenv("KLINE_SPILL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "spill"))
+KLINE_SPILL_SEGMENT_MB = int(os.getenv("KLINE_SPILL_SEGMENT_MB", "8"))
+KLINE_SPILL_MAX_MB = int(os.getenv("KLINE_SPILL_MAX_MB", "512"))
+
+# Backfill (gap filling) service
+BACKFILL_ENABLED = os.getenv("BACKFILL_ENABLED", "false").strip().lower() in ("1", "true", "yes")
+BACKFILL_INTERVAL_SEC = float(os.getenv("BACKFILL_INTERVAL_SEC", "300"))
+BACKFILL_LOOKBACK_CANDLES = int(os.getenv("BACKFILL_LOOKBACK_CANDLES", "5000"))
+BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "8"))
+# Share of the exchange's per-minute request weight the backfill may use
+BACKFILL_WEIGHT_FRACTION = float(os.getenv("BACKFILL_WEIGHT_FRACTION", "0.5"))
+BINANCE_SPOT_REST_URL = os.getenv("BINANCE_SPOT_REST_URL", "https://api.binance.com/api/v3")
+BINANCE_FUTURES_REST_URL = os.getenv("BINANCE_FUTURES_REST_URL", "https://fapi.binance.com/fapi/v1")
+
+# Tick notifications
+# "watermark": one NOTIFY per (market, interval, candle) once every catalog symbol is written
+#              (or the deadline after candle close passes); JSON payload with the completion ratio
+# "leader":    legacy NOTIFY '<interval>' whenever BTCUSDT is in a batch
+KLINE_NOTIFY_MODE = os.getenv("KLINE_NOTIFY_MODE", "watermark").strip().lower()
+KLINE_COMPLETENESS_DEADLINE_SEC = float(os.getenv("KLINE_COMPLETENESS_DEADLINE_SEC", "5.0"))
+
+# Candle fan-out: publish just-committed candles on NOTIFY candle_feed (overflow table for big batches)
+CANDLE_FEED_ENABLED = os.getenv("CANDLE_FEED_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+CANDLE_FEED_OVERFLOW_RETENTION_SEC = int(os.getenv("CANDLE_FEED_OVERFLOW_RETENTION_SEC", "900"))
+
+# Higher-timeframe candles derived from 1m streams (data_engine/aggregator.py)
+KLINE_AGGREGATION_ENABLED = os.getenv("KLINE_AGGREGATION_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+# Intervals that stay on their native @kline_ streams, e.g. "1d,1w"
+KLINE_NATIVE_INTERVALS = [i.strip() for i in os.getenv("KLINE_NATIVE_INTERVALS", "").split(",") if i.strip()]
+# Sampled comparison of complete derived candles (0 = off; incomplete buckets are always fetched)
+KLINE_AGG_RECONCILE_INTERVAL_SEC = float(os.getenv("KLINE_AGG_RECONCILE_INTERVAL_SEC", "300"))
+KLINE_AGG_RECONCILE_SAMPLE = int(os.getenv("KLINE_AGG_RECONCILE_SAMPLE", "50"))
+
+# Websocket endpoints (point at data_engine/replay_server.py for offline load tests)
+BINANCE_SPOT_WS_URI = os.getenv("BINANCE_SPOT_WS_URI", "wss://stream.binance.com:443/ws")
+BINANCE_FUTURES_WS_URI = os.getenv("BINANCE_FUTURES_WS_URI", "wss://fstream.binance.com/ws")
+
+# Monthly partitions of the candle tables (data_engine/partitioning.py; no-op until a table is migrated)
+PARTITION_MAINTENANCE_ENABLED = os.getenv("PARTITION_MAINTENANCE_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+PARTITION_MAINTENANCE_INTERVAL_SEC = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL_SEC", "3600"))
+PARTITION_PREMAKE_MONTHS = int(os.getenv("PARTITION_PREMAKE_MONTHS", "3"))
+# 1m partitions older than this many months are detached ("drop" | "archive"); 0 keeps everything
+PARTITION_1M_RETENTION_MONTHS = int(os.getenv("PARTITION_1M_RETENTION_MONTHS", "0"))
+PARTITION_RETENTION_MODE = os.getenv("PARTITION_RETENTION_MODE", "archive").strip().lower()
+PARTITION_ARCHIVE_SCHEMA = os.getenv("PARTITION_ARCHIVE_SCHEMA", "candle_archive")
+# CLUSTER closed months on (coin_id, interval, timestamp); takes an exclusive lock per leaf partition
+PARTITION_COMPACT_ENABLED = os.getenv("PARTITION_COMPACT_ENABLED", "false").strip().lower() in ("1", "true", "yes")
+
+# Prometheus-style /metrics endpoint (data_engine/metrics.py); 0 disables latency tracking
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0") or 0)
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
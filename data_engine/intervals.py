@@ -0,0 +1,41 @@
+"""Binance interval helpers shared by the writer, completeness tracker and backfill."""
+from datetime import datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+
+# Fixed-length intervals only; "1M" (calendar month) has no constant length
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 3 * 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1h": 60 * 60_000,
+    "2h": 2 * 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "6h": 6 * 60 * 60_000,
+    "8h": 8 * 60 * 60_000,
+    "12h": 12 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+    "3d": 3 * 24 * 60 * 60_000,
+    "1w": 7 * 24 * 60 * 60_000,
+}
+# Weekly candles open on Monday 00:00 UTC; the epoch (1970-01-01) is a Thursday
+WEEK_OFFSET_MS = 4 * 24 * 60 * 60_000
+
+
+def to_ms(ts: datetime) -> int:
+    """Naive UTC datetime -> epoch ms."""
+    return int((ts - EPOCH) / timedelta(milliseconds=1))
+
+
+def from_ms(ms: int) -> datetime:
+    """Epoch ms -> naive UTC datetime (the DB's `timestamp without time zone`)."""
+    return EPOCH + timedelta(milliseconds=ms)
+
+
+def align_open_time(ms: int, interval: str) -> int:
+    """Open time of the `interval` candle containing `ms`."""
+    step = INTERVAL_MS[interval]
+    offset = WEEK_OFFSET_MS if interval == "1w" else 0
+    return (ms - offset) // step * step + offset
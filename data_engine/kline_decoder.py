@@ -0,0 +1,72 @@
+"""
+Fast-path decoder for Binance kline websocket frames.
+
+- JSON backend: orjson when installed, stdlib json otherwise
+  (KLINE_JSON_BACKEND=auto|orjson|json).
+- Unclosed klines ("x":false, the vast majority of frames) are rejected with a
+  substring check before any parsing.
+- The open time stays an integer epoch ms; it is only turned into a
+  `timestamp` by the DB writer.
+"""
+import json
+import os
+
+_BACKEND_ENV = os.getenv("KLINE_JSON_BACKEND", "auto").strip().lower()
+
+
+def _select_backend(name: str):
+    if name in ("auto", "orjson"):
+        try:
+            import orjson
+            return "orjson", orjson.loads
+        except ImportError:
+            if name == "orjson":
+                print("⚠️ KLINE_JSON_BACKEND=orjson but orjson is not installed, using stdlib json.")
+    return "json", json.loads
+
+
+BACKEND, loads = _select_backend(_BACKEND_ENV)
+
+# Binance sends compact JSON, so the flag always appears exactly like this
+_UNCLOSED_STR = '"x":false'
+_UNCLOSED_BYTES = b'"x":false'
+
+
+class KlineDecoder:
+    """
+    decode(frame) returns:
+      - None  for an unclosed kline (skipped without parsing)
+      - tuple (coin_id, interval, open_ms, open, high, low, close, volume) for a closed kline
+      - dict  for any other frame (SUBSCRIBE responses, errors)
+    """
+
+    def __init__(self, backend: str | None = None):
+        if backend is None:
+            self.backend, self._loads = BACKEND, loads
+        else:
+            self.backend, self._loads = _select_backend(backend)
+        self.skipped = 0
+        self.decoded = 0
+
+    def decode(self, frame):
+        marker = _UNCLOSED_BYTES if isinstance(frame, (bytes, bytearray)) else _UNCLOSED_STR
+        if marker in frame:
+            self.skipped += 1
+            return None
+
+        data = self._loads(frame)
+        if "data" in data and "stream" in data:  # combined stream wrapper
+            data = data["data"]
+
+        k = data.get("k")
+        if k is None:
+            return data
+        if not k["x"]:
+            self.skipped += 1
+            return None
+
+        self.decoded += 1
+        return (
+            k["s"].upper(), k["i"], k["t"],
+            float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"]),
+        )
@@ -0,0 +1,263 @@
+import asyncio
+import json
+
+import websockets
+
+from data_engine.aggregator import aggregators
+from data_engine.kline_decoder import KlineDecoder
+from data_engine.queue_manager import data_queue
+from data_engine.stream_catalog import ensure_catalog, load_streams, CATALOG_CHANNEL
+
+# Binance: en fazla 5 kontrol mesajı/sn/bağlantı
+CONTROL_MESSAGE_GAP = 0.25
+CONTROL_MESSAGE_MAX_PARAMS = 200
+
+
+class KlineConnection:
+    """
+    Tek bir websocket bağlantısı ve üzerine abone olunan stream kümesi.
+    Bağlantı açıkken SUBSCRIBE/UNSUBSCRIBE kontrol mesajlarıyla küme canlı değişir;
+    yeniden bağlanınca mevcut kümenin tamamına tekrar abone olunur.
+    """
+
+    def __init__(self, manager, conn_idx: int):
+        self.manager = manager
+        self.conn_idx = conn_idx
+        self.streams = set()
+        self.ws = None
+        self.task = None
+        self.closing = False
+        self._msg_id = 0
+        self._send_lock = asyncio.Lock()
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def _send_control(self, method: str, streams):
+        ws = self.ws
+        if ws is None or not streams:
+            return
+        streams = sorted(streams)
+        async with self._send_lock:
+            for i in range(0, len(streams), CONTROL_MESSAGE_MAX_PARAMS):
+                self._msg_id += 1
+                params = streams[i:i + CONTROL_MESSAGE_MAX_PARAMS]
+                await ws.send(json.dumps({"method": method, "params": params, "id": self._msg_id}))
+                await asyncio.sleep(CONTROL_MESSAGE_GAP)
+
+    async def subscribe(self, streams):
+        streams = set(streams) - self.streams
+        if not streams:
+            return
+        self.streams |= streams
+        try:
+            await self._send_control("SUBSCRIBE", streams)
+        except Exception as e:
+            # Bağlantı koptuysa reconnect tüm kümeye yeniden abone olur
+            print(f"⚠️ Conn{self.conn_idx}: SUBSCRIBE gönderilemedi: {e}")
+
+    async def unsubscribe(self, streams):
+        streams = set(streams) & self.streams
+        if not streams:
+            return
+        self.streams -= streams
+        try:
+            await self._send_control("UNSUBSCRIBE", streams)
+        except Exception as e:
+            print(f"⚠️ Conn{self.conn_idx}: UNSUBSCRIBE gönderilemedi: {e}")
+
+    async def close(self):
+        self.closing = True
+        ws = self.ws
+        if ws is not None:
+            try:
+                await ws.close()
+            except Exception:
+                pass
+        if self.task is not None:
+            self.task.cancel()
+
+    async def run(self):
+        while not self.closing:
+            try:
+                async with websockets.connect(
+                    self.manager.ws_uri,
+                    ping_interval=60,
+                    ping_timeout=60,
+                    close_timeout=10,
+                    max_size=2**24
+                ) as ws:
+                    self.ws = ws
+                    await self._send_control("SUBSCRIBE", set(self.streams))
+                    print(f"✅ Conn{self.conn_idx}: {len(self.streams)} stream'e abone olundu.")
+
+                    while not self.closing:
+                        try:
+                            msg = await ws.recv()
+                            self.manager.handle_message(msg, self.conn_idx)
+                        except websockets.exceptions.ConnectionClosed:
+                            if not self.closing:
+                                print(f"⚠️ Conn{self.conn_idx}: Bağlantı kapandı, yeniden bağlanılıyor...")
+                            break # İç döngüden çık, dış döngü tekrar bağlansın
+                        except Exception as e:
+                            print(f"❌ Conn{self.conn_idx}: Okuma hatası: {e}")
+                            break
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"❌ Conn{self.conn_idx}: Bağlantı hatası: {e}. 5sn sonra tekrar denenecek.")
+                await asyncio.sleep(5)
+            finally:
+                self.ws = None
+
+
+class KlineStreamManager:
+    """
+    Stream kümesini `data_stream_catalog` tablosundan okur ve bağlantılara dağıtır.
+
+    - Eklenen streamler en az yüklü bağlantıya SUBSCRIBE edilir (gerekirse yeni bağlantı açılır).
+    - Silinen/disable edilen streamler sahibi olan bağlantıda UNSUBSCRIBE edilir.
+    - Rebalance önce hedef bağlantıda SUBSCRIBE, sonra kaynakta UNSUBSCRIBE yapar
+      (make-before-break), böylece taşınan stream hiç düşmez.
+    """
+
+    def __init__(self, ws_uri: str, source: str, seed_streams=None,
+                 max_streams_per_conn: int = 80, reload_interval: float = 60.0):
+        self.ws_uri = ws_uri
+        self.source = source                  # 'spot' | 'futures'
+        self.seed_streams = seed_streams or []
+        self.max_streams_per_conn = max_streams_per_conn
+        self.reload_interval = reload_interval
+
+        self.connections: list[KlineConnection] = []
+        self.owner: dict[str, KlineConnection] = {}
+        self._next_idx = 1
+        self._reload_event = asyncio.Event()
+        self.decoder = KlineDecoder()
+        self.aggregator = aggregators[source]
+
+    # ---------------- message handling ----------------
+    def handle_message(self, msg, conn_idx: int):
+        decoded = self.decoder.decode(msg)
+        if decoded is None:
+            return  # kapanmamış mum
+
+        if isinstance(decoded, tuple):
+            # (source, coin_id, interval, open_ms, open, high, low, close, volume)
+            # 1m mumlar üst interval agregasyonundan da geçer; türetilen mumlar aynı kuyruğa yazılır
+            # Kuyruk doluysa disk journal'ına taşar; sadece journal da doluysa düşer
+            for row in self.aggregator.route(decoded):
+                if not data_queue.offer((self.source, *row)):
+                    print(f"⚠️ [{conn_idx}] Kuyruk ve spill journal dolu! Veri atlandı: {row[0]} {row[1]}")
+
+        elif decoded.get("error"):
+            print(f"❌ Conn{conn_idx}: Kontrol mesajı hatası: {decoded['error']}")
+
+    # ---------------- assignment ----------------
+    def _new_connection(self) -> KlineConnection:
+        conn = KlineConnection(self, self._next_idx)
+        self._next_idx += 1
+        self.connections.append(conn)
+        return conn
+
+    async def apply(self, desired: set):
+        current = set(self.owner)
+        removed = current - desired
+        added = desired - current
+
+        # 1) Kaldırılanlar
+        by_conn = {}
+        for s in removed:
+            by_conn.setdefault(self.owner.pop(s), set()).add(s)
+        for conn, streams in by_conn.items():
+            await conn.unsubscribe(streams)
+
+        # 2) Eklenenler: en az yüklü bağlantıya, kapasite yoksa yeni bağlantı
+        loads = {conn: len(conn.streams) for conn in self.connections}
+        new_conns = []
+        by_conn = {}
+        for s in sorted(added):
+            candidates = [c for c, n in loads.items() if n < self.max_streams_per_conn]
+            if candidates:
+                conn = min(candidates, key=lambda c: loads[c])
+            else:
+                conn = self._new_connection()
+                new_conns.append(conn)
+            loads[conn] = loads.get(conn, 0) + 1
+            by_conn.setdefault(conn, set()).add(s)
+            self.owner[s] = conn
+
+        for conn, streams in by_conn.items():
+            if conn in new_conns:
+                conn.streams |= streams  # run() ilk bağlantıda tümüne abone olur
+            else:
+                await conn.subscribe(streams)
+
+        for conn in new_conns:
+            conn.start()
+            await asyncio.sleep(0.3)  # çok hızlı parallel handshake yapmamak için küçük gecikme
+
+        # 3) Boşalan bağlantıları kapat
+        for conn in [c for c in self.connections if not c.streams]:
+            self.connections.remove(conn)
+            await conn.close()
+
+        await self.rebalance()
+
+        if removed or added:
+            print(f"🔁 {self.source}: +{len(added)} / -{len(removed)} stream, "
+                  f"{len(self.connections)} bağlantı, toplam {len(self.owner)} stream.")
+
+    async def rebalance(self):
+        """Bağlantılar arası yük farkı çeyrek kapasiteyi aşarsa streamleri taşır."""
+        tolerance = max(1, self.max_streams_per_conn // 4)
+        while len(self.connections) > 1:
+            # Sadece açık bağlantıya taşı; aksi halde kaynakta UNSUBSCRIBE boşluk yaratır
+            connected = [c for c in self.connections if c.ws is not None]
+            if not connected:
+                break
+            heavy = max(self.connections, key=lambda c: len(c.streams))
+            light = min(connected, key=lambda c: len(c.streams))
+            diff = len(heavy.streams) - len(light.streams)
+            if diff <= tolerance:
+                break
+
+            moved = set(sorted(heavy.streams)[:diff // 2])
+            await light.subscribe(moved)
+            for s in moved:
+                self.owner[s] = light
+            await heavy.unsubscribe(moved)
+
+    # ---------------- main loop ----------------
+    async def _listen_catalog(self, db_pool):
+        conn = await db_pool.acquire()
+        try:
+            await conn.add_listener(CATALOG_CHANNEL, lambda *_: self._reload_event.set())
+            while True:
+                await asyncio.sleep(3600)
+        finally:
+            await db_pool.release(conn)
+
+    async def run(self, db_pool):
+        await ensure_catalog(db_pool, self.source, self.seed_streams)
+        listener = asyncio.create_task(self._listen_catalog(db_pool))
+
+        try:
+            while True:
+                # Yenileme sırasında gelen NOTIFY kaçmasın diye önce temizle
+                self._reload_event.clear()
+                try:
+                    desired = self.aggregator.plan(await load_streams(db_pool, self.source))
+                    await self.apply(desired)
+                except Exception as e:
+                    print(f"❌ {self.source}: Stream katalog yenileme hatası: {e}")
+
+                try:
+                    await asyncio.wait_for(self._reload_event.wait(), timeout=self.reload_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            listener.cancel()
+            for conn in self.connections:
+                await conn.close()
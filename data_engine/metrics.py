@@ -0,0 +1,128 @@
+"""
+Latency histograms for the data engine on a Prometheus-style /metrics endpoint.
+
+Stages:
+    flush              one writer batch: upsert + candle feed + watermark NOTIFY
+    candle_to_commit   candle close (open + interval) -> writer transaction committed,
+                       per interval (the first leg of the trade engine's tick latency)
+Component counters (queue, completeness tracker, candle feed) are exported as gauges.
+
+Disabled unless METRICS_PORT is set: observe() returns on its first line.
+"""
+import asyncio
+import logging
+import re
+
+from data_engine.config import METRICS_PORT, METRICS_HOST
+
+logger = logging.getLogger("DataEngineUnified")
+
+METRICS_ENABLED = METRICS_PORT > 0
+PREFIX = "data_engine"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_NAME_RE = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_name: str, buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_name = label_name
+        self.buckets = buckets
+        self.series = {}  # label value -> [bucket counts..., sum, count]
+
+    def observe(self, label: str, value: float):
+        row = self.series.get(label)
+        if row is None:
+            row = self.series[label] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                row[i] += 1
+                break
+        row[-2] += value
+        row[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label, row in sorted(self.series.items()):
+            tag = f'{self.label_name}="{label}"'
+            cumulative = 0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{tag},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{tag},le="+Inf"}} {row[-1]}')
+            lines.append(f'{self.name}_sum{{{tag}}} {row[-2]:.6f}')
+            lines.append(f'{self.name}_count{{{tag}}} {row[-1]}')
+        return lines
+
+
+stage_seconds = Histogram(f"{PREFIX}_stage_seconds", "Writer stage durations (s)", "stage")
+candle_to_commit_seconds = Histogram(
+    f"{PREFIX}_candle_to_commit_seconds", "Candle close to DB commit (s)", "interval"
+)
+_collectors = {}  # name -> fn() -> dict (numeric fields exported as gauges)
+
+
+def observe(stage: str, seconds: float):
+    if not METRICS_ENABLED:
+        return
+    stage_seconds.observe(stage, max(0.0, seconds))
+
+
+def observe_commit_lag(interval: str, seconds: float):
+    if not METRICS_ENABLED:
+        return
+    candle_to_commit_seconds.observe(interval, max(0.0, seconds))
+
+
+def register_collector(name: str, fn):
+    _collectors[name] = fn
+
+
+def render() -> str:
+    lines = stage_seconds.render() + candle_to_commit_seconds.render()
+    for name, fn in _collectors.items():
+        try:
+            values = fn()
+        except Exception as e:
+            logger.warning(f"⚠️ Metrics collector failed ({name}): {e}")
+            continue
+        for key, v in values.items():
+            if isinstance(v, (int, float)):
+                metric = _NAME_RE.sub("_", f"{PREFIX}_{name}_{key}")
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {int(v) if isinstance(v, bool) else v}")
+    return "\n".join(lines) + "\n"
+
+
+async def _handle(reader, writer):
+    try:
+        request = await asyncio.wait_for(reader.readline(), timeout=5)
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request.decode("latin-1").split()
+        path = parts[1].split("?", 1)[0] if len(parts) > 1 else "/"
+        if path == "/metrics":
+            status, body = "200 OK", render()
+        else:
+            status, body = "404 Not Found", "not found\n"
+        data = body.encode()
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(port: int = METRICS_PORT):
+    """Serves /metrics when METRICS_PORT is set; returns the server or None."""
+    if not METRICS_ENABLED:
+        return None
+    server = await asyncio.start_server(_handle, host=METRICS_HOST, port=port)
+    logger.info(f"📈 Metrics: http://{METRICS_HOST}:{port}/metrics")
+    return server
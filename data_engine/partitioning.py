@@ -0,0 +1,528 @@
+"""
+Mum tablolarının (binance_data, binance_futures) aylık partition yönetimi.
+
+Yapı (tablo başına):
+    binance_data                      PARTITION BY RANGE ("timestamp")
+    ├── binance_data_p2024_01         FOR VALUES FROM ('2024-01-01') TO ('2024-02-01'), PARTITION BY LIST ("interval")
+    │   ├── binance_data_p2024_01_1m  FOR VALUES IN ('1m')
+    │   └── binance_data_p2024_01_htf DEFAULT (1m dışındaki tüm intervaller)
+    ├── ...
+    └── binance_data_pdefault         DEFAULT (henüz partition'ı olmayan aylar için emniyet)
+
+- `ORDER BY timestamp DESC LIMIT n` sorguları ay partition'larını sıralı tarar,
+  yeterli satır bulunca eski aylara hiç dokunmaz.
+- Bakım görevi (run_unified, PARTITION_MAINTENANCE_ENABLED) gelecek ayları önceden açar;
+  default partition'a düşmüş satırlar ay açılırken oraya taşınır.
+- Retention: PARTITION_1M_RETENTION_MONTHS'tan eski ayların sadece 1m partition'ı
+  detach edilip DROP edilir ya da arşiv şemasına taşınır; üst intervaller kalır.
+- Compaction (opsiyonel): kapanmış ayların leaf partition'ları unique index'e göre
+  CLUSTER edilir (coin bazlı okumalar ardışık sayfalara denk gelir).
+
+Mevcut (partition'sız) tabloyu online dönüştürme:
+    python -m data_engine.partitioning migrate --table binance_data --chunk 50000
+    python -m data_engine.partitioning swap --table binance_data
+    python -m data_engine.partitioning status
+    python -m data_engine.partitioning maintain
+
+migrate: <tablo>_part isimli partitioned tabloyu kurar, eski tabloya yazılanları
+trigger ile aynalar ve mevcut satırları id aralıklarıyla, her biri kendi
+transaction'ında kopyalar (kaldığı yerden devam eder). swap: kısa bir ACCESS
+EXCLUSIVE kilidiyle tabloların adlarını değiştirir; eski tablo <tablo>_legacy olarak kalır.
+"""
+import argparse
+import asyncio
+import os
+import re
+from datetime import datetime
+
+from data_engine.config import (
+    PARTITION_PREMAKE_MONTHS,
+    PARTITION_1M_RETENTION_MONTHS,
+    PARTITION_RETENTION_MODE,
+    PARTITION_ARCHIVE_SCHEMA,
+    PARTITION_COMPACT_ENABLED,
+    PARTITION_MAINTENANCE_INTERVAL_SEC,
+)
+from data_engine.intervals import from_ms
+
+CANDLE_TABLES = ("binance_data", "binance_futures")
+CANDLE_COLUMNS = ["id", "coin_id", "interval", "timestamp", "open", "high", "low", "close", "volume"]
+MIGRATION_STATE_TABLE = "candle_partition_migration"
+
+_COLS = ", ".join(f'"{c}"' for c in CANDLE_COLUMNS)
+_KEY = '(coin_id, "interval", "timestamp")'
+
+
+# ---------------- ay yardımcıları ----------------
+def month_start(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1)
+
+
+def add_months(dt: datetime, n: int) -> datetime:
+    m = dt.year * 12 + dt.month - 1 + n
+    return datetime(m // 12, m % 12 + 1, 1)
+
+
+def month_range(start: datetime, end: datetime):
+    """start ve end'i içeren ayların başlangıçları."""
+    m, last = month_start(start), month_start(end)
+    while m <= last:
+        yield m
+        m = add_months(m, 1)
+
+
+def partition_name(base: str, month: datetime) -> str:
+    return f"{base}_p{month.year:04d}_{month.month:02d}"
+
+
+def default_partition_name(base: str) -> str:
+    return f"{base}_pdefault"
+
+
+# ---------------- katalog sorguları ----------------
+async def is_partitioned(conn, table: str) -> bool:
+    return bool(await conn.fetchval(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass($1)", table
+    ))
+
+
+async def existing_months(conn, parent: str, base: str) -> set:
+    rows = await conn.fetch(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass($1)
+        """,
+        parent,
+    )
+    pattern = re.compile(rf"^{re.escape(base)}_p(\d{{4}})_(\d{{2}})$")
+    months = set()
+    for r in rows:
+        m = pattern.match(r["relname"])
+        if m:
+            months.add(datetime(int(m.group(1)), int(m.group(2)), 1))
+    return months
+
+
+# ---------------- partition oluşturma ----------------
+async def create_month_partition(conn, parent: str, month: datetime, base: str | None = None) -> bool:
+    """
+    Ay partition'ını (1m + htf alt partition'larıyla) ayrı bir tablo olarak kurar,
+    default partition'da o aya düşmüş satırları içine taşır ve parent'a ATTACH eder.
+    Zaten varsa False döner.
+    """
+    base = base or parent
+    name = partition_name(base, month)
+    lo, hi = month, add_months(month, 1)
+    default = default_partition_name(base)
+
+    async with conn.transaction():
+        if await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", name):
+            return False
+        await conn.execute(
+            f'CREATE TABLE {name} (LIKE {parent} INCLUDING DEFAULTS) PARTITION BY LIST ("interval")'
+        )
+        await conn.execute(f"CREATE TABLE {name}_1m PARTITION OF {name} FOR VALUES IN ('1m')")
+        await conn.execute(f"CREATE TABLE {name}_htf PARTITION OF {name} DEFAULT")
+
+        if await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", default):
+            moved = await conn.execute(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {default}
+                    WHERE "timestamp" >= $1 AND "timestamp" < $2
+                    RETURNING {_COLS}
+                )
+                INSERT INTO {name} ({_COLS}) SELECT {_COLS} FROM moved
+                """,
+                lo, hi,
+            )
+            count = int(moved.split()[-1])
+            if count:
+                print(f"📦 {default} -> {name}: {count} satır taşındı.")
+
+        await conn.execute(
+            f"ALTER TABLE {parent} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{lo:%Y-%m-%d}') TO ('{hi:%Y-%m-%d}')"
+        )
+    return True
+
+
+async def ensure_partitions(conn, parent: str, start: datetime, end: datetime, base: str | None = None) -> int:
+    """start..end aylarının partition'larını açar (tablo partitioned değilse hiçbir şey yapmaz)."""
+    if not await is_partitioned(conn, parent):
+        return 0
+    base = base or parent
+    have = await existing_months(conn, parent, base)
+    created = 0
+    for month in month_range(start, end):
+        if month not in have and await create_month_partition(conn, parent, month, base):
+            created += 1
+    return created
+
+
+async def ensure_partitions_for_rows(conn, parent: str, rows) -> int:
+    """rows: (coin_id, interval, open_ms, ...) — backfill gibi eski aylara yazan yollar için."""
+    if not rows:
+        return 0
+    open_ms = [r[2] for r in rows]
+    return await ensure_partitions(conn, parent, from_ms(min(open_ms)), from_ms(max(open_ms)))
+
+
+# ---------------- retention / compaction ----------------
+async def apply_retention(conn, table: str, keep_months: int, mode: str = PARTITION_RETENTION_MODE,
+                          archive_schema: str = PARTITION_ARCHIVE_SCHEMA, now: datetime | None = None):
+    """keep_months'tan eski ayların 1m partition'ını detach edip DROP eder ya da arşive taşır."""
+    if keep_months <= 0 or mode not in ("drop", "archive"):
+        return []
+    now = now or datetime.utcnow()
+    cutoff = add_months(month_start(now), -keep_months)
+
+    done = []
+    for month in sorted(await existing_months(conn, table, table)):
+        if month >= cutoff:
+            break
+        name = partition_name(table, month)
+        leaf = f"{name}_1m"
+        attached = await conn.fetchval(
+            "SELECT EXISTS (SELECT 1 FROM pg_inherits WHERE inhparent = to_regclass($1) AND inhrelid = to_regclass($2))",
+            name, leaf,
+        )
+        if not attached:
+            continue
+        async with conn.transaction():
+            await conn.execute(f"ALTER TABLE {name} DETACH PARTITION {leaf}")
+            if mode == "drop":
+                await conn.execute(f"DROP TABLE {leaf}")
+            else:
+                await conn.execute(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}")
+                await conn.execute(f"ALTER TABLE {leaf} SET SCHEMA {archive_schema}")
+        done.append(leaf)
+        print(f"🗄️ {leaf}: 1m retention ({mode}).")
+    return done
+
+
+async def compact_closed_months(conn, table: str, now: datetime | None = None):
+    """
+    Kapanmış (bir aylık pay bırakılarak) ayların leaf partition'larını unique index'e göre
+    CLUSTER eder. Leaf üzerinde ACCESS EXCLUSIVE kilit alır; işlenenler COMMENT ile işaretlenir.
+    """
+    now = now or datetime.utcnow()
+    closed_before = add_months(month_start(now), -1)
+
+    done = []
+    for month in sorted(await existing_months(conn, table, table)):
+        if month >= closed_before:
+            break
+        for leaf in (f"{partition_name(table, month)}_1m", f"{partition_name(table, month)}_htf"):
+            row = await conn.fetchrow(
+                """
+                SELECT obj_description(c.oid, 'pg_class') AS note,
+                       (SELECT i.indexrelid::regclass::text FROM pg_index i
+                        WHERE i.indrelid = c.oid AND i.indisunique LIMIT 1) AS index_name
+                FROM pg_class c WHERE c.oid = to_regclass($1)
+                """,
+                leaf,
+            )
+            if row is None or row["index_name"] is None or (row["note"] or "").startswith("compacted"):
+                continue
+            await conn.execute(f"CLUSTER {leaf} USING {row['index_name']}")
+            await conn.execute(f"ANALYZE {leaf}")
+            await conn.execute(f"COMMENT ON TABLE {leaf} IS 'compacted {now:%Y-%m-%d}'")
+            done.append(leaf)
+            print(f"🧱 {leaf} compact edildi.")
+    return done
+
+
+async def maintain(pool, tables=CANDLE_TABLES, premake_months: int = PARTITION_PREMAKE_MONTHS,
+                   keep_1m_months: int = PARTITION_1M_RETENTION_MONTHS,
+                   compact: bool = PARTITION_COMPACT_ENABLED):
+    now = datetime.utcnow()
+    for table in tables:
+        async with pool.acquire() as conn:
+            if not await is_partitioned(conn, table):
+                continue
+            created = await ensure_partitions(conn, table, add_months(now, -1), add_months(now, premake_months))
+            if created:
+                print(f"🧩 {table}: {created} yeni ay partition'ı açıldı.")
+            await apply_retention(conn, table, keep_1m_months, now=now)
+            if compact:
+                await compact_closed_months(conn, table, now=now)
+
+
+async def run_partition_maintenance(pool, interval_sec: float = PARTITION_MAINTENANCE_INTERVAL_SEC):
+    """run_unified içinden çalışan periyodik bakım görevi."""
+    while True:
+        try:
+            await maintain(pool)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Partition bakım hatası: {e}")
+        await asyncio.sleep(interval_sec)
+
+
+# ---------------- online migration ----------------
+async def _ensure_state_table(conn):
+    await conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATION_STATE_TABLE} (
+            table_name varchar(63) PRIMARY KEY,
+            last_id    bigint      NOT NULL DEFAULT 0,
+            max_id     bigint      NOT NULL DEFAULT 0,
+            started_at timestamp   NOT NULL DEFAULT now(),
+            swapped_at timestamp
+        )
+        """
+    )
+
+
+async def _unique_constraint(conn, table: str):
+    return await conn.fetchval(
+        """
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = to_regclass($1) AND contype IN ('u', 'p')
+          AND array_length(conkey, 1) = 3
+        LIMIT 1
+        """,
+        table,
+    )
+
+
+async def _create_shadow(conn, table: str, shadow: str):
+    """Partitioned gölge tabloyu, index'lerini, default partition'ı ve aynalama trigger'ını kurar."""
+    async with conn.transaction():
+        await conn.execute(
+            f'CREATE TABLE {shadow} (LIKE {table} INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")'
+        )
+        await conn.execute(f"ALTER TABLE {shadow} ADD CONSTRAINT {shadow}_key UNIQUE {_KEY}")
+
+        # Unique olmayan ek index'ler (ör. timestamp) gölge tabloda da olsun
+        indexdefs = await conn.fetch(
+            """
+            SELECT pg_get_indexdef(i.indexrelid) AS def, c.relname AS name
+            FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = to_regclass($1) AND NOT i.indisunique
+            """,
+            table,
+        )
+        for r in indexdefs:
+            ddl = re.sub(
+                r"^CREATE INDEX \S+ ON (ONLY )?\S+",
+                f"CREATE INDEX {r['name']}_part ON {shadow}",
+                r["def"],
+            )
+            await conn.execute(ddl)
+
+        await conn.execute(
+            f"CREATE TABLE {default_partition_name(table)} PARTITION OF {shadow} DEFAULT"
+        )
+
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in ("open", "high", "low", "close", "volume"))
+        new_values = ", ".join(f'NEW."{c}"' for c in CANDLE_COLUMNS)
+        await conn.execute(
+            f"""
+            CREATE OR REPLACE FUNCTION {shadow}_mirror()
+            RETURNS trigger
+            LANGUAGE plpgsql
+            AS $function$
+            BEGIN
+                IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                    DELETE FROM {shadow}
+                    WHERE coin_id = OLD.coin_id AND "interval" = OLD."interval" AND "timestamp" = OLD."timestamp";
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO {shadow} ({_COLS}) VALUES ({new_values})
+                    ON CONFLICT {_KEY} DO UPDATE SET {updates};
+                END IF;
+                RETURN NULL;
+            END;
+            $function$
+            """
+        )
+        # CREATE TRIGGER süren yazma işlemlerini bekler; sonrasındaki her yazma aynalanır
+        await conn.execute(
+            f"""
+            CREATE TRIGGER {shadow}_mirror
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {shadow}_mirror()
+            """
+        )
+
+
+async def migrate_table(pool, table: str, chunk: int = 50_000, pause: float = 0.0,
+                        premake_months: int = PARTITION_PREMAKE_MONTHS):
+    shadow = f"{table}_part"
+    async with pool.acquire() as conn:
+        if await is_partitioned(conn, table):
+            print(f"✅ {table} zaten partitioned.")
+            return False
+        await _ensure_state_table(conn)
+
+        if not await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", shadow):
+            await _create_shadow(conn, table, shadow)
+            max_id = await conn.fetchval(f"SELECT coalesce(max(id), 0) FROM {table}")
+            await conn.execute(
+                f"""
+                INSERT INTO {MIGRATION_STATE_TABLE} (table_name, last_id, max_id) VALUES ($1, 0, $2)
+                ON CONFLICT (table_name) DO UPDATE SET last_id = 0, max_id = EXCLUDED.max_id,
+                                                       started_at = now(), swapped_at = NULL
+                """,
+                table, max_id,
+            )
+            print(f"🧩 {shadow} kuruldu, aynalama trigger'ı aktif (kopyalanacak id <= {max_id}).")
+
+        state = await conn.fetchrow(
+            f"SELECT last_id, max_id FROM {MIGRATION_STATE_TABLE} WHERE table_name = $1", table
+        )
+        last_id, max_id = state["last_id"], state["max_id"]
+        now = datetime.utcnow()
+        await ensure_partitions(conn, shadow, add_months(now, -1), add_months(now, premake_months), base=table)
+
+        while last_id < max_id:
+            upper = min(last_id + chunk, max_id)
+            lo, hi = await conn.fetchrow(
+                f'SELECT min("timestamp"), max("timestamp") FROM {table} WHERE id > $1 AND id <= $2',
+                last_id, upper,
+            )
+            if lo is not None:
+                await ensure_partitions(conn, shadow, lo, hi, base=table)
+            async with conn.transaction():
+                # Aynalanmış satırlar daha yeni; onların üstüne yazılmaz
+                copied = await conn.execute(
+                    f"""
+                    INSERT INTO {shadow} ({_COLS})
+                    SELECT {_COLS} FROM {table} WHERE id > $1 AND id <= $2
+                    ON CONFLICT {_KEY} DO NOTHING
+                    """,
+                    last_id, upper,
+                )
+                await conn.execute(
+                    f"UPDATE {MIGRATION_STATE_TABLE} SET last_id = $2 WHERE table_name = $1", table, upper
+                )
+            last_id = upper
+            print(f"  {table}: id {last_id}/{max_id} ({int(copied.split()[-1])} satır)")
+            if pause:
+                await asyncio.sleep(pause)
+
+    print(f"✅ {table} kopyalama tamamlandı; `swap` ile geçiş yapılabilir.")
+    return True
+
+
+async def swap_table(pool, table: str, lock_timeout_sec: float = 5.0, attempts: int = 10):
+    """Gölge tabloyu asıl isme alır; eski tablo <table>_legacy olur. Trigger'lar yeni tabloda yeniden kurulur."""
+    shadow = f"{table}_part"
+    legacy = f"{table}_legacy"
+    async with pool.acquire() as conn:
+        state = await conn.fetchrow(
+            f"SELECT last_id, max_id, swapped_at FROM {MIGRATION_STATE_TABLE} WHERE table_name = $1", table
+        )
+        if state is None or state["swapped_at"] is not None:
+            print(f"⚠ {table}: swap edilecek migration yok.")
+            return False
+        if state["last_id"] < state["max_id"]:
+            print(f"⚠ {table}: kopyalama bitmemiş ({state['last_id']}/{state['max_id']}); önce migrate çalıştırın.")
+            return False
+
+        for attempt in range(1, attempts + 1):
+            try:
+                async with conn.transaction():
+                    await conn.execute(f"SET LOCAL lock_timeout = '{int(lock_timeout_sec * 1000)}ms'")
+                    await conn.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+
+                    await conn.execute(f"DROP TRIGGER {shadow}_mirror ON {table}")
+                    await conn.execute(f"DROP FUNCTION {shadow}_mirror()")
+
+                    # Eski tablodaki trigger'lar (ör. dakika hesaplama dispatch'i) yeni tabloda da olsun
+                    triggers = await conn.fetch(
+                        """
+                        SELECT tgname, pg_get_triggerdef(oid) AS def FROM pg_trigger
+                        WHERE tgrelid = to_regclass($1) AND NOT tgisinternal
+                        """,
+                        table,
+                    )
+                    constraint = await _unique_constraint(conn, table)
+                    seq = await conn.fetchval("SELECT pg_get_serial_sequence($1, 'id')", table)
+
+                    await conn.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+                    await conn.execute(f"ALTER TABLE {shadow} RENAME TO {table}")
+                    if constraint:
+                        await conn.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT {constraint} TO {constraint}_legacy")
+                        await conn.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {shadow}_key TO {constraint}")
+                    if seq:
+                        await conn.execute(f"ALTER SEQUENCE {seq} OWNED BY {table}.id")
+                    for t in triggers:
+                        await conn.execute(f"DROP TRIGGER {t['tgname']} ON {legacy}")
+                        await conn.execute(
+                            re.sub(rf" ON (\S+\.)?{re.escape(table)} ", f" ON {table} ", t["def"], count=1)
+                        )
+
+                    await conn.execute(
+                        f"UPDATE {MIGRATION_STATE_TABLE} SET swapped_at = now() WHERE table_name = $1", table
+                    )
+                print(f"✅ {table} artık partitioned. Eski veri {legacy} tablosunda; kontrol sonrası DROP edilebilir.")
+                return True
+            except Exception as e:
+                if "lock timeout" not in str(e):
+                    raise
+                print(f"⏳ {table} kilidi alınamadı (deneme {attempt}/{attempts}), tekrar denenecek...")
+                await asyncio.sleep(1)
+    return False
+
+
+async def status(pool, tables=CANDLE_TABLES):
+    async with pool.acquire() as conn:
+        for table in tables:
+            if not await is_partitioned(conn, table):
+                print(f"{table}: partitioned değil")
+                continue
+            rows = await conn.fetch(
+                """
+                SELECT c.relname, c.reltuples::bigint AS est,
+                       pg_total_relation_size(c.oid) AS bytes
+                FROM pg_partition_tree(to_regclass($1)) t
+                JOIN pg_class c ON c.oid = t.relid
+                WHERE t.isleaf
+                ORDER BY c.relname
+                """,
+                table,
+            )
+            print(f"{table}: {len(rows)} leaf partition")
+            for r in rows:
+                print(f"  {r['relname']:<36} ~{max(r['est'], 0):>12,} satır {r['bytes'] / 2**20:>10.1f} MB")
+
+
+async def _main(args):
+    import asyncpg
+
+    dsn = os.getenv("DATABASE_URL", "").replace("postgresql+asyncpg://", "postgresql://")
+    pool = await asyncpg.create_pool(dsn, min_size=1, max_size=2)
+    tables = [args.table] if args.table else list(CANDLE_TABLES)
+    try:
+        if args.command == "migrate":
+            for table in tables:
+                if await migrate_table(pool, table, chunk=args.chunk, pause=args.pause) and args.swap:
+                    await swap_table(pool, table)
+        elif args.command == "swap":
+            for table in tables:
+                await swap_table(pool, table)
+        elif args.command == "maintain":
+            await maintain(pool, tables=tables)
+        else:
+            await status(pool, tables=tables)
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Mum tabloları için aylık partition yönetimi")
+    parser.add_argument("command", choices=["migrate", "swap", "maintain", "status"])
+    parser.add_argument("--table", choices=list(CANDLE_TABLES))
+    parser.add_argument("--chunk", type=int, default=50_000, help="kopyalama başına id aralığı")
+    parser.add_argument("--pause", type=float, default=0.0, help="chunk'lar arası bekleme (sn)")
+    parser.add_argument("--swap", action="store_true", help="kopyalama bitince hemen swap et")
+    asyncio.run(_main(parser.parse_args()))
@@ -3,162 +3,422 @@ import time
 from datetime import datetime
 import logging
 
+from data_engine.config import (
+    KLINE_WRITER_MODE,
+    KLINE_WRITER_BATCH_SIZE,
+    KLINE_WRITER_FLUSH_INTERVAL,
+    KLINE_QUEUE_MAXSIZE,
+    KLINE_SPILL_ENABLED,
+    KLINE_SPILL_DIR,
+    KLINE_SPILL_SEGMENT_MB,
+    KLINE_SPILL_MAX_MB,
+    KLINE_NOTIFY_MODE,
+    CANDLE_FEED_ENABLED,
+)
+from data_engine.spill_journal import SpillJournal
+from data_engine.completeness import completeness_tracker
+from data_engine.candle_feed import candle_feed_publisher
+from data_engine.intervals import INTERVAL_MS
+from data_engine import metrics
+
+
+class KlineQueue:
+    """
+    Bounded asyncio.Queue backed by an on-disk SpillJournal.
+
+    Producers call `offer()`, which never blocks: when the in-memory queue is
+    full (or older items are still on disk) the item is appended to the
+    journal instead, so ordering is preserved. `replay_spilled()` moves
+    journaled items back into memory once the writer has caught up.
+    Items are only dropped when the journal itself is full or unwritable.
+    """
+
+    def __init__(self, maxsize: int, journal: SpillJournal | None = None):
+        self.maxsize = maxsize
+        self.journal = journal
+        self._queue = asyncio.Queue(maxsize=maxsize)
+
+        # Counters (candles)
+        self.spilled = 0
+        self.replayed = 0
+        self.dropped = 0
+
+    def offer(self, item) -> bool:
+        """Returns False only if the item had to be dropped."""
+        journal = self.journal
+        if journal is not None and (journal.has_pending() or self._queue.full()):
+            if journal.append(item):
+                self.spilled += 1
+                return True
+            self.dropped += 1
+            return False
+
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    async def get(self):
+        return await self._queue.get()
+
+    def get_nowait(self):
+        return self._queue.get_nowait()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "spill_pending": self.journal.pending if self.journal else 0,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "dropped": self.dropped,
+        }
+
+    async def replay_spilled(self, low_watermark: float = 0.5, poll_interval: float = 0.05):
+        """
+        Background task: when the in-memory queue drops below `low_watermark`
+        of its capacity, refill it from the journal in write order.
+        """
+        if self.journal is None:
+            return
+
+        threshold = int(self.maxsize * low_watermark)
+        while True:
+            try:
+                if self.journal.has_pending() and self._queue.qsize() < threshold:
+                    room = self.maxsize - self._queue.qsize()
+                    items, corrupt = self.journal.read_batch(room)
+                    for item in items:
+                        self._queue.put_nowait(item)
+                    self.replayed += len(items)
+                    self.dropped += corrupt
+                    if items:
+                        continue
+            except Exception as e:
+                print(f"❌ Spill replay error: {e}")
+            await asyncio.sleep(poll_interval)
+
+
 # ✅ Shared Global Data Queue
-# Item structure: (source_type, coin_id, interval, timestamp, open, high, low, close, volume)
+# Item structure: (source_type, coin_id, interval, open_ms, open, high, low, close, volume)
+# open_ms stays an integer epoch ms until the upsert SQL turns it into a timestamp
 # source_type: 'spot' or 'futures'
-data_queue = asyncio.Queue(maxsize=20000) # Increased size for combined traffic
+data_queue = KlineQueue(
+    maxsize=KLINE_QUEUE_MAXSIZE,
+    journal=SpillJournal(
+        KLINE_SPILL_DIR,
+        segment_max_bytes=KLINE_SPILL_SEGMENT_MB * 1024 * 1024,
+        max_total_bytes=KLINE_SPILL_MAX_MB * 1024 * 1024,
+    ) if KLINE_SPILL_ENABLED else None,
+)
 
-async def process_shared_queue(db_pool):
+# source -> (candle table, last price table, notify channel)
+MARKET_TABLES = {
+    'spot': ("binance_data", "binance_last_price", "new_data"),
+    'futures': ("binance_futures", "binance_futures_last_price", "new_futures_data"),
+}
+
+# Staging/COPY columns; the open time travels as epoch ms and becomes a timestamp inside the merge
+KLINE_COLUMNS = ["coin_id", "interval", "open_ms", "open", "high", "low", "close", "volume"]
+
+# Epoch ms -> `timestamp without time zone` (UTC), evaluated by Postgres
+MS_TO_TIMESTAMP = "(timestamp 'epoch' + {} * interval '1 millisecond')"
+
+WRITER_MODES = ("executemany", "copy")
+
+
+def staging_table_name(candle_table: str) -> str:
+    return f"{candle_table}_staging"
+
+
+async def ensure_staging_table(conn, candle_table: str, staging: str | None = None):
+    """
+    Creates the UNLOGGED staging table used by the COPY writer.
+    `seq` keeps arrival order so the merge can pick the newest duplicate.
+    """
+    staging = staging or staging_table_name(candle_table)
+    # Older staging tables had a "timestamp" column; the table is scratch, so just recreate it
+    has_open_ms = await conn.fetchval(
+        """
+        SELECT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = $1 AND column_name = 'open_ms'
+        )
+        """,
+        staging,
+    )
+    if not has_open_ms:
+        await conn.execute(f"DROP TABLE IF EXISTS {staging}")
+    await conn.execute(
+        f"""
+        CREATE UNLOGGED TABLE IF NOT EXISTS {staging} (
+            seq         bigserial,
+            coin_id     varchar(50)      NOT NULL,
+            "interval"  varchar(10)      NOT NULL,
+            open_ms     bigint           NOT NULL,
+            open        double precision NOT NULL,
+            high        double precision NOT NULL,
+            low         double precision NOT NULL,
+            close       double precision NOT NULL,
+            volume      double precision NOT NULL
+        )
+        """
+    )
+
+
+def latest_close_rows(rows):
+    """
+    rows: (coin_id, interval, open_ms, open, high, low, close, volume)
+    Returns the newest (coin_id, interval, open_ms, close) per (coin_id, interval).
+    """
+    latest_map = {}
+    for item in rows:
+        key = (item[0], item[1])
+        if key not in latest_map or item[2] > latest_map[key][2]:
+            latest_map[key] = item
+
+    return [
+        (item[0], item[1], item[2], item[6])
+        for item in latest_map.values()
+    ]
+
+
+async def upsert_klines_executemany(conn, rows, candle_table: str, last_price_table: str,
+                                    update_last_price: bool = True):
+    """Legacy path: one INSERT ... ON CONFLICT per row through executemany."""
+    await conn.executemany(
+        f"""
+        INSERT INTO {candle_table}
+          (coin_id, interval, "timestamp", open, high, low, close, volume)
+        VALUES ($1, $2, {MS_TO_TIMESTAMP.format("$3::bigint")}, $4, $5, $6, $7, $8)
+        ON CONFLICT (coin_id, interval, "timestamp") DO UPDATE
+        SET
+            open = EXCLUDED.open,
+            high = EXCLUDED.high,
+            low = EXCLUDED.low,
+            close = EXCLUDED.close,
+            volume = EXCLUDED.volume
+        """,
+        rows
+    )
+
+    last_price_batch = latest_close_rows(rows) if update_last_price else []
+    if last_price_batch:
+        await conn.executemany(
+            f"""
+            INSERT INTO {last_price_table} (coin_id, "interval", "timestamp", close)
+            VALUES ($1, $2, {MS_TO_TIMESTAMP.format("$3::bigint")}, $4)
+            ON CONFLICT (coin_id, "interval") DO UPDATE
+            SET "timestamp" = EXCLUDED."timestamp",
+                close       = EXCLUDED.close
+            WHERE EXCLUDED."timestamp" > {last_price_table}."timestamp"
+            """,
+            last_price_batch
+        )
+
+
+async def upsert_klines_copy(conn, rows, candle_table: str, last_price_table: str,
+                             update_last_price: bool = True, staging: str | None = None):
+    """
+    COPY path: streams the batch into the unlogged staging table and merges it
+    into the target (and the last price table) with one set-based upsert each.
+    Must run inside a transaction; the staging table is emptied per flush.
+    update_last_price=False skips the last price table (historical backfill);
+    `staging` lets another writer use its own staging table instead of
+    contending for the live writer's TRUNCATE lock.
+    """
+    staging = staging or staging_table_name(candle_table)
+
+    await conn.execute(f"TRUNCATE {staging}")
+    await conn.copy_records_to_table(staging, records=rows, columns=KLINE_COLUMNS)
+
+    # DISTINCT ON: a single INSERT ... ON CONFLICT cannot touch the same row twice
+    await conn.execute(
+        f"""
+        INSERT INTO {candle_table}
+          (coin_id, interval, "timestamp", open, high, low, close, volume)
+        SELECT DISTINCT ON (coin_id, "interval", open_ms)
+               coin_id, "interval", {MS_TO_TIMESTAMP.format("open_ms")},
+               open::numeric, high::numeric, low::numeric, close::numeric, volume::numeric
+        FROM {staging}
+        ORDER BY coin_id, "interval", open_ms, seq DESC
+        ON CONFLICT (coin_id, interval, "timestamp") DO UPDATE
+        SET
+            open = EXCLUDED.open,
+            high = EXCLUDED.high,
+            low = EXCLUDED.low,
+            close = EXCLUDED.close,
+            volume = EXCLUDED.volume
+        """
+    )
+
+    if not update_last_price:
+        return
+
+    await conn.execute(
+        f"""
+        INSERT INTO {last_price_table} (coin_id, "interval", "timestamp", close)
+        SELECT DISTINCT ON (coin_id, "interval")
+               coin_id, "interval", {MS_TO_TIMESTAMP.format("open_ms")}, close::numeric
+        FROM {staging}
+        ORDER BY coin_id, "interval", open_ms DESC, seq DESC
+        ON CONFLICT (coin_id, "interval") DO UPDATE
+        SET "timestamp" = EXCLUDED."timestamp",
+            close       = EXCLUDED.close
+        WHERE EXCLUDED."timestamp" > {last_price_table}."timestamp"
+        """
+    )
+
+
+UPSERT_FUNCS = {
+    "executemany": upsert_klines_executemany,
+    "copy": upsert_klines_copy,
+}
+
+
+def split_by_source(batch):
+    """
+    item: (source, coin_id, interval, open_ms, open, high, low, close, volume)
+    Returns {source: [(coin_id, interval, open_ms, open, high, low, close, volume), ...]}
+    """
+    by_source = {}
+    for item in batch:
+        source = item[0]
+        if source in MARKET_TABLES:
+            by_source.setdefault(source, []).append(item[1:]) # original tuple part
+    return by_source
+
+
+def observe_flush(by_source, seconds: float, now: float | None = None):
+    """Records the flush duration and, per interval, how long after candle close the newest candle was committed."""
+    now = time.time() if now is None else now
+    metrics.observe("flush", seconds)
+    newest = {}  # interval -> open_ms
+    for rows in by_source.values():
+        for row in rows:
+            interval, open_ms = row[1], row[2]
+            if open_ms > newest.get(interval, -1):
+                newest[interval] = open_ms
+    for interval, open_ms in newest.items():
+        length = INTERVAL_MS.get(interval)
+        if length:
+            metrics.observe_commit_lag(interval, now - (open_ms + length) / 1000)
+
+
+async def process_shared_queue(db_pool, mode: str = KLINE_WRITER_MODE,
+                               notify_mode: str = KLINE_NOTIFY_MODE):
     """
     Consumer: Reads from the shared `data_queue`, separates data by source,
     and performs batch inserts into the respective tables.
+
+    mode: "executemany" (legacy) or "copy" (staging table + set-based upsert)
+    notify_mode: "watermark" (completeness tracker) or "leader" (BTCUSDT-triggered)
     """
-    print("🚀 Shared DB Writer (Consumer) Started...")
-    
-    batch_size = 200  # Combined batch size
-    flush_interval = 1.0 # Max wait time (seconds)
-    
+    if mode not in WRITER_MODES:
+        print(f"⚠️ Unknown writer mode '{mode}', falling back to 'executemany'.")
+        mode = "executemany"
+    upsert = UPSERT_FUNCS[mode]
+
+    if mode == "copy":
+        async with db_pool.acquire() as conn:
+            for candle_table, _, _ in MARKET_TABLES.values():
+                await ensure_staging_table(conn, candle_table)
+
+    if notify_mode == "watermark":
+        try:
+            await completeness_tracker.refresh_expected(db_pool)
+        except Exception as e:
+            print(f"⚠️ Completeness expected set not loaded yet: {e}")
+    elif notify_mode != "leader":
+        print(f"⚠️ Unknown notify mode '{notify_mode}', falling back to 'leader'.")
+        notify_mode = "leader"
+
+    if CANDLE_FEED_ENABLED:
+        await candle_feed_publisher.ensure_schema(db_pool)
+
+    print(f"🚀 Shared DB Writer (Consumer) Started... (mode: {mode}, notify: {notify_mode}, "
+          f"candle feed: {'on' if CANDLE_FEED_ENABLED else 'off'})")
+
+    batch_size = KLINE_WRITER_BATCH_SIZE  # Combined batch size
+    flush_interval = KLINE_WRITER_FLUSH_INTERVAL # Max wait time (seconds)
+
     batch = []
     last_flush = time.time()
-    
+
     while True:
         try:
             # 1. Get data from queue
             try:
                 item = await asyncio.wait_for(data_queue.get(), timeout=0.1)
                 batch.append(item)
+                # Drain whatever is already queued without paying wait_for per item
+                while len(batch) < batch_size:
+                    try:
+                        batch.append(data_queue.get_nowait())
+                    except asyncio.QueueEmpty:
+                        break
             except asyncio.TimeoutError:
                 pass # No data, continue to check flush conditions
-            
+
             current_time = time.time()
-            
+
             # 2. Flush if batch is full or time is up
             if len(batch) >= batch_size or (batch and current_time - last_flush >= flush_interval):
+                by_source = split_by_source(batch)
+                flush_started = time.perf_counter()
+
                 async with db_pool.acquire() as conn:
                     async with conn.transaction():
-                        
-                        # Separate batches
-                        spot_batch = []
-                        futures_batch = []
-                        
-                        # item: (source, coin_id, interval, timestamp, open, high, low, close, volume)
-                        for item in batch:
-                            source = item[0]
-                            data = item[1:] # original tuple part
-                            if source == 'spot':
-                                spot_batch.append(data)
-                            elif source == 'futures':
-                                futures_batch.append(data)
-                        
-                        # --- SPOT INSERT ---
-                        if spot_batch:
-                            await conn.executemany(
-                                """
-                                INSERT INTO binance_data
-                                  (coin_id, interval, "timestamp", open, high, low, close, volume)
-                                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                                ON CONFLICT (coin_id, interval, "timestamp") DO UPDATE 
-                                SET 
-                                    open = EXCLUDED.open,
-                                    high = EXCLUDED.high,
-                                    low = EXCLUDED.low,
-                                    close = EXCLUDED.close,
-                                    volume = EXCLUDED.volume
-                                """,
-                                spot_batch
-                            )
-                            
-                            # Spot Last Price
-                            latest_map_spot = {}
-                            for item in spot_batch:
-                                # item: (coin_id, interval, timestamp, open, high, low, close, volume)
-                                key = (item[0], item[1])
-                                if key not in latest_map_spot or item[2] > latest_map_spot[key][2]:
-                                    latest_map_spot[key] = item
-                            
-                            last_price_batch_spot = [
-                                (item[0], item[1], item[2], item[6]) 
-                                for item in latest_map_spot.values()
-                            ]
-                            
-                            if last_price_batch_spot:
-                                await conn.executemany(
-                                    """
-                                    INSERT INTO binance_last_price (coin_id, "interval", "timestamp", close)
-                                    VALUES ($1, $2, $3, $4)
-                                    ON CONFLICT (coin_id, "interval") DO UPDATE
-                                    SET "timestamp" = EXCLUDED."timestamp",
-                                        close       = EXCLUDED.close
-                                    WHERE EXCLUDED."timestamp" > binance_last_price."timestamp"
-                                    """,
-                                    last_price_batch_spot
-                                )
-
-                        # --- FUTURES INSERT ---
-                        if futures_batch:
-                            await conn.executemany(
-                                """
-                                INSERT INTO binance_futures
-                                  (coin_id, interval, "timestamp", open, high, low, close, volume)
-                                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                                ON CONFLICT (coin_id, interval, "timestamp") DO UPDATE 
-                                SET 
-                                    open = EXCLUDED.open,
-                                    high = EXCLUDED.high,
-                                    low = EXCLUDED.low,
-                                    close = EXCLUDED.close,
-                                    volume = EXCLUDED.volume
-                                """,
-                                futures_batch
-                            )
-                            
-                            # Futures Last Price
-                            latest_map_futures = {}
-                            for item in futures_batch:
-                                key = (item[0], item[1])
-                                if key not in latest_map_futures or item[2] > latest_map_futures[key][2]:
-                                    latest_map_futures[key] = item
-                            
-                            last_price_batch_futures = [
-                                (item[0], item[1], item[2], item[6]) 
-                                for item in latest_map_futures.values()
-                            ]
-                            
-                            if last_price_batch_futures:
-                                await conn.executemany(
-                                    """
-                                    INSERT INTO binance_futures_last_price (coin_id, "interval", "timestamp", close)
-                                    VALUES ($1, $2, $3, $4)
-                                    ON CONFLICT (coin_id, "interval") DO UPDATE
-                                    SET "timestamp" = EXCLUDED."timestamp",
-                                        close       = EXCLUDED.close
-                                    WHERE EXCLUDED."timestamp" > binance_futures_last_price."timestamp"
-                                    """,
-                                    last_price_batch_futures
-                                )
-
-                        # --- NOTIFICATIONS (Post-Commit Logic moved here) ---
-                        # We send NOTIFY specifically for the intervals present in the batch.
-                        # This triggers the listen_service WITHOUT needing a DB trigger.
-                        
-                        if spot_batch:
-                            # spot_batch item: (coin_id, interval, ...) -> interval is at index 1
-                            # Trigger ONLY on BTCUSDT (Leader) to prevent duplicate notifications
-                            unique_intervals = {row[1] for row in spot_batch if row[0] == 'BTCUSDT'}
-                            for interval in unique_intervals:
-                                await conn.execute(f"NOTIFY new_data, '{interval}'")
-
-                        if futures_batch:
-                            # futures_batch item: (coin_id, interval, ...) -> interval is at index 1
-                            # Trigger ONLY on BTCUSDT (Leader)
-                            unique_intervals = {row[1] for row in futures_batch if row[0] == 'BTCUSDT'}
-                            for interval in unique_intervals:
-                                await conn.execute(f"NOTIFY new_futures_data, '{interval}'")
-
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] 💾 Batch Persisted: {len(batch)} items (Spot: {len(spot_batch)}, Futures: {len(futures_batch)})")
+                        for source, rows in by_source.items():
+                            candle_table, last_price_table, channel = MARKET_TABLES[source]
+                            await upsert(conn, rows, candle_table, last_price_table)
+
+                        if notify_mode == "leader":
+                            # Legacy: NOTIFY whenever BTCUSDT (leader) is in the batch
+                            for source, rows in by_source.items():
+                                _, _, channel = MARKET_TABLES[source]
+                                # row: (coin_id, interval, ...) -> interval is at index 1
+                                unique_intervals = {row[1] for row in rows if row[0] == 'BTCUSDT'}
+                                for interval in unique_intervals:
+                                    await conn.execute(f"NOTIFY {channel}, '{interval}'")
+
+                    if CANDLE_FEED_ENABLED:
+                        # Before the tick notification, on the same connection (NOTIFY order is kept)
+                        try:
+                            await candle_feed_publisher.publish(conn, by_source)
+                        except Exception as e:
+                            # Subscribers see the sequence gap and read from the DB instead
+                            print(f"⚠️ Candle feed publish error: {e}")
+
+                    if notify_mode == "watermark":
+                        # Only committed rows count towards completeness
+                        for source, rows in by_source.items():
+                            completeness_tracker.observe(source, rows)
+                        try:
+                            await completeness_tracker.flush(conn)
+                        except Exception as e:
+                            # The batch is committed; unsent watermarks stay pending and are retried
+                            print(f"⚠️ Watermark notify error: {e}")
+
+                if metrics.METRICS_ENABLED:
+                    observe_flush(by_source, time.perf_counter() - flush_started)
+
+                spot_count = len(by_source.get('spot', []))
+                futures_count = len(by_source.get('futures', []))
+                q = data_queue.stats()
+                print(
+                    f"[{datetime.now().strftime('%H:%M:%S')}] 💾 Batch Persisted: {len(batch)} items "
+                    f"(Spot: {spot_count}, Futures: {futures_count}) | "
+                    f"queued={q['queued']} spill_pending={q['spill_pending']} "
+                    f"spilled={q['spilled']} replayed={q['replayed']} dropped={q['dropped']}"
+                )
                 batch = []
                 last_flush = current_time
-                
+
         except Exception as e:
             print(f"❌ Shared DB Writer Error: {e}")
             await asyncio.sleep(1)
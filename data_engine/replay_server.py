@@ -0,0 +1,377 @@
+"""
+Offline Binance market-data replay server (kline + bookTicker) for load tests.
+
+Speaks enough of the Binance websocket protocol for the data_engine collectors
+and the order engine's BinanceStreamer:
+  - ws://host:port/ws                      raw frames, SUBSCRIBE/UNSUBSCRIBE control messages
+  - ws://host:port/ws/<s1>/<s2>/...        raw frames, streams from the path
+  - ws://host:port/stream?streams=a/b      combined frames {"stream": ..., "data": ...}
+
+Traffic is either synthetic (generated for whatever streams clients subscribe
+to) or replayed from a recorded corpus (one raw frame per line, e.g. from
+scripts/bench_kline_decoder.py --record).
+
+Synthetic knobs:
+  --speed N            virtual clock runs N x real time (candles close N x faster)
+  --update-ms MS       partial (unclosed) kline update period per stream, real time
+  --close-spread-ms MS 0 = every candle closes in one burst at the boundary;
+                       >0 spreads the closed frames over that many real ms
+  --book-rate HZ       bookTicker updates per symbol per second
+
+"E" (event time) is the real wall-clock send time, so consumers can measure
+end-to-end latency; "t"/"T" follow the virtual clock.
+
+Symbol count is whatever the clients subscribe to. For data_engine load tests,
+seed the stream catalog of a scratch database with N synthetic symbols:
+    python -m data_engine.replay_server --seed-catalog --symbols 300 --intervals 1m,5m,1h
+
+Pointing services at it:
+    BINANCE_SPOT_WS_URI=ws://127.0.0.1:9900/ws BINANCE_FUTURES_WS_URI=ws://127.0.0.1:9900/ws   (data_engine)
+    BINANCE_SPOT_WS_URL=ws://127.0.0.1:9900/ws BINANCE_FUTURES_WS_URL=ws://127.0.0.1:9900/ws   (BinanceStreamer)
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from urllib.parse import urlsplit, parse_qs
+
+import websockets
+
+from data_engine.intervals import INTERVAL_MS, align_open_time
+
+CLIENT_QUEUE_MAX = 50_000
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class ReplayClient:
+    def __init__(self, ws, combined: bool):
+        self.ws = ws
+        self.combined = combined
+        self.streams = set()
+        self.queue = asyncio.Queue(maxsize=CLIENT_QUEUE_MAX)
+        self.dropped = 0
+
+    def push(self, stream: str, payload: str):
+        frame = f'{{"stream":"{stream}","data":{payload}}}' if self.combined else payload
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def sender(self):
+        while True:
+            frame = await self.queue.get()
+            await self.ws.send(frame)
+
+
+class ReplayHub:
+    """Stream -> subscribed clients; publish() fans a frame out without blocking."""
+
+    def __init__(self):
+        self.clients = set()
+        self.by_stream = {}
+        self.sent = 0
+        self._changed = asyncio.Event()
+
+    def subscribe(self, client: ReplayClient, streams):
+        for s in streams:
+            symbol, _, kind = s.partition("@")
+            s = f"{symbol.lower()}@{kind}"  # "1M" / "bookTicker" are case sensitive
+            client.streams.add(s)
+            self.by_stream.setdefault(s, set()).add(client)
+        self._changed.set()
+
+    def unsubscribe(self, client: ReplayClient, streams):
+        for s in streams:
+            client.streams.discard(s)
+            subs = self.by_stream.get(s)
+            if subs:
+                subs.discard(client)
+                if not subs:
+                    del self.by_stream[s]
+        self._changed.set()
+
+    def remove(self, client: ReplayClient):
+        self.unsubscribe(client, list(client.streams))
+        self.clients.discard(client)
+
+    def streams(self, kind: str):
+        return [s for s in self.by_stream if kind in s]
+
+    def publish(self, stream: str, payload: str):
+        for client in self.by_stream.get(stream, ()):
+            client.push(stream, payload)
+            self.sent += 1
+
+    async def handle(self, ws, path: str | None = None):
+        if path is None:
+            path = ws.request.path
+        parts = urlsplit(path)
+        combined = parts.path.rstrip("/").endswith("/stream")
+        client = ReplayClient(ws, combined)
+        self.clients.add(client)
+
+        initial = []
+        if combined:
+            initial = parse_qs(parts.query).get("streams", [""])[0].split("/")
+        elif parts.path.startswith("/ws/"):
+            initial = parts.path[len("/ws/"):].split("/")
+        self.subscribe(client, [s for s in initial if s])
+
+        sender = asyncio.create_task(client.sender())
+        try:
+            async for msg in ws:
+                try:
+                    req = json.loads(msg)
+                except ValueError:
+                    continue
+                method = req.get("method")
+                params = req.get("params") or []
+                if method == "SUBSCRIBE":
+                    self.subscribe(client, params)
+                elif method == "UNSUBSCRIBE":
+                    self.unsubscribe(client, params)
+                elif method == "LIST_SUBSCRIPTIONS":
+                    await ws.send(json.dumps({"result": sorted(client.streams), "id": req.get("id")}))
+                    continue
+                await ws.send(json.dumps({"result": None, "id": req.get("id")}))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            sender.cancel()
+            self.remove(client)
+
+
+class SyntheticMarket:
+    def __init__(self, hub: ReplayHub, speed: float = 1.0, update_ms: int = 1000,
+                 close_spread_ms: int = 0, book_rate: float = 1.0):
+        self.hub = hub
+        self.speed = speed
+        self.update_ms = update_ms
+        self.close_spread_ms = close_spread_ms
+        self.book_rate = book_rate
+
+        self._real0 = time.time()
+        self._virt0 = _now_ms()
+        self.prices = {}
+        self.klines = {}  # stream -> state dict
+
+        # Counters
+        self.closed = 0
+        self.partial = 0
+
+    def virtual_now(self) -> int:
+        return int(self._virt0 + (time.time() - self._real0) * 1000 * self.speed)
+
+    def _price(self, symbol: str) -> float:
+        p = self.prices.get(symbol)
+        if p is None:
+            p = random.uniform(0.05, 50_000)
+        p *= 1 + random.gauss(0, 0.0005)
+        self.prices[symbol] = p
+        return p
+
+    def _new_kline(self, symbol: str, interval: str, open_ms: int) -> dict:
+        p = self._price(symbol)
+        return {"s": symbol, "i": interval, "t": open_ms, "o": p, "h": p, "l": p, "c": p, "v": 0.0, "n": 0}
+
+    @staticmethod
+    def _kline_payload(k: dict, closed: bool) -> str:
+        step = INTERVAL_MS[k["i"]]
+        return json.dumps({
+            "e": "kline", "E": _now_ms(), "s": k["s"],
+            "k": {
+                "t": k["t"], "T": k["t"] + step - 1, "s": k["s"], "i": k["i"],
+                "f": 0, "L": k["n"], "o": f"{k['o']:.8f}", "c": f"{k['c']:.8f}",
+                "h": f"{k['h']:.8f}", "l": f"{k['l']:.8f}", "v": f"{k['v']:.8f}",
+                "n": k["n"], "x": closed, "q": "0", "V": "0", "Q": "0", "B": "0",
+            },
+        }, separators=(",", ":"))
+
+    async def run_klines(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            vnow = self.virtual_now()
+            closing = []
+            for stream in self.hub.streams("@kline_"):
+                symbol, interval = stream.split("@kline_", 1)
+                if interval not in INTERVAL_MS:
+                    continue
+                k = self.klines.get(stream)
+                if k is None:
+                    k = self.klines[stream] = self._new_kline(symbol.upper(), interval, align_open_time(vnow, interval))
+
+                if vnow >= k["t"] + INTERVAL_MS[interval]:
+                    closing.append((stream, self._kline_payload(k, True)))
+                    k = self.klines[stream] = self._new_kline(k["s"], interval, align_open_time(vnow, interval))
+
+                p = self._price(k["s"])
+                k["c"] = p
+                k["h"] = max(k["h"], p)
+                k["l"] = min(k["l"], p)
+                k["v"] += random.uniform(0, 10)
+                k["n"] += 1
+                self.hub.publish(stream, self._kline_payload(k, False))
+                self.partial += 1
+
+            # Burst: all closes at once; otherwise spread over close_spread_ms
+            for stream, payload in closing:
+                if self.close_spread_ms > 0:
+                    loop.call_later(random.uniform(0, self.close_spread_ms) / 1000, self.hub.publish, stream, payload)
+                else:
+                    self.hub.publish(stream, payload)
+            self.closed += len(closing)
+
+            # Drop state of streams nobody listens to anymore
+            for stream in [s for s in self.klines if s not in self.hub.by_stream]:
+                del self.klines[stream]
+
+            await asyncio.sleep(self.update_ms / 1000)
+
+    async def run_books(self):
+        if self.book_rate <= 0:
+            return
+        while True:
+            for stream in self.hub.streams("@bookTicker"):
+                symbol = stream.split("@", 1)[0].upper()
+                p = self._price(symbol)
+                spread = p * 0.0001
+                self.hub.publish(stream, json.dumps({
+                    "u": _now_ms(), "s": symbol,
+                    "b": f"{p - spread:.8f}", "B": f"{random.uniform(0, 100):.3f}",
+                    "a": f"{p + spread:.8f}", "A": f"{random.uniform(0, 100):.3f}",
+                    "E": _now_ms(),
+                }, separators=(",", ":")))
+            await asyncio.sleep(1 / self.book_rate)
+
+
+class CorpusReplayer:
+    """Replays recorded raw frames in a loop, keeping their relative timing (scaled by `speed`)."""
+
+    def __init__(self, hub: ReplayHub, path: str, speed: float = 1.0):
+        self.hub = hub
+        self.speed = speed
+        with open(path, "r", encoding="utf-8") as f:
+            self.frames = [line.strip() for line in f if line.strip()]
+
+    @staticmethod
+    def _stream_of(data: dict):
+        if "k" in data:
+            return f"{data['k']['s'].lower()}@kline_{data['k']['i']}"
+        if "b" in data and "a" in data and "s" in data:
+            return f"{data['s'].lower()}@bookTicker"
+        return None
+
+    async def run(self):
+        while True:
+            prev_e = None
+            for line in self.frames:
+                data = json.loads(line)
+                stream = self._stream_of(data)
+                if stream is None:
+                    continue
+                e = data.get("E")
+                if prev_e is not None and e is not None and e > prev_e:
+                    await asyncio.sleep((e - prev_e) / 1000 / self.speed)
+                if e is not None:
+                    prev_e = e
+                    data["E"] = _now_ms()
+                    line = json.dumps(data, separators=(",", ":"))
+                self.hub.publish(stream, line)
+            await asyncio.sleep(0)
+
+
+async def report(hub: ReplayHub, market: SyntheticMarket | None, every: float = 10.0):
+    last_sent = hub.sent
+    while True:
+        await asyncio.sleep(every)
+        rate = (hub.sent - last_sent) / every
+        last_sent = hub.sent
+        dropped = sum(c.dropped for c in hub.clients)
+        extra = f" closed={market.closed} partial={market.partial}" if market else ""
+        print(f"📡 replay: clients={len(hub.clients)} streams={len(hub.by_stream)} "
+              f"frames/s={rate:,.0f} dropped={dropped}{extra}")
+
+
+async def seed_catalog(symbols: int, intervals, markets):
+    """Points the stream catalog (of a scratch DB!) at `symbols` synthetic symbols."""
+    import asyncpg
+    from data_engine.stream_catalog import CATALOG_TABLE, ensure_catalog
+
+    dsn = os.getenv("DATABASE_URL", "").replace("postgresql+asyncpg://", "postgresql://")
+    pool = await asyncpg.create_pool(dsn, min_size=1, max_size=2)
+    try:
+        rows = [(m, f"SYM{i:04d}USDT", iv) for m in markets for i in range(symbols) for iv in intervals]
+        for market in markets:
+            await ensure_catalog(pool, market)
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    f"UPDATE {CATALOG_TABLE} SET enabled = false WHERE market = ANY($1::varchar[])", list(markets)
+                )
+                await conn.executemany(
+                    f"""
+                    INSERT INTO {CATALOG_TABLE} (market, symbol, "interval", enabled)
+                    VALUES ($1, $2, $3, true)
+                    ON CONFLICT (market, symbol, "interval") DO UPDATE SET enabled = true
+                    """,
+                    rows,
+                )
+        print(f"🌱 {CATALOG_TABLE}: {len(rows)} synthetic streams enabled ({', '.join(markets)}).")
+    finally:
+        await pool.close()
+
+
+async def serve(args):
+    hub = ReplayHub()
+    market = None
+    tasks = []
+    if args.corpus:
+        tasks.append(asyncio.create_task(CorpusReplayer(hub, args.corpus, args.speed).run()))
+    else:
+        market = SyntheticMarket(hub, speed=args.speed, update_ms=args.update_ms,
+                                 close_spread_ms=args.close_spread_ms, book_rate=args.book_rate)
+        tasks.append(asyncio.create_task(market.run_klines()))
+        tasks.append(asyncio.create_task(market.run_books()))
+    tasks.append(asyncio.create_task(report(hub, market)))
+
+    async with websockets.serve(hub.handle, args.host, args.port, max_size=2**24):
+        print(f"🧪 Replay server on ws://{args.host}:{args.port}/ws "
+              f"({'corpus ' + args.corpus if args.corpus else 'synthetic'}, speed x{args.speed})")
+        await asyncio.gather(*tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Binance market-data replay server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9900)
+    parser.add_argument("--corpus", help="recorded raw frames, one per line")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--update-ms", type=int, default=1000)
+    parser.add_argument("--close-spread-ms", type=int, default=0)
+    parser.add_argument("--book-rate", type=float, default=1.0)
+    parser.add_argument("--seed-catalog", action="store_true", help="seed data_stream_catalog and exit")
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--intervals", default="1m,5m,15m,1h")
+    parser.add_argument("--markets", default="spot,futures")
+    args = parser.parse_args()
+
+    if args.seed_catalog:
+        from dotenv import load_dotenv
+        load_dotenv()
+        asyncio.run(seed_catalog(args.symbols, args.intervals.split(","), args.markets.split(",")))
+        return
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -16,10 +16,19 @@ if not load_dotenv(env_path):
     load_dotenv() # fallback
 
 # Imports
-from data_engine.config import DATABASE_URL
+from data_engine.config import (
+    DATABASE_URL, BACKFILL_ENABLED, KLINE_NOTIFY_MODE, PARTITION_MAINTENANCE_ENABLED,
+    KLINE_AGGREGATION_ENABLED,
+)
 from data_engine.binance_data.manage_data import binance_websocket as spot_websocket
 from data_engine.binance_futures.manage_data import binance_websocket as futures_websocket
-from data_engine.queue_manager import process_shared_queue
+from data_engine.queue_manager import process_shared_queue, data_queue
+from data_engine.backfill import run_backfill
+from data_engine.completeness import completeness_tracker
+from data_engine.partitioning import run_partition_maintenance
+from data_engine.aggregator import run_reconciler
+from data_engine.candle_feed import candle_feed_publisher
+from data_engine import metrics
 
 # Logger Configuration
 logging.basicConfig(
@@ -53,8 +62,29 @@ async def main():
     tasks = [
         asyncio.create_task(spot_websocket(pool)),
         asyncio.create_task(futures_websocket(pool)),
-        asyncio.create_task(process_shared_queue(pool))
+        asyncio.create_task(process_shared_queue(pool)),
+        asyncio.create_task(data_queue.replay_spilled())
     ]
+    if KLINE_NOTIFY_MODE == "watermark":
+        tasks.append(asyncio.create_task(completeness_tracker.run(pool)))
+    if BACKFILL_ENABLED:
+        tasks.append(asyncio.create_task(run_backfill(pool)))
+        logger.info("🩹 Gap-filling backfill enabled.")
+    if KLINE_AGGREGATION_ENABLED:
+        # Always on: incomplete buckets are only written once the reconciler fetches them
+        tasks.append(asyncio.create_task(run_reconciler()))
+        logger.info("🧮 Higher-timeframe candles are derived from 1m streams.")
+    if PARTITION_MAINTENANCE_ENABLED:
+        tasks.append(asyncio.create_task(run_partition_maintenance(pool)))
+
+    if metrics.METRICS_ENABLED:
+        metrics.register_collector("queue", data_queue.stats)
+        metrics.register_collector("completeness", completeness_tracker.stats)
+        metrics.register_collector("candle_feed", candle_feed_publisher.stats)
+        try:
+            await metrics.start_metrics_server()
+        except OSError as e:
+            logger.warning(f"⚠️ Metrics server not started: {e}")
 
     try:
         await asyncio.gather(*tasks)
@@ -63,6 +93,8 @@ async def main():
     except Exception as e:
         logger.error(f"❌ Unexpected Error: {e}")
     finally:
+        if data_queue.journal is not None:
+            data_queue.journal.close()  # flush spilled candles to disk
         await pool.close()
         logger.info("👋 Database connection closed. Exiting.")
 
@@ -0,0 +1,176 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+
+
+def _encode_item(item) -> str:
+    # item: (source, coin_id, interval, open_ms, open, high, low, close, volume)
+    row = list(item)
+    ts = row[3]
+    if isinstance(ts, datetime):
+        row[3] = int((ts - EPOCH) / timedelta(milliseconds=1))
+    return json.dumps(row, separators=(",", ":"))
+
+
+def _decode_item(line: str):
+    row = json.loads(line)
+    row[3] = int(row[3])
+    return tuple(row)
+
+
+class SpillJournal:
+    """
+    Append-only on-disk journal made of segment files.
+
+    - append() writes one item per line to the newest segment, rotating at
+      `segment_max_bytes`.
+    - read_batch() returns items in write order, starting from the oldest
+      segment; fully consumed segments are deleted.
+    - Segments left over from a previous run are replayed on start
+      (at-least-once; the DB upsert is idempotent).
+    """
+
+    def __init__(self, directory: str, segment_max_bytes: int = 8 * 1024 * 1024,
+                 max_total_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.max_total_bytes = max_total_bytes
+
+        self._segments = []        # segment numbers, oldest first
+        self._sizes = {}           # segment number -> bytes written
+        self._writer = None        # (segment number, file handle)
+        self._reader = None        # (segment number, file handle)
+        self.pending = 0           # items written but not read yet
+
+        self._recover()
+
+    # ---------------- paths ----------------
+    def _path(self, seg: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{seg:08d}{SEGMENT_SUFFIX}")
+
+    def _recover(self):
+        if not os.path.isdir(self.directory):
+            return
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)):
+                continue
+            try:
+                seg = int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            except ValueError:
+                continue
+            path = self._path(seg)
+            self._segments.append(seg)
+            self._sizes[seg] = os.path.getsize(path)
+            with open(path, "r", encoding="utf-8") as f:
+                self.pending += sum(1 for line in f if line.strip())
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def has_pending(self) -> bool:
+        return self.pending > 0
+
+    # ---------------- write side ----------------
+    def _open_writer(self):
+        os.makedirs(self.directory, exist_ok=True)
+        seg = (self._segments[-1] + 1) if self._segments else 1
+        self._segments.append(seg)
+        self._sizes[seg] = 0
+        self._writer = (seg, open(self._path(seg), "a", encoding="utf-8"))
+
+    def _close_writer(self):
+        if self._writer is not None:
+            try:
+                self._writer[1].close()
+            except Exception:
+                pass
+            self._writer = None
+
+    def append(self, item) -> bool:
+        """Returns False when the journal is full or the disk write fails."""
+        line = _encode_item(item) + "\n"
+        size = len(line.encode("utf-8"))
+
+        if self.total_bytes + size > self.max_total_bytes:
+            return False
+
+        try:
+            if self._writer is None or self._sizes[self._writer[0]] >= self.segment_max_bytes:
+                self._close_writer()
+                self._open_writer()
+            seg, f = self._writer
+            f.write(line)
+        except OSError:
+            return False
+
+        self._sizes[seg] += size
+        self.pending += 1
+        return True
+
+    # ---------------- read side ----------------
+    def _drop_segment(self, seg: int):
+        if self._reader is not None and self._reader[0] == seg:
+            self._reader[1].close()
+            self._reader = None
+        if self._writer is not None and self._writer[0] == seg:
+            self._close_writer()
+        self._segments.remove(seg)
+        self._sizes.pop(seg, None)
+        try:
+            os.remove(self._path(seg))
+        except OSError:
+            pass
+
+    def read_batch(self, max_items: int) -> tuple[list, int]:
+        """
+        Returns (items, corrupt_count) in write order, at most `max_items` items.
+        The active segment is flushed first, so only whole lines are read back;
+        unparseable lines (a torn write after a crash) are counted, not returned.
+        """
+        items = []
+        corrupt = 0
+
+        while len(items) < max_items and self._segments:
+            seg = self._segments[0]
+
+            if self._writer is not None and self._writer[0] == seg:
+                self._writer[1].flush()
+
+            if self._reader is None or self._reader[0] != seg:
+                if self._reader is not None:
+                    self._reader[1].close()
+                self._reader = (seg, open(self._path(seg), "r", encoding="utf-8"))
+
+            f = self._reader[1]
+            line = f.readline()
+
+            if not line:
+                # EOF: drop the segment once nothing more can be appended to it
+                is_active = self._writer is not None and self._writer[0] == seg
+                if not is_active or self.pending <= 0:
+                    self._drop_segment(seg)
+                    continue
+                break
+
+            line = line.strip()
+            if not line:
+                continue
+            self.pending = max(0, self.pending - 1)
+            try:
+                items.append(_decode_item(line))
+            except (ValueError, IndexError, TypeError):
+                corrupt += 1
+
+        return items, corrupt
+
+    def close(self):
+        self._close_writer()
+        if self._reader is not None:
+            self._reader[1].close()
+            self._reader = None
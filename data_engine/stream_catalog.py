@@ -0,0 +1,108 @@
+"""
+DB-driven kline stream catalog.
+
+The set of (market, symbol, interval) streams the data_engine subscribes to
+lives in `data_stream_catalog`. Any change to the table fires
+NOTIFY stream_catalog_changed so running collectors can resubscribe live.
+"""
+
+CATALOG_TABLE = "data_stream_catalog"
+CATALOG_CHANNEL = "stream_catalog_changed"
+
+# Arbitrary constant; serialises concurrent ensure_catalog() calls (spot + futures start together)
+_CATALOG_LOCK_KEY = 7_304_121
+
+
+def stream_name(symbol: str, interval: str) -> str:
+    return f"{symbol.lower()}@kline_{interval}"
+
+
+def parse_stream_name(stream: str):
+    """'btcusdt@kline_1m' -> ('BTCUSDT', '1m'); None for anything else."""
+    try:
+        symbol, kind = stream.split("@", 1)
+    except ValueError:
+        return None
+    if not kind.startswith("kline_"):
+        return None
+    return symbol.upper(), kind[len("kline_"):]
+
+
+async def ensure_catalog(pool, market: str, seed_streams=None):
+    """
+    Creates the catalog table + change trigger if needed and seeds `market`
+    from `seed_streams` (e.g. the old hardcoded ALL_STREAMS) when it has no rows.
+    """
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock($1)", _CATALOG_LOCK_KEY)
+            await conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {CATALOG_TABLE} (
+                    market     varchar(10) NOT NULL,
+                    symbol     varchar(50) NOT NULL,
+                    "interval" varchar(10) NOT NULL,
+                    enabled    boolean     NOT NULL DEFAULT true,
+                    created_at timestamp   NOT NULL DEFAULT now(),
+                    PRIMARY KEY (market, symbol, "interval")
+                )
+                """
+            )
+            await conn.execute(
+                f"""
+                CREATE OR REPLACE FUNCTION notify_{CATALOG_TABLE}_changed()
+                RETURNS trigger
+                LANGUAGE plpgsql
+                AS $function$
+                BEGIN
+                    PERFORM pg_notify('{CATALOG_CHANNEL}', TG_OP);
+                    RETURN NULL;
+                END;
+                $function$
+                """
+            )
+            trigger_exists = await conn.fetchval(
+                "SELECT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = $1)",
+                f"trg_{CATALOG_TABLE}_changed",
+            )
+            if not trigger_exists:
+                await conn.execute(
+                    f"""
+                    CREATE TRIGGER trg_{CATALOG_TABLE}_changed
+                    AFTER INSERT OR UPDATE OR DELETE ON {CATALOG_TABLE}
+                    FOR EACH STATEMENT EXECUTE FUNCTION notify_{CATALOG_TABLE}_changed()
+                    """
+                )
+
+            has_rows = await conn.fetchval(
+                f"SELECT EXISTS (SELECT 1 FROM {CATALOG_TABLE} WHERE market = $1)", market
+            )
+            if not has_rows and seed_streams:
+                rows = []
+                for s in seed_streams:
+                    parsed = parse_stream_name(s)
+                    if parsed:
+                        rows.append((market, parsed[0], parsed[1]))
+                await conn.executemany(
+                    f"""
+                    INSERT INTO {CATALOG_TABLE} (market, symbol, "interval")
+                    VALUES ($1, $2, $3)
+                    ON CONFLICT DO NOTHING
+                    """,
+                    rows,
+                )
+                print(f"🌱 {CATALOG_TABLE}: {market} için {len(rows)} stream seed edildi.")
+
+
+async def load_streams(pool, market: str) -> set:
+    """Enabled streams for `market` as Binance stream names."""
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            f"""
+            SELECT symbol, "interval"
+            FROM {CATALOG_TABLE}
+            WHERE market = $1 AND enabled
+            """,
+            market,
+        )
+    return {stream_name(r["symbol"], r["interval"]) for r in rows}
@@ -0,0 +1,80 @@
+"""
+Load phase of run_trade_engine: per-bot load_strategy + load_indicators (N+1)
+vs StrategyCache.get_many (one set-based query, then cached).
+
+Needs a database with strategies/indicators rows (DATABASE_URL / DB_* as for the
+trade engine). Bot rows are synthesised in memory by cycling through the
+existing strategy ids, so the bots table is not touched and the numbers cover
+only strategy/indicator loading.
+
+    python scripts/bench_bulk_load.py --bots 1000 10000 --strategies 200
+
+Columns:
+    legacy      per-bot loaders (3 queries per bot)
+    bulk cold   empty cache: one query for all distinct strategies + indicators
+    bulk warm   cache filled, no change notifications: no query
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from sqlalchemy import text
+
+from trade_engine.config import get_engine
+from trade_engine.data.indicator_load import load_indicators
+from trade_engine.data.strategy_cache import StrategyCache
+from trade_engine.data.strategy_load import load_strategy
+
+
+def strategy_ids(limit: int):
+    with get_engine().connect() as conn:
+        return [r[0] for r in conn.execute(text("SELECT id FROM public.strategies ORDER BY id LIMIT :n"), {"n": limit})]
+
+
+def legacy(bots):
+    return [(load_strategy(b["strategy_id"]), load_indicators(b["strategy_id"])) for b in bots]
+
+
+def bulk(cache: StrategyCache, bots):
+    strategies = cache.get_many(b["strategy_id"] for b in bots)
+    return [strategies[b["strategy_id"]] for b in bots]
+
+
+def timed(fn, *args):
+    t = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - t) * 1000
+
+
+def main(args):
+    sids = strategy_ids(args.strategies)
+    if not sids:
+        sys.exit("public.strategies is empty")
+    print(f"distinct strategies: {len(sids)} | ticks: {args.ticks}")
+    print(f"{'bots':>6} {'legacy p50 ms':>14} {'bulk cold ms':>13} {'bulk warm ms':>13} {'speed-up':>9}")
+
+    for n in args.bots:
+        bots = [{"id": i, "strategy_id": sids[i % len(sids)]} for i in range(n)]
+        legacy_ms, cold_ms, warm_ms = [], [], []
+        for _ in range(args.ticks):
+            legacy_ms.append(timed(legacy, bots) if n <= args.legacy_max else float("nan"))
+            cache = StrategyCache(ttl=0)
+            cold_ms.append(timed(bulk, cache, bots))
+            warm_ms.append(timed(bulk, cache, bots))
+        lp, cp, wp = (statistics.median(x) for x in (legacy_ms, cold_ms, warm_ms))
+        print(f"{n:>6} {lp:>14.1f} {cp:>13.1f} {wp:>13.2f} {lp / cp:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Strategy/indicator load phase benchmark")
+    parser.add_argument("--bots", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--strategies", type=int, default=200, help="distinct strategies the bots are spread over")
+    parser.add_argument("--ticks", type=int, default=3)
+    parser.add_argument("--legacy-max", type=int, default=10000, help="skip the legacy path above this bot count")
+    main(parser.parse_args())
@@ -0,0 +1,142 @@
+"""
+Micro-benchmark: legacy kline frame handling vs data_engine.kline_decoder.
+
+Corpus: one raw websocket frame per line. Record one from Binance with
+    python scripts/bench_kline_decoder.py --record 20000 --out kline_frames.txt
+and benchmark it with
+    python scripts/bench_kline_decoder.py --corpus kline_frames.txt
+
+Without --corpus a synthetic corpus in Binance's exact frame format is used
+(--closed-ratio controls the share of closed klines; live 1m streams are ~1-2%).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from data_engine.kline_decoder import KlineDecoder, _select_backend
+
+RECORD_STREAMS = [
+    f"{s}@kline_{i}"
+    for s in ("btcusdt", "ethusdt", "bnbusdt", "solusdt", "xrpusdt", "dogeusdt", "adausdt", "trxusdt")
+    for i in ("1m", "5m", "15m", "1h")
+]
+
+
+def synthetic_corpus(n: int, closed_ratio: float):
+    symbols = [f"SYM{i:03d}USDT" for i in range(200)]
+    intervals = ["1m", "3m", "5m", "15m", "30m", "1h", "4h", "1d"]
+    frames = []
+    t0 = 1_700_000_000_000
+    for i in range(n):
+        price = random.uniform(0.01, 70_000)
+        symbol = random.choice(symbols)
+        frame = {
+            "e": "kline", "E": t0 + i, "s": symbol,
+            "k": {
+                "t": t0, "T": t0 + 59_999, "s": symbol, "i": random.choice(intervals),
+                "f": 100, "L": 200, "o": f"{price:.8f}", "c": f"{price * 1.001:.8f}",
+                "h": f"{price * 1.002:.8f}", "l": f"{price * 0.998:.8f}", "v": f"{random.uniform(0, 1e6):.8f}",
+                "n": 100, "x": random.random() < closed_ratio, "q": "1.0000", "V": "500",
+                "Q": "0.500", "B": "123456",
+            },
+        }
+        frames.append(json.dumps(frame, separators=(",", ":")))
+    return frames
+
+
+def legacy_handle(msg):
+    """The previous handle_message body (json.loads + datetime per closed kline)."""
+    json_data = json.loads(msg)
+    if "k" in json_data:
+        kline = json_data["k"]
+        if kline["x"]:
+            return (
+                kline["s"].upper(), kline["i"], datetime.utcfromtimestamp(kline["t"] / 1000),
+                float(kline["o"]), float(kline["h"]), float(kline["l"]), float(kline["c"]), float(kline["v"]),
+            )
+    return None
+
+
+def bench(name, func, frames, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for f in frames:
+            func(f)
+        best = min(best, time.perf_counter() - t0)
+    per_frame_us = best / len(frames) * 1e6
+    print(f"{name:<28} {len(frames) / best:>14,.0f} frames/s {per_frame_us:>10.2f} µs/frame")
+    return best
+
+
+async def record(n: int, out: str):
+    import websockets
+
+    uri = "wss://stream.binance.com:9443/stream?streams=" + "/".join(RECORD_STREAMS)
+    count = 0
+    with open(out, "w", encoding="utf-8") as f:
+        async with websockets.connect(uri, max_size=2**24) as ws:
+            while count < n:
+                msg = await ws.recv()
+                # Combined stream wrapper -> raw frame, as the collectors see it
+                f.write(json.dumps(json.loads(msg)["data"], separators=(",", ":")) + "\n")
+                count += 1
+                if count % 1000 == 0:
+                    print(f"  recorded {count}/{n}")
+    print(f"✅ {count} frames written to {out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kline frame decoder micro-benchmark")
+    parser.add_argument("--corpus", help="file with one raw frame per line")
+    parser.add_argument("--record", type=int, help="record N live frames instead of benchmarking")
+    parser.add_argument("--out", default="kline_frames.txt")
+    parser.add_argument("--frames", type=int, default=200_000, help="synthetic corpus size")
+    parser.add_argument("--closed-ratio", type=float, default=0.02)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.record:
+        asyncio.run(record(args.record, args.out))
+        return
+
+    if args.corpus:
+        with open(args.corpus, "r", encoding="utf-8") as f:
+            frames = [line.strip() for line in f if line.strip()]
+        source = args.corpus
+    else:
+        random.seed(42)
+        frames = synthetic_corpus(args.frames, args.closed_ratio)
+        source = f"synthetic (closed ratio {args.closed_ratio})"
+    frames_bytes = [f.encode("utf-8") for f in frames]
+
+    closed = sum(1 for f in frames if '"x":true' in f)
+    print(f"Corpus: {source} | {len(frames):,} frames, {closed:,} closed")
+    print("-" * 72)
+
+    bench("legacy json + datetime", legacy_handle, frames, args.repeats)
+
+    backends = ["json"]
+    if _select_backend("orjson")[0] == "orjson":
+        backends.append("orjson")
+    else:
+        print("(orjson not installed; only the stdlib backend is measured)")
+
+    for backend in backends:
+        decoder = KlineDecoder(backend)
+        bench(f"decoder[{backend}] str", decoder.decode, frames, args.repeats)
+        decoder = KlineDecoder(backend)
+        bench(f"decoder[{backend}] bytes", decoder.decode, frames_bytes, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import asyncpg
+from dotenv import load_dotenv
+
+# Path setup (project root, one level up from scripts)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+env_path = os.path.join(parent_dir, '.env')
+if not load_dotenv(env_path):
+    load_dotenv()
+
+from data_engine.config import DATABASE_URL
+from data_engine.intervals import to_ms
+from data_engine.queue_manager import UPSERT_FUNCS, ensure_staging_table, staging_table_name
+
+# Benchmark writes into scratch copies of the real tables, never into binance_data itself.
+BENCH_CANDLE_TABLE = "bench_binance_data"
+BENCH_LAST_PRICE_TABLE = "bench_binance_last_price"
+
+FLUSH_SIZES = [1_000, 10_000, 50_000]
+REPEATS = int(os.getenv("BENCH_REPEATS", "5"))
+INTERVALS = ["1m", "3m", "5m", "15m", "30m", "1h", "2h", "4h", "1d", "1w"]
+
+
+async def setup_tables(conn):
+    await conn.execute(f"DROP TABLE IF EXISTS {BENCH_CANDLE_TABLE}, {BENCH_LAST_PRICE_TABLE}, {staging_table_name(BENCH_CANDLE_TABLE)}")
+    await conn.execute(f"CREATE TABLE {BENCH_CANDLE_TABLE} (LIKE binance_data INCLUDING ALL)")
+    await conn.execute(f"CREATE TABLE {BENCH_LAST_PRICE_TABLE} (LIKE binance_last_price INCLUDING ALL)")
+    await ensure_staging_table(conn, BENCH_CANDLE_TABLE)
+
+
+async def drop_tables(conn):
+    await conn.execute(f"DROP TABLE IF EXISTS {BENCH_CANDLE_TABLE}, {BENCH_LAST_PRICE_TABLE}, {staging_table_name(BENCH_CANDLE_TABLE)}")
+
+
+def make_rows(n: int, start: datetime):
+    """
+    Simulates the top-of-the-hour burst: many symbols x intervals closing at once.
+    Every call uses a fresh `start`, so rows are new inserts (not conflicts).
+    """
+    symbols = max(1, n // len(INTERVALS))
+    open_ms = to_ms(start)
+    rows = []
+    for s in range(symbols):
+        coin_id = f"BENCH{s:05d}USDT"
+        for interval in INTERVALS:
+            if len(rows) >= n:
+                break
+            price = random.uniform(0.01, 70_000)
+            rows.append((
+                coin_id, interval, open_ms,
+                price, price * 1.01, price * 0.99, price * 1.001, random.uniform(0, 1_000_000),
+            ))
+    return rows
+
+
+async def run_mode(pool, mode: str, size: int, start: datetime):
+    upsert = UPSERT_FUNCS[mode]
+    latencies = []
+
+    for i in range(REPEATS):
+        rows = make_rows(size, start + timedelta(minutes=i))
+        async with pool.acquire() as conn:
+            t0 = time.perf_counter()
+            async with conn.transaction():
+                await upsert(conn, rows, BENCH_CANDLE_TABLE, BENCH_LAST_PRICE_TABLE)
+            latencies.append(time.perf_counter() - t0)
+
+    total_rows = size * REPEATS
+    total_time = sum(latencies)
+    return {
+        "mode": mode,
+        "size": size,
+        "rows_per_sec": total_rows / total_time if total_time > 0 else float("inf"),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+async def main():
+    if not DATABASE_URL:
+        print("❌ Error: DATABASE_URL not found in environment variables.")
+        sys.exit(1)
+
+    pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=2)
+    async with pool.acquire() as conn:
+        await setup_tables(conn)
+
+    print(f"{'mode':<12} {'candles':>8} {'rows/sec':>12} {'p50 flush':>12} {'max flush':>12}")
+    print("-" * 60)
+
+    try:
+        base = datetime(2000, 1, 1)
+        for size in FLUSH_SIZES:
+            for n, mode in enumerate(UPSERT_FUNCS):
+                # Separate time ranges per run so both modes insert fresh rows
+                start = base + timedelta(days=size // 1000 + n * 100)
+                r = await run_mode(pool, mode, size, start)
+                print(f"{r['mode']:<12} {r['size']:>8} {r['rows_per_sec']:>12.0f} {r['p50_ms']:>10.1f}ms {r['max_ms']:>10.1f}ms")
+    finally:
+        async with pool.acquire() as conn:
+            await drop_tables(conn)
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
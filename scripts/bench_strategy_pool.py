@@ -0,0 +1,112 @@
+"""
+Tick latency: per-tick ProcessPoolExecutor (previous run_all_bots_async) vs the
+warm StrategyWorkerPool.
+
+Each synthetic bot ships a 500-candle frame to a worker and runs an
+EMA-cross style strategy on it, so pickling and scheduling costs match a real
+tick; DB access (logs, min qty, control_the_results) is left out.
+
+    python scripts/bench_strategy_pool.py --bots 50 500 2000 --ticks 5
+
+Without pandas the strategy falls back to pure Python lists and the workers
+skip the pandas/numpy/ta pre-import, which understates the per-tick import
+cost the warm pool removes.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from trade_engine.process.worker_pool import StrategyWorkerPool
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+
+def _light_init():
+    if pd is not None:
+        import numpy  # noqa: F401
+        import pandas  # noqa: F401
+
+
+def make_frame(n: int = 500):
+    price = 100.0
+    closes = []
+    for _ in range(n):
+        price *= 1 + random.gauss(0, 0.002)
+        closes.append(price)
+    if pd is None:
+        return closes
+    return pd.DataFrame({"close": closes, "open": closes, "high": closes, "low": closes, "volume": 1.0})
+
+
+def synthetic_bot(bot_id: int, frame):
+    if pd is not None:
+        df = frame.copy()
+        df["fast"] = df["close"].ewm(span=12).mean()
+        df["slow"] = df["close"].ewm(span=26).mean()
+        df["position"] = (df["fast"] > df["slow"]).astype(int)
+        return {"bot_id": bot_id, "position": int(df["position"].iloc[-1])}
+    fast = slow = frame[0]
+    for c in frame:
+        fast += (c - fast) * 2 / 13
+        slow += (c - slow) * 2 / 27
+    return {"bot_id": bot_id, "position": int(fast > slow)}
+
+
+async def legacy_tick(frames, workers: int):
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=min(len(frames), workers)) as executor:
+        return await asyncio.gather(*(
+            loop.run_in_executor(executor, synthetic_bot, i, f) for i, f in enumerate(frames)
+        ))
+
+
+async def warm_tick(pool: StrategyWorkerPool, frames):
+    return await pool.run_many([(synthetic_bot, (i, f)) for i, f in enumerate(frames)])
+
+
+async def main(args):
+    workers = args.workers or max(1, (os.cpu_count() or 2) // 2)
+    pool = StrategyWorkerPool(max_workers=workers, start_method=args.start_method, initializer=_light_init)
+    t0 = time.perf_counter()
+    await pool.start()
+    print(f"pandas: {'yes' if pd is not None else 'no (pure-python strategy)'} | workers: {workers} | "
+          f"warm pool start: {(time.perf_counter() - t0) * 1000:.0f} ms")
+    print(f"{'bots':>6} {'legacy p50 ms':>14} {'warm p50 ms':>12} {'speed-up':>9}")
+
+    for n in args.bots:
+        frames = [make_frame() for _ in range(n)]
+        legacy, warm = [], []
+        for _ in range(args.ticks):
+            t = time.perf_counter()
+            await legacy_tick(frames, workers)
+            legacy.append((time.perf_counter() - t) * 1000)
+
+            t = time.perf_counter()
+            await warm_tick(pool, frames)
+            warm.append((time.perf_counter() - t) * 1000)
+        lp, wp = statistics.median(legacy), statistics.median(warm)
+        print(f"{n:>6} {lp:>14.1f} {wp:>12.1f} {lp / wp:>8.2f}x")
+
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Strategy worker pool tick latency")
+    parser.add_argument("--bots", type=int, nargs="+", default=[50, 500, 2000])
+    parser.add_argument("--ticks", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--start-method", default="forkserver")
+    random.seed(7)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,171 @@
+"""
+Local Binance klines REST stub for exercising data_engine/backfill.py offline.
+
+Serves GET /api/v3/klines and /fapi/v1/klines with startTime/endTime/limit
+semantics, the X-MBX-USED-WEIGHT-1M header and (optionally) periodic 429s.
+
+Klines come from a recorded file or are synthesised:
+    recorded file format: {"BTCUSDT": {"1m": [[open_time, "o", "h", "l", "c", "v", close_time, ...], ...]}}
+
+Usage:
+    python scripts/kline_stub_server.py --port 8765 [--klines recorded.json] [--throttle-every 50]
+    python -m data_engine.backfill --once --spot-url http://127.0.0.1:8765/api/v3 \
+                                          --futures-url http://127.0.0.1:8765/fapi/v1
+
+    python scripts/kline_stub_server.py --check      # self-check of the fetcher, no DB needed
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from data_engine.backfill import INTERVAL_MS, KlineFetcher, WeightBudget, gaps_from_rows, klines_to_rows
+
+
+def synthesize(symbol: str, interval: str, end_ms: int, count: int):
+    step = INTERVAL_MS[interval]
+    start = (end_ms // step - count) * step
+    klines = []
+    price = 100.0 + (sum(map(ord, symbol)) % 50)
+    for i in range(count):
+        t = start + i * step
+        o = price
+        c = price * (1 + ((i * 7919) % 11 - 5) / 1000)
+        klines.append([t, f"{o:.4f}", f"{max(o, c) * 1.001:.4f}", f"{min(o, c) * 0.999:.4f}",
+                       f"{c:.4f}", f"{10 + i % 13:.2f}", t + step - 1, "0", 1, "0", "0", "0"])
+        price = c
+    return klines
+
+
+class KlineStub:
+    def __init__(self, recorded=None, synth_count: int = 5000, throttle_every: int = 0):
+        self.recorded = recorded or {}
+        self.synth_count = synth_count
+        self.throttle_every = throttle_every
+        self.requests = 0
+        self._series = {}
+
+    def series(self, symbol: str, interval: str):
+        key = (symbol, interval)
+        if key not in self._series:
+            klines = self.recorded.get(symbol, {}).get(interval)
+            if klines is None:
+                klines = synthesize(symbol, interval, int(time.time() * 1000), self.synth_count)
+            klines = sorted(klines, key=lambda k: k[0])
+            self._series[key] = (klines, [k[0] for k in klines])
+        return self._series[key]
+
+    async def klines(self, request):
+        self.requests += 1
+        headers = {"X-MBX-USED-WEIGHT-1M": str(self.requests * 2)}
+        if self.throttle_every and self.requests % self.throttle_every == 0:
+            headers["Retry-After"] = "1"
+            return web.json_response({"code": -1003, "msg": "Too many requests"}, status=429, headers=headers)
+
+        q = request.query
+        symbol = q["symbol"].upper()
+        interval = q["interval"]
+        limit = min(int(q.get("limit", 500)), 1500)
+        klines, opens = self.series(symbol, interval)
+
+        lo = bisect.bisect_left(opens, int(q["startTime"])) if "startTime" in q else 0
+        hi = bisect.bisect_right(opens, int(q["endTime"])) if "endTime" in q else len(opens)
+        if "startTime" in q:
+            page = klines[lo:hi][:limit]
+        else:
+            page = klines[lo:hi][-limit:]
+        return web.json_response(page, headers=headers)
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/api/v3/klines", self.klines)
+        app.router.add_get("/fapi/v1/klines", self.klines)
+        return app
+
+
+async def serve(stub: KlineStub, port: int):
+    runner = web.AppRunner(stub.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    return runner
+
+
+async def check(port: int):
+    """Fetches a range with a hole through the stub and verifies it comes back contiguous."""
+    stub = KlineStub(throttle_every=7)
+    runner = await serve(stub, port)
+    try:
+        async with aiohttp.ClientSession() as session:
+            fetcher = KlineFetcher(session, "futures", base_url=f"http://127.0.0.1:{port}/fapi/v1",
+                                   budget=WeightBudget(2400, fraction=1.0), concurrency=4)
+            klines, _ = stub.series("BTCUSDT", "1m")
+            step = INTERVAL_MS["1m"]
+            first, last = klines[0][0], klines[-2][0]
+
+            # Pretend the DB holds [0, 99] and [3600, 4000]: GAP_SQL returns only the jump rows
+            rows = [(first + 99 * step, first + 3600 * step, first), (first + 4000 * step, None, first)]
+            gaps = gaps_from_rows(rows, first, last, step)
+            print(f"gaps (candle offsets): {[((s - first) // step, (e - first) // step) for s, e in gaps]}")
+
+            started = time.perf_counter()
+            fetched = []
+            for start, end in gaps:
+                page, failed = await fetcher.fetch_range("BTCUSDT", "1m", start, end)
+                assert failed == 0, "pages failed"
+                fetched.extend(page)
+            elapsed = time.perf_counter() - started
+
+            now_ms = int(time.time() * 1000)
+            out = klines_to_rows("BTCUSDT", "1m", fetched, now_ms)
+            expected = sum((end - start) // step + 1 for start, end in gaps)
+            opens = [k[0] for k in fetched]
+            assert len(fetched) == expected, (len(fetched), expected)
+            assert opens == sorted(set(opens)), "duplicate or unordered candles"
+
+            print(f"✅ {len(fetched)} candles ({len(out)} closed) in {elapsed:.2f}s | "
+                  f"requests={fetcher.requests} rate_limited={fetcher.rate_limited} stub_hits={stub.requests}")
+    finally:
+        await runner.cleanup()
+
+
+async def main(args):
+    if args.check:
+        await check(args.port)
+        return
+
+    recorded = None
+    if args.klines:
+        with open(args.klines, "r", encoding="utf-8") as f:
+            recorded = json.load(f)
+    stub = KlineStub(recorded, synth_count=args.synth_count, throttle_every=args.throttle_every)
+    runner = await serve(stub, args.port)
+    print(f"🧪 Kline stub listening on http://127.0.0.1:{args.port} (/api/v3/klines, /fapi/v1/klines)")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Binance klines REST stub")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--klines", help="recorded klines JSON file")
+    parser.add_argument("--synth-count", type=int, default=5000)
+    parser.add_argument("--throttle-every", type=int, default=0, help="answer every Nth request with 429")
+    parser.add_argument("--check", action="store_true")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
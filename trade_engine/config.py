@@ -8,6 +8,8 @@ from functools import lru_cache
 from contextlib import asynccontextmanager, contextmanager
 
 import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
 import asyncpg
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
@@ -142,19 +144,206 @@ def get_db_connection():
     """
     return psycopg2.connect(**_psycopg2_conn_kwargs())
 
+# =========================
+# psycopg2 havuzu (process-local, fork-safe)
+# =========================
+# Ana process ve strateji worker'ları kendi küçük havuzlarını kullanır; fork sonrası
+# parent'ın havuzu miras alınmaz (soketler paylaşılmasın diye kapatılmadan bırakılır).
+PG_POOL_SIZE = int(os.getenv("PG_POOL_SIZE", "10"))
+PG_WORKER_POOL_SIZE = int(os.getenv("PG_WORKER_POOL_SIZE", "2"))
+PG_POOL_TIMEOUT = float(os.getenv("PG_POOL_TIMEOUT", "10"))
+PG_POOL_PING_IDLE_SEC = float(os.getenv("PG_POOL_PING_IDLE_SEC", "30"))
+PG_POOL_RECYCLE_SEC = float(os.getenv("PG_POOL_RECYCLE_SEC", "1800"))
+
+
+class Psycopg2Pool:
+    """
+    Küçük, thread-safe psycopg2 bağlantı havuzu.
+    - checkout: boşta bağlantı yoksa ve limit doluysa PG_POOL_TIMEOUT kadar bekler
+    - uzun süre boşta kalan bağlantı kullanılmadan önce SELECT 1 ile yoklanır
+    - PG_POOL_RECYCLE_SEC'ten yaşlı bağlantılar kapatılıp yenilenir
+    - iade edilirken açık transaction geri alınır (eski close() davranışıyla aynı)
+    """
+
+    def __init__(self, maxsize: int):
+        import threading
+
+        self.pid = os.getpid()
+        self.maxsize = max(1, maxsize)
+        self._idle = []          # [(conn, last_used)]; oluşturulma zamanı _created_at içinde
+        self._created_at = {}    # id(conn) -> oluşturulma zamanı
+        self._size = 0
+        self._cond = threading.Condition()
+
+        # Sayaçlar
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_sec = 0.0
+        self.max_wait_sec = 0.0
+        self.timeouts = 0
+        self.created = 0
+        self.recycled = 0
+        self.broken = 0
+
+    def _connect(self):
+        conn = get_db_connection()
+        self.created += 1
+        self._created_at[id(conn)] = time.monotonic()
+        return conn
+
+    def _discard(self, conn):
+        self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _alive(conn) -> bool:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        t0 = time.monotonic()
+        with self._cond:
+            waited = False
+            while not self._idle and self._size >= self.maxsize:
+                waited = True
+                left = PG_POOL_TIMEOUT - (time.monotonic() - t0)
+                if left <= 0:
+                    self.timeouts += 1
+                    raise psycopg2.pool.PoolError(
+                        f"psycopg2 havuzu dolu ({self.maxsize} bağlantı, {PG_POOL_TIMEOUT:.0f} sn beklendi)"
+                    )
+                self._cond.wait(left)
+            conn = last_used = None
+            if self._idle:
+                conn, last_used = self._idle.pop()
+            else:
+                self._size += 1  # yer ayır; bağlantı kilit dışında açılır
+
+            wait = time.monotonic() - t0
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+                self.wait_sec += wait
+                self.max_wait_sec = max(self.max_wait_sec, wait)
+
+        try:
+            if conn is not None:
+                now = time.monotonic()
+                if now - self._created_at.get(id(conn), now) > PG_POOL_RECYCLE_SEC:
+                    self.recycled += 1
+                    self._discard(conn)
+                    conn = None
+                elif conn.closed or (now - last_used > PG_POOL_PING_IDLE_SEC and not self._alive(conn)):
+                    self.broken += 1
+                    self._discard(conn)
+                    conn = None
+            if conn is None:
+                conn = self._connect()
+            return conn
+        except BaseException:
+            # BaseException: worker'daki bütçe sinyali (BotBudgetExceeded) de yeri geri vermeli
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def putconn(self, conn):
+        if os.getpid() != self.pid:
+            return  # fork sonrası parent'ın bağlantısı: dokunma
+        reusable = not conn.closed
+        if reusable:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if conn.autocommit:
+                    conn.autocommit = False
+            except Exception:
+                reusable = False
+        if not reusable:
+            self.broken += 1
+            self._discard(conn)
+        with self._cond:
+            if reusable:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._size -= 1
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        with self._cond:
+            idle = len(self._idle)
+            size = self._size
+        return {
+            "pid": self.pid,
+            "max": self.maxsize,
+            "open": size,
+            "in_use": size - idle,
+            "idle": idle,
+            "checkouts": self.checkouts,
+            "waits": self.waits,
+            "wait_sec": round(self.wait_sec, 3),
+            "max_wait_sec": round(self.max_wait_sec, 3),
+            "timeouts": self.timeouts,
+            "created": self.created,
+            "recycled": self.recycled,
+            "broken": self.broken,
+        }
+
+
+_PG_POOL: Psycopg2Pool | None = None
+
+def _reset_pg_pool_after_fork():
+    # Parent'ın soketlerini kapatmak parent'ın oturumunu da sonlandırır: sadece referansı bırak
+    global _PG_POOL
+    _PG_POOL = None
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pg_pool_after_fork)
+
+def get_pg_pool() -> Psycopg2Pool:
+    global _PG_POOL
+    if _PG_POOL is None or _PG_POOL.pid != os.getpid():
+        import multiprocessing
+        in_worker = multiprocessing.parent_process() is not None
+        _PG_POOL = Psycopg2Pool(PG_WORKER_POOL_SIZE if in_worker else PG_POOL_SIZE)
+    return _PG_POOL
+
+def close_pg_pool():
+    global _PG_POOL
+    if _PG_POOL is not None and _PG_POOL.pid == os.getpid():
+        _PG_POOL.close()
+    _PG_POOL = None
+
+def pg_pool_stats() -> dict:
+    return _PG_POOL.stats() if _PG_POOL is not None else {}
+
 @contextmanager
 def psycopg2_connection():
-    """Context manager ile güvenli psycopg2 kullanım kalıbı."""
-    conn = None
+    """
+    Context manager ile güvenli psycopg2 kullanım kalıbı (process-local havuzdan).
+    Blok sonunda commit edilmemiş iş geri alınır ve bağlantı havuza döner.
+    """
+    pool = get_pg_pool()
+    conn = pool.getconn()
     try:
-        conn = get_db_connection()
         yield conn
     finally:
-        try:
-            if conn is not None:
-                conn.close()
-        except Exception:
-            pass
+        pool.putconn(conn)
 
 # =========================
 # asyncpg Pool (Lazy, tek proses içinde)
@@ -260,6 +449,7 @@ def on_worker_start():
     Amaç: Parent'tan miras havuz/conn izlerini temizlemek.
     """
     dispose_engine()
+    _reset_pg_pool_after_fork()
     # async engine/pool child içinde ilk kullanımda zaten lazy kurulacak.
     logging.info("🔄 Worker DB kaynakları resetlendi (sync).")
 
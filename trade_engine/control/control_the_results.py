@@ -7,8 +7,8 @@ import math
 from collections import defaultdict
 from decimal import Decimal
 
-from trade_engine.data.bot_features import load_bot_context
-from trade_engine.log.log import log_info, log_warning, log_error
+from trade_engine.data.bot_features import load_bot_context, load_bot_contexts
+from trade_engine.log.log import log_info, log_warning, log_error, sanitize_json_payload
 from trade_engine.log.telegram.telegram_service import notify_user_by_telegram
 
 
@@ -57,37 +57,19 @@ def _validate_action_dict(act: dict) -> tuple[bool, str]:
     return True, ""
 
 
-def control_the_results(user_id, bot_id, results, min_usd=10.0, ctx=None):
-    """
-    Spot bot:
-      - SADECE spot (holdings) dikkate alınır.
-      - Hedef: target_spot% = curr_pos(0..1) * curr_per(0..100)
-
-    Futures bot:
-      - SADECE futures (positions) dikkate alınır.
-      - Tek leverage kuralı: hedef leverage != mevcut leverage ise önce TAM kapat, sonra hedef leverage ile aç.
-        Eğer kapatma min_usd sebebiyle gerçekleşmezse, açma o bacakta BLOKLANIR.
-
-    Kapatma min_usd altı kaldıysa:
-      - fulness DEĞİŞMEZ
-      - mevcut yüzde/levrage DEĞİŞMEZ
-      - açma fazı mevcut duruma göre karar verir.
-    """
-
-    def _fire_and_forget(coro):
-        try:
-            loop = asyncio.get_running_loop()
-            loop.create_task(coro)
-        except RuntimeError:
-            # Çalışan loop yoksa ayrı bir task olarak başlat
-            asyncio.run(coro)
+def _record(logs: list, level: str, bot_id, message: str, symbol=None, details=None):
+    """Ertelenmiş log kaydı; details o anki haliyle kopyalanır (aksiyon sonradan değişebilir)."""
+    logs.append({
+        "level": level,
+        "bot_id": bot_id,
+        "message": message,
+        "symbol": symbol,
+        "details": sanitize_json_payload(details),
+    })
 
-    # ---------- context ----------
-    ctx = ctx or load_bot_context(bot_id)
-    bot_type = ctx["bot_type"]           # "spot" | "futures"
-    current_value = float(ctx["current_value"] or 0.0)
-    fulness = float(ctx["fulness"] or 0.0)  # 0..1
 
+def _print_state(bot_id, ctx):
+    bot_type = ctx["bot_type"]
     holdings = ctx.get("holdings", [])
     positions = ctx.get("positions", [])
 
@@ -113,6 +95,19 @@ def control_the_results(user_id, bot_id, results, min_usd=10.0, ctx=None):
                 print(f"   Pos: {sym} ({side}) | Amt: {amt} | Lev: {lev}x | Pct: {pct}%")
     print("--------------------------------------------------")
 
+
+def _evaluate_bot(bot_id, results, min_usd, ctx, logs: list, notices: list):
+    """
+    Tek botun hedef/aksiyon hesabı (kurallar: control_the_results). Yan etkisizdir:
+    log kayıtları `logs`, Telegram mesajları `notices` listesine eklenir.
+    """
+    bot_type = ctx["bot_type"]           # "spot" | "futures"
+    current_value = float(ctx["current_value"] or 0.0)
+    fulness = float(ctx["fulness"] or 0.0)  # 0..1
+
+    holdings = ctx.get("holdings", [])
+    positions = ctx.get("positions", [])
+
     # ---------- helpers ----------
     def clamp_pct(p):
         try:
@@ -274,9 +269,9 @@ def control_the_results(user_id, bot_id, results, min_usd=10.0, ctx=None):
         # required alanlar
         ok_req, err_req = _validate_action_dict(act)
         if not ok_req:
-            log_error(
-                bot_id=bot_id,
-                message="Aksiyon sözlüğü hatası",
+            _record(
+                logs, "error", bot_id,
+                "Aksiyon sözlüğü hatası",
                 symbol=act.get("coin_id"),
                 details={"reason": err_req, "action": act}
             )
@@ -310,9 +305,9 @@ def control_the_results(user_id, bot_id, results, min_usd=10.0, ctx=None):
             #print(local_min_frac, effective_frac, "Here 5")
             # Telegram bildirimi (usd > 10 ve eşik altı) → sadece sayısal ve hesaplanabilirse
             if (usd is not None) and (required_usd is not None) and (usd > 10) and (usd < required_usd):
-                log_warning(
-                    bot_id=bot_id,
-                    message="Minimum USD altı işlem engellendi",
+                _record(
+                    logs, "warning", bot_id,
+                    "Minimum USD altı işlem engellendi",
                     symbol=act.get("coin_id"),
                     details={
                         "frac": _finite_or_none(frac),
@@ -333,7 +328,7 @@ def control_the_results(user_id, bot_id, results, min_usd=10.0, ctx=None):
                     f"🔺 Gerekli Minimum Margin: <b>{_fmt_usd(required_usd)}</b>\n\n"
                     f"ℹ️ Bu emir, aracı kurumun minimum eşik değerinin altında kalması nedeniyle gönderilemedi."
                 )
-                _fire_and_forget(notify_user_by_telegram(text=_msg, bot_id=int(bot_id)))
+                notices.append({"bot_id": int(bot_id), "text": _msg})
             pass
 
         # ✅ eşik geçildi → normal akış
@@ -341,9 +336,9 @@ def control_the_results(user_id, bot_id, results, min_usd=10.0, ctx=None):
         a["value"] = _finite_or_none(usd)  # log/pipe güvenliği
         a["status"] = "success"
         actions.append(a)
-        log_info(
-            bot_id=bot_id,
-            message="Action added",
+        _record(
+            logs, "info", bot_id,
+            "Action added",
             symbol=act.get("coin_id"),
             details={
                 "frac": _finite_or_none(frac),
@@ -530,14 +525,111 @@ def control_the_results(user_id, bot_id, results, min_usd=10.0, ctx=None):
     expected_trade_type = "spot" if bot_type == "spot" else "futures"
     for ax in actions:
         if ax.get("trade_type") != expected_trade_type:
-            log_warning(
-                bot_id=bot_id,
-                message="Trade type mismatch corrected",
+            _record(
+                logs, "warning", bot_id,
+                "Trade type mismatch corrected",
                 symbol=ax.get("coin_id"),
                 details={"original": ax.get("trade_type"), "forced": expected_trade_type}
             )
             ax["trade_type"] = expected_trade_type
 
+    return actions
+
+
+def evaluate_results_batch(items):
+    """
+    Bir tick'teki tüm botların sonuçlarını tek seferde değerlendirir; yan etkisizdir.
+
+    items: [ {"user_id", "bot_id", "results", "min_usd", "ctx"}, ... ]
+           ctx verilmeyen botların context'i tek seferde toplu okunur.
+
+    Dönüş: (actions_by_bot, logs, notices, errors)
+      actions_by_bot: { bot_id: [aksiyon, ...] }
+      logs:    [ {"level", "bot_id", "message", "symbol", "details"}, ... ]
+      notices: [ {"bot_id", "text"}, ... ]   (Telegram)
+      errors:  { bot_id: hata metni }         (hesabı patlayan botlar)
+    Yan etkiler sonradan apply_control_effects ile toplu uygulanır.
+    """
+    items = list(items)
+    missing = [it["bot_id"] for it in items if not it.get("ctx")]
+    loaded = load_bot_contexts(missing) if missing else {}
+
+    actions_by_bot, logs, notices, errors = {}, [], [], {}
+    for it in items:
+        bot_id = it["bot_id"]
+        try:
+            ctx = it.get("ctx") or loaded.get(bot_id) or load_bot_context(bot_id)
+            actions_by_bot[bot_id] = _evaluate_bot(
+                bot_id, it.get("results"), it.get("min_usd", 10.0), ctx, logs, notices
+            )
+        except Exception as e:
+            import traceback
+            errors[bot_id] = f"{str(e)}\n{traceback.format_exc()}"
+    return actions_by_bot, logs, notices, errors
+
+
+def write_control_logs(logs):
+    """
+    evaluate_results_batch'in log kayıtları (bot_logs toplu yazıcısı açıksa kuyruğa,
+    değilse satır satır). Kuyruk doluyken bekleyebilir: event loop'ta değil executor'da çağrılır.
+    """
+    writers = {"info": log_info, "warning": log_warning, "error": log_error}
+    for rec in logs:
+        try:
+            writers[rec["level"]](
+                bot_id=rec["bot_id"],
+                message=rec["message"],
+                symbol=rec["symbol"],
+                details=rec["details"],
+            )
+        except Exception as e:
+            print(f"❌ Kontrol logu yazılamadı (bot {rec['bot_id']}): {e}")
+
+
+def send_control_notices(notices):
+    """Telegram bildirimleri; çalışan loop varsa task olarak başlatılır."""
+    for notice in notices:
+        coro = notify_user_by_telegram(text=notice["text"], bot_id=notice["bot_id"])
+        try:
+            loop = asyncio.get_running_loop()
+            loop.create_task(coro)
+        except RuntimeError:
+            # Çalışan loop yoksa ayrı bir task olarak başlat
+            asyncio.run(coro)
+
+
+def apply_control_effects(logs, notices):
+    """evaluate_results_batch'in ertelenmiş yan etkileri: log kayıtları + Telegram bildirimleri."""
+    write_control_logs(logs)
+    send_control_notices(notices)
+
+
+def control_the_results(user_id, bot_id, results, min_usd=10.0, ctx=None):
+    """
+    Spot bot:
+      - SADECE spot (holdings) dikkate alınır.
+      - Hedef: target_spot% = curr_pos(0..1) * curr_per(0..100)
+
+    Futures bot:
+      - SADECE futures (positions) dikkate alınır.
+      - Tek leverage kuralı: hedef leverage != mevcut leverage ise önce TAM kapat, sonra hedef leverage ile aç.
+        Eğer kapatma min_usd sebebiyle gerçekleşmezse, açma o bacakta BLOKLANIR.
+
+    Kapatma min_usd altı kaldıysa:
+      - fulness DEĞİŞMEZ
+      - mevcut yüzde/levrage DEĞİŞMEZ
+      - açma fazı mevcut duruma göre karar verir.
+
+    Tek bot için eski API; tick içinde evaluate_results_batch kullanılır.
+    """
+    # ---------- context ----------
+    ctx = ctx or load_bot_context(bot_id)
+    _print_state(bot_id, ctx)
+
+    logs, notices = [], []
+    actions = _evaluate_bot(bot_id, results, min_usd, ctx, logs, notices)
+    apply_control_effects(logs, notices)
+
     print("control_the_results actions:", actions)
     print("=====================================")
     return actions
@@ -0,0 +1,208 @@
+# trade_engine/data/bot_context_cache.py
+"""
+Bot çalışma context'inin seyrek değişen kısmı için süreç içi önbellek.
+
+control_the_results her bot için worker içinde load_bot_context çağırıyordu
+(bot başına yeni bağlantı + 3 sorgu, üstüne her sorguda information_schema
+kontrolü). Artık ana process tick'in botları için context'i buradan alır.
+
+Context iki parçadır:
+    - sabit kısım: bot_type / initial_usd_value / api_id + holdings/positions
+      satırları (symbol, amount, position_side, leverage). Sadece emir ya da
+      ayar değişikliğiyle değişir; önbellekte tutulur.
+    - dakikalık kısım: bots.current_usd_value / fullness ve satır yüzdeleri.
+      minute_calculation (positions_calculate + bot_updates) bunları her 1m
+      mumunda yeniden yazar; önbelleğe alınmaz, her tick tüm botlar için tek
+      sorguyla okunur (bot_features.load_bot_context_parts).
+Steady-state tick'te context için tek sorgu vardır (eskiden bot başına 3).
+
+Sabit kısım `bots` / `bot_holdings` / `bot_positions` tablolarındaki trigger'ların
+`bot_context_changed` NOTIFY'ı ile bot bazında geçersiz kılınır (payload:
+"<tablo>:<bot_id>"). Trigger'lar INSERT/DELETE ve sadece sabit kolonların
+gerçekten değiştiği UPDATE'lerde çalışır; dakikalık hesaplama bildirim üretmez.
+Emir sonrası holdings/positions güncellemeleri commit sırasıyla, bir sonraki mum
+bildiriminden önce aynı LISTEN bağlantısından gelir. Sorgu sürerken değişiklik
+gelirse okunan satırlar önbelleğe yazılmaz. LISTEN bağlantısı koparsa önbellek
+boşaltılır; kaçan bildirimlere karşı BOT_CONTEXT_TTL_SEC sonunda kendiliğinden
+yenilenir. Trigger kurulamazsa önbellek kapanır, context her tick toplu okunur.
+"""
+import os
+import time
+import logging
+from typing import Dict, Any
+
+from sqlalchemy import text
+
+from trade_engine.config import get_engine
+from trade_engine.data.bot_features import load_bot_contexts, load_bot_context_parts, merge_bot_context
+
+logger = logging.getLogger(__name__)
+
+BOT_CONTEXT_CHANNEL = "bot_context_changed"
+BOT_CONTEXT_TTL_SEC = float(os.getenv("BOT_CONTEXT_TTL_SEC", "300"))
+
+_WATCHED_TABLES = ("bots", "bot_holdings", "bot_positions")
+
+# Önbellekteki sabit kısmı oluşturan kolonlar; UPDATE trigger'ı sadece bunlar değişince çalışır.
+# current_usd_value / fullness / percentage / unrealized_pnl her dakika yeniden yazıldığı için yok.
+_CONTEXT_COLUMNS = {
+    "bots": ("bot_type", "initial_usd_value", "api_id"),
+    "bot_holdings": ("bot_id", "symbol", "amount"),
+    "bot_positions": ("bot_id", "symbol", "position_side", "amount", "leverage"),
+}
+
+
+class BotContextCache:
+    def __init__(self, ttl: float = BOT_CONTEXT_TTL_SEC):
+        self.ttl = ttl
+        self.enabled = True    # trigger kurulamazsa False: her tick toplu okunur, saklanmaz
+        self.contexts = {}     # bot_id -> sabit kısım (bot_features._load_static)
+        self.version = 0
+        self.loaded_at = time.monotonic()
+
+        # Sayaçlar
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+        self.invalidations = 0
+
+    # ---------------- geçersiz kılma ----------------
+    def reset(self, reason: str = ""):
+        if self.contexts:
+            logger.info(f"🧹 Bot context önbelleği boşaltıldı ({reason}).")
+        self.contexts.clear()
+        self.version += 1
+        self.loaded_at = time.monotonic()
+
+    def handle(self, payload: str):
+        """LISTEN bot_context_changed bildirimi."""
+        table, _, bot_id = (payload or "").partition(":")
+        try:
+            bot_id = int(bot_id)
+        except ValueError:
+            self.reset(f"bilinmeyen bildirim: {payload[:100]}")
+            return
+        if table not in _WATCHED_TABLES:
+            self.reset(f"bilinmeyen tablo: {table}")
+            return
+        self.invalidations += 1
+        self.version += 1
+        self.contexts.pop(bot_id, None)
+
+    # ---------------- okuma ----------------
+    def get_many(self, bot_ids) -> Dict[int, Dict[str, Any]]:
+        """
+        Dönüş: { bot_id: context } (sabit kısım önbellekten, dakikalık değerler bu
+        tick'te okunur). Veritabanı hatasında okunamayan botlar dönüşte yer almaz;
+        çağıran taraf (control_the_results) o botlar için tekil yola döner.
+        """
+        if not self.enabled:
+            self.queries += 1
+            return load_bot_contexts(bot_ids)
+        if self.ttl and time.monotonic() - self.loaded_at > self.ttl:
+            self.reset("TTL")
+
+        wanted = list(dict.fromkeys(bot_ids))
+        contexts = self.contexts
+        missing = [bot_id for bot_id in wanted if bot_id not in contexts]
+        self.hits += len(wanted) - len(missing)
+        self.misses += len(missing)
+
+        version = self.version
+        loaded, live = load_bot_context_parts(missing, wanted)
+        self.queries += 1
+        if loaded:
+            if version == self.version:
+                contexts.update(loaded)
+            else:
+                # Sorgu sürerken bot değişti: bu tick okunanı kullan, önbelleğe yazma
+                contexts = {**contexts, **loaded}
+
+        return {
+            bot_id: merge_bot_context(contexts[bot_id], live[bot_id])
+            for bot_id in wanted if bot_id in contexts and bot_id in live
+        }
+
+    def stats(self) -> dict:
+        return {
+            "bots": len(self.contexts),
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "queries": self.queries,
+            "invalidations": self.invalidations,
+        }
+
+
+def ensure_bot_context_triggers():
+    """
+    bots / bot_holdings / bot_positions üzerinde NOTIFY trigger'larını kurar (idempotent):
+        - INSERT / DELETE: her zaman
+        - UPDATE OF <sabit kolonlar>: sadece değer gerçekten değiştiyse (WHEN ... IS DISTINCT FROM)
+    Eski sürümün her satırda çalışan trigger'ı (trg_<tablo>_context_changed) kaldırılır.
+    """
+    eng = get_engine()
+    with eng.begin() as conn:
+        conn.execute(text(f"""
+            CREATE OR REPLACE FUNCTION notify_{BOT_CONTEXT_CHANNEL}()
+            RETURNS trigger
+            LANGUAGE plpgsql
+            AS $function$
+            DECLARE
+                target_id bigint;
+            BEGIN
+                IF TG_TABLE_NAME = 'bots' THEN
+                    IF TG_OP = 'DELETE' THEN target_id := OLD.id; ELSE target_id := NEW.id; END IF;
+                ELSE
+                    IF TG_OP = 'DELETE' THEN target_id := OLD.bot_id; ELSE target_id := NEW.bot_id; END IF;
+                    IF TG_OP = 'UPDATE' THEN
+                        IF OLD.bot_id IS DISTINCT FROM NEW.bot_id THEN
+                            -- Satır başka bota taşındı: eski bot da yenilensin
+                            PERFORM pg_notify('{BOT_CONTEXT_CHANNEL}', TG_TABLE_NAME || ':' || OLD.bot_id);
+                        END IF;
+                    END IF;
+                END IF;
+                -- Aynı transaction'daki aynı payload'lar Postgres tarafından tekilleştirilir
+                PERFORM pg_notify('{BOT_CONTEXT_CHANNEL}', TG_TABLE_NAME || ':' || target_id);
+                RETURN NULL;
+            END;
+            $function$
+        """))
+        names = [f"trg_{table}_context_{kind}" for table in _WATCHED_TABLES for kind in ("changed", "rows", "update")]
+        existing = {
+            row[0] for row in conn.execute(
+                text("SELECT tgname FROM pg_trigger WHERE tgname = ANY(:names)"), {"names": names}
+            )
+        }
+        for table in _WATCHED_TABLES:
+            if f"trg_{table}_context_changed" in existing:
+                # Eski sürüm: FOR EACH ROW, her UPDATE'te (dakikalık hesaplama dahil) bildirim atıyordu
+                conn.execute(text(f"DROP TRIGGER trg_{table}_context_changed ON public.{table}"))
+
+            present = {
+                row[0] for row in conn.execute(
+                    text("""
+                        SELECT column_name FROM information_schema.columns
+                        WHERE table_schema = 'public' AND table_name = :table
+                    """),
+                    {"table": table},
+                )
+            }
+            columns = [col for col in _CONTEXT_COLUMNS[table] if col in present]  # leverage eski şemada yok
+            if f"trg_{table}_context_rows" not in existing:
+                conn.execute(text(f"""
+                    CREATE TRIGGER trg_{table}_context_rows
+                    AFTER INSERT OR DELETE ON public.{table}
+                    FOR EACH ROW EXECUTE FUNCTION notify_{BOT_CONTEXT_CHANNEL}()
+                """))
+            if f"trg_{table}_context_update" not in existing:
+                changed = " OR ".join(f"OLD.{col} IS DISTINCT FROM NEW.{col}" for col in columns)
+                conn.execute(text(f"""
+                    CREATE TRIGGER trg_{table}_context_update
+                    AFTER UPDATE OF {", ".join(columns)} ON public.{table}
+                    FOR EACH ROW WHEN ({changed})
+                    EXECUTE FUNCTION notify_{BOT_CONTEXT_CHANNEL}()
+                """))
+
+
+bot_context_cache = BotContextCache()
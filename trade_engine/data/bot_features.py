@@ -9,6 +9,49 @@ def _safe_float(x, default=0.0):
     except Exception:
         return default
 
+_HAS_LEVERAGE = None  # bot_positions.leverage kolonu var mı (process başına bir kez bakılır)
+
+
+def positions_have_leverage(conn) -> bool:
+    """leverage kolonu eski sürümlerde olmayabilir; information_schema'ya sadece ilk çağrıda bakılır."""
+    global _HAS_LEVERAGE
+    if _HAS_LEVERAGE is None:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT EXISTS (
+                    SELECT 1
+                    FROM information_schema.columns
+                    WHERE table_schema = 'public'
+                      AND table_name   = 'bot_positions'
+                      AND column_name  = 'leverage'
+                );
+                """
+            )
+            _HAS_LEVERAGE = bool(cur.fetchone()[0])
+    return _HAS_LEVERAGE
+
+
+def build_bot_context(bot: dict, holdings: list, positions: list) -> dict:
+    """bots satırı + holdings + positions -> load_bot_context sözlüğü."""
+    bot = bot or {}
+    bot_type = (bot.get("bot_type") or "spot").lower()
+    current_value = _safe_float(bot.get("current_usd_value"))
+    fullness_usdt = _safe_float(bot.get("fullness"))
+
+    # fullness fraction (0..1): fullness_usdt / current_value
+    fulness = (fullness_usdt / current_value) if current_value > 0 else 0.0
+    fulness = max(0.0, min(1.0, fulness))  # clamp
+
+    return {
+        "bot_type": bot_type,
+        "current_value": current_value,
+        "fulness": fulness,
+        "holdings": holdings,
+        "positions": positions,
+    }
+
+
 def load_bot_context(bot_id: int):
     """
     Tek bağlantı / tek fonksiyon ile:
@@ -25,83 +68,146 @@ def load_bot_context(bot_id: int):
       "holdings": [ {symbol, percentage, amount}, ... ],
       "positions": [ {symbol, position_side, amount, percentage, leverage}, ... ],
     }
+
+    Tick içinde botların context'i ana process'teki önbellekten gelir
+    (trade_engine/data/bot_context_cache.py); bu fonksiyon tekil kullanım içindir.
+    """
+    contexts = load_bot_contexts([bot_id])
+    return contexts.get(bot_id) or build_bot_context({}, [], [])
+
+
+def _load_static(cur, leverage_col: str, bot_ids: list) -> dict:
+    """
+    Context'in seyrek değişen kısmı: bot ayarları + holdings/positions satırları
+    (yüzdeler hariç). Sadece emir/ayar değişikliğiyle değişir, önbelleğe alınabilir.
+    Dönüş: { bot_id: {"bot": {...}, "holdings": [...], "positions": [...]} }
+    """
+    static = {bot_id: {"bot": {}, "holdings": [], "positions": []} for bot_id in bot_ids}
+
+    # --- bots ---
+    cur.execute(
+        """
+        SELECT id, bot_type, initial_usd_value, api_id
+        FROM public.bots
+        WHERE id = ANY(%s);
+        """,
+        (bot_ids,),
+    )
+    for row in cur.fetchall():
+        static[row["id"]]["bot"] = row
+
+    # --- holdings (spot tarafı) ---
+    cur.execute(
+        """
+        SELECT id, bot_id, symbol, amount
+        FROM public.bot_holdings
+        WHERE bot_id = ANY(%s);
+        """,
+        (bot_ids,),
+    )
+    for row in cur.fetchall():
+        static[row.pop("bot_id")]["holdings"].append(row)
+
+    # --- positions (futures tarafı) ---
+    # NOT: Burada status/state filtresi eklemedik (mevcut davranışı bozmayalım).
+    cur.execute(
+        f"""
+        SELECT id, bot_id, symbol, position_side, amount, {leverage_col} AS leverage
+        FROM public.bot_positions
+        WHERE bot_id = ANY(%s);
+        """,
+        (bot_ids,),
+    )
+    for row in cur.fetchall():
+        static[row.pop("bot_id")]["positions"].append(row)
+    return static
+
+
+def _load_live(cur, bot_ids: list) -> dict:
     """
-    bot = {}
-    holdings = []
-    positions = []
+    Context'in her dakika yeniden hesaplanan kısmı (minute_calculation -> bot_updates):
+    bots.current_usd_value / fullness ve holdings/positions yüzdeleri, tek sorguda.
+    Dönüş: { bot_id: {"current_usd_value", "fullness", "percentages": {satır id: yüzde}} }
+    """
+    cur.execute(
+        """
+        SELECT 'b' AS kind, id AS bot_id, NULL::integer AS row_id,
+               current_usd_value AS value, fullness
+        FROM public.bots WHERE id = ANY(%s)
+        UNION ALL
+        SELECT 'h', bot_id, id, percentage, NULL
+        FROM public.bot_holdings WHERE bot_id = ANY(%s)
+        UNION ALL
+        SELECT 'p', bot_id, id, percentage, NULL
+        FROM public.bot_positions WHERE bot_id = ANY(%s);
+        """,
+        (bot_ids, bot_ids, bot_ids),
+    )
+    live = {}
+    for row in cur.fetchall():
+        entry = live.setdefault(row["bot_id"], {"current_usd_value": None, "fullness": None, "percentages": {}})
+        if row["kind"] == "b":
+            entry["current_usd_value"] = row["value"]
+            entry["fullness"] = row["fullness"]
+        else:
+            entry["percentages"][(row["kind"], row["row_id"])] = row["value"]
+    return live
+
+
+def merge_bot_context(static: dict, live: dict) -> dict:
+    """Önbellekteki sabit kısım + bu tick okunan değerler -> load_bot_context sözlüğü (+ values/api_id)."""
+    live = live or {}
+    pct = live.get("percentages", {})
+    bot = {**static["bot"], "current_usd_value": live.get("current_usd_value"), "fullness": live.get("fullness")}
+    holdings = [
+        {"symbol": h["symbol"], "percentage": pct.get(("h", h["id"])), "amount": h["amount"]}
+        for h in static["holdings"]
+    ]
+    positions = [
+        {"symbol": p["symbol"], "position_side": p["position_side"], "amount": p["amount"],
+         "percentage": pct.get(("p", p["id"])), "leverage": p["leverage"]}
+        for p in static["positions"]
+    ]
+    ctx = build_bot_context(bot, holdings, positions)
+    # Snapshot / sandbox yardımcıları için ham değerler
+    ctx["values"] = {
+        "fullness": bot.get("fullness"),
+        "current_usd_value": bot.get("current_usd_value"),
+        "initial_usd_value": bot.get("initial_usd_value"),
+    }
+    ctx["api_id"] = bot.get("api_id")
+    return ctx
+
 
+def load_bot_context_parts(static_ids, live_ids):
+    """
+    Tek bağlantıda: static_ids için sabit kısım (3 sorgu), live_ids için dakikalık
+    değerler (1 sorgu). Dönüş: (static, live) — veritabanı hatasında ({}, {}).
+    """
+    static_ids = list(dict.fromkeys(static_ids))
+    live_ids = list(dict.fromkeys(live_ids))
+    if not static_ids and not live_ids:
+        return {}, {}
     try:
         with psycopg2_connection() as conn:
+            leverage_col = "leverage" if positions_have_leverage(conn) else "NULL::numeric"
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                # --- bots ---
-                cur.execute(
-                    """
-                    SELECT bot_type, current_usd_value, fullness
-                    FROM public.bots
-                    WHERE id = %s
-                    LIMIT 1;
-                    """,
-                    (bot_id,),
-                )
-                bot = cur.fetchone() or {}
-
-                # --- holdings (spot tarafı) ---
-                cur.execute(
-                    """
-                    SELECT symbol, percentage, amount
-                    FROM public.bot_holdings
-                    WHERE bot_id = %s;
-                    """,
-                    (bot_id,),
-                )
-                holdings = cur.fetchall() or []
-
-                # --- positions (futures tarafı) ---
-                # leverage kolonu eski sürümlerde olmayabilir; varsa al, yoksa NULL dön.
-                # NOT: Burada status/state filtresi eklemedik (mevcut davranışı bozmayalım).
-                cur.execute(
-                    """
-                    SELECT
-                        symbol,
-                        position_side,
-                        amount,
-                        percentage,
-                        CASE WHEN EXISTS (
-                            SELECT 1
-                            FROM information_schema.columns
-                            WHERE table_schema = 'public'
-                              AND table_name   = 'bot_positions'
-                              AND column_name  = 'leverage'
-                        )
-                        THEN leverage
-                        ELSE NULL
-                        END AS leverage
-                    FROM public.bot_positions
-                    WHERE bot_id = %s;
-                    """,
-                    (bot_id,),
-                )
-                positions = cur.fetchall() or []
-
+                static = _load_static(cur, leverage_col, static_ids) if static_ids else {}
+                live = _load_live(cur, live_ids) if live_ids else {}
     except Exception as e:
         print(f"[load_bot_context] Veritabanı hatası: {e}")
+        return {}, {}
+    return static, live
 
-    # --- Sonuç hesapları ---
-    bot_type = (bot.get("bot_type") or "spot").lower()
-    current_value = _safe_float(bot.get("current_usd_value"))
-    fullness_usdt = _safe_float(bot.get("fullness"))
-
-    # fullness fraction (0..1): fullness_usdt / current_value
-    fulness = (fullness_usdt / current_value) if current_value > 0 else 0.0
-    fulness = max(0.0, min(1.0, fulness))  # clamp
 
-    return {
-        "bot_type": bot_type,
-        "current_value": current_value,
-        "fulness": fulness,
-        "holdings": holdings,
-        "positions": positions,
-    }
+def load_bot_contexts(bot_ids) -> dict:
+    """
+    Birden çok bot için context'i tek bağlantıda, set-based sorgularla okur.
+    Dönüş: { bot_id: context } — veritabanı hatasında boş sözlük.
+    """
+    bot_ids = list(dict.fromkeys(bot_ids))
+    static, live = load_bot_context_parts(bot_ids, bot_ids)
+    return {bot_id: merge_bot_context(static[bot_id], live.get(bot_id)) for bot_id in bot_ids if bot_id in static}
 
 # ---- Geriye dönük uyumluluk için thin-wrapper fonksiyonlar ----
 def load_bot_holding(bot_id):
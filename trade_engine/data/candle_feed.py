@@ -0,0 +1,291 @@
+# trade_engine/data/candle_feed.py
+"""
+data_engine'in `candle_feed` NOTIFY yayınının abonesi.
+
+- Stratejilerin istediği (tablo, coin, interval) anahtarları için bellekte
+  mum pencereleri tutar; pencereler ilk seferde DB'den seed edilir, sonra
+  yayından gelen kapanmış mumlar eklenir (sorgu yok).
+- Mesajlardaki epoch/seq ile kaçan mesaj veya publisher yeniden başlatması
+  tespit edilir; bu durumda tüm pencereler atılır ve DB'ye dönülür.
+- Bir anahtarda ardışık olmayan mum gelirse sadece o pencere atılır.
+- Yayın kaçırılsa (ya da kapalı olsa) bile pencere atılmaz: data_load sadece
+  son görülen mumdan yeni satırları çekip `extend` ile ekler; boşluk çıkarsa
+  pencere atılır ve tam pencere DB'den yeniden okunur.
+- Pencere uzunlukları aktif botların istediği en büyük candle_count'a göre
+  `retain` ile ayarlanır; artık istenmeyen anahtarlar bırakılır.
+
+Mesaj formatı için data_engine/candle_feed.py'ye bakın.
+"""
+import json
+import os
+import logging
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from trade_engine.config import asyncpg_connection
+from trade_engine.data.readiness import readiness
+
+logger = logging.getLogger(__name__)
+
+CANDLE_FEED_ENABLED = os.getenv("CANDLE_FEED_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+# Bellekteki pencereler (yayın kapalıyken de artımlı DB okumasıyla güncellenir)
+CANDLE_WINDOWS_ENABLED = os.getenv("CANDLE_WINDOWS_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+
+FEED_CHANNEL = "candle_feed"
+OVERFLOW_TABLE = "candle_feed_overflow"
+
+MARKET_TABLES = {
+    "spot": "binance_data",
+    "futures": "binance_futures",
+}
+
+EPOCH = datetime(1970, 1, 1)
+
+# Sabit uzunluklu intervaller (ardışıklık kontrolü için); "1M" kontrol edilmez
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000, "3d": 259_200_000,
+    "1w": 604_800_000,
+}
+
+COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+
+def to_ms(ts) -> int:
+    """datetime / pandas.Timestamp / ISO metin (naive ise UTC kabul edilir) -> epoch ms"""
+    if isinstance(ts, pd.Timestamp):
+        return int(ts.value // 1_000_000)
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((ts - EPOCH) / timedelta(milliseconds=1))
+
+
+def from_ms(ms: int) -> datetime:
+    """epoch ms -> naive UTC datetime (DB timestamp kolonu ile karşılaştırmak için)"""
+    return EPOCH + timedelta(milliseconds=ms)
+
+
+def _df_rows(df: pd.DataFrame):
+    """(timestamp ASC) DataFrame -> [(open_ms, open, high, low, close, volume), ...]"""
+    return list(zip(
+        df["timestamp"].map(to_ms).tolist(),
+        df["open"].astype(float).tolist(), df["high"].astype(float).tolist(),
+        df["low"].astype(float).tolist(), df["close"].astype(float).tolist(),
+        df["volume"].astype(float).tolist(),
+    ))
+
+
+class CandleFeed:
+    def __init__(self):
+        # (table, coin_id, interval) -> deque[(open_ms, open, high, low, close, volume)]
+        self.windows = {}
+        self.epoch = None
+        self.next_seq = None
+
+        # Sayaçlar
+        self.messages = 0
+        self.gaps = 0
+        self.hits = 0
+        self.misses = 0
+        self.extended = 0      # artımlı DB okumasıyla güncellenen pencere
+        self.window_gaps = 0   # artımlı okumada boşluk çıkıp atılan pencere
+        self.trimmed = 0       # artık istenmediği için bırakılan pencere
+
+    # ---------------- yayın tarafı ----------------
+    def reset(self, reason: str = ""):
+        if self.windows:
+            logger.warning(f"🧹 Candle feed pencereleri sıfırlandı ({reason}); DB'den yeniden yüklenecek.")
+        self.windows.clear()
+        self.next_seq = None
+        readiness.wake_all()
+
+    async def _load_overflow(self, epoch: str, seq: int):
+        async with asyncpg_connection() as conn:
+            payload = await conn.fetchval(
+                f"SELECT payload FROM {OVERFLOW_TABLE} WHERE epoch = $1 AND seq = $2", epoch, seq
+            )
+        return json.loads(payload)["c"] if payload else None
+
+    async def handle(self, payload: str):
+        """LISTEN bağlantısında, tick bildirimlerinden önce sırayla çağrılmalı."""
+        try:
+            msg = json.loads(payload)
+            epoch, seq = msg["e"], int(msg["q"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"⚠ Geçersiz candle feed mesajı: {payload[:200]}")
+            self.reset("geçersiz mesaj")
+            return
+
+        self.messages += 1
+        if epoch != self.epoch:
+            if self.epoch is not None:
+                self.reset("publisher yeniden başladı")
+            self.epoch = epoch
+        elif self.next_seq is not None and seq != self.next_seq:
+            self.gaps += 1
+            self.reset(f"seq boşluğu: beklenen {self.next_seq}, gelen {seq}")
+        self.next_seq = seq + 1
+
+        table = MARKET_TABLES.get(msg.get("m"))
+        if table is None:
+            return
+
+        candles = msg.get("c")
+        if msg.get("o"):
+            try:
+                candles = await self._load_overflow(epoch, seq)
+            except Exception as e:
+                logger.warning(f"⚠ Candle feed overflow okunamadı: {e}")
+                candles = None
+            if candles is None:
+                self.reset("overflow kaydı bulunamadı")
+                return
+
+        for coin_id, interval, open_ms, o, h, l, c, v in candles:
+            self._apply((table, coin_id, interval), interval, (int(open_ms), o, h, l, c, v))
+            readiness.mark(table, coin_id, interval, int(open_ms))
+
+    def _apply(self, key, interval: str, candle):
+        rows = self.windows.get(key)
+        if not rows:
+            return  # kimsenin istemediği anahtar
+
+        open_ms = candle[0]
+        last_ms = rows[-1][0]
+        if open_ms == last_ms:
+            rows[-1] = candle
+        elif open_ms > last_ms:
+            step = INTERVAL_MS.get(interval)
+            if step and open_ms != last_ms + step:
+                # Araya mum kaçmış: pencereyi bırak, bir sonraki istek DB'den gelsin
+                del self.windows[key]
+                return
+            rows.append(candle)
+        else:
+            # Eski bir mumun güncellemesi: pencere içindeyse yerinde değiştir
+            for i in range(len(rows) - 1, -1, -1):
+                if rows[i][0] == open_ms:
+                    rows[i] = candle
+                    break
+                if rows[i][0] < open_ms:
+                    break
+
+    # ---------------- strateji tarafı ----------------
+    def get(self, table: str, coin_id: str, interval: str, count: int, min_timestamp=None):
+        """Pencere yeterli ve güncelse son `count` mumu DataFrame olarak döner; değilse None."""
+        rows = self.windows.get((table, coin_id, interval))
+        if (
+            not rows
+            or len(rows) < count
+            or (min_timestamp is not None and rows[-1][0] < to_ms(min_timestamp))
+        ):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return self._frame(rows, count)
+
+    @staticmethod
+    def _frame(rows, count: int) -> pd.DataFrame:
+        tail = list(rows)[-count:]
+        df = pd.DataFrame(tail, columns=COLUMNS)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+        return df
+
+    def snapshot(self, table: str, coin_id: str, interval: str, count: int):
+        """Tazelik kontrolü olmadan son `count` mum (tick'in mumu henüz yazılmamışsa eski veriyle devam için)."""
+        rows = self.windows.get((table, coin_id, interval))
+        if not rows or len(rows) < count:
+            return None
+        return self._frame(rows, count)
+
+    def last_open_ms(self, table: str, coin_id: str, interval: str, count: int):
+        """Pencere `count` mum için yeterliyse son mumun açılış zamanı (ms); değilse None."""
+        rows = self.windows.get((table, coin_id, interval))
+        if not rows or len(rows) < count:
+            return None
+        return rows[-1][0]
+
+    def extend(self, table: str, coin_id: str, interval: str, df: pd.DataFrame) -> bool:
+        """
+        Son görülen mumdan sonra DB'den okunan (timestamp ASC) mumları ekler; deque
+        uzunluğu pencereyi kendiliğinden kırpar. Ardışıklık bozuksa pencere atılır, False döner.
+        """
+        key = (table, coin_id, interval)
+        rows = self.windows.get(key)
+        if not rows:
+            return False
+        if df is None or df.empty:
+            return True
+
+        step = INTERVAL_MS.get(interval)
+        last_ms = rows[-1][0]
+        for candle in _df_rows(df):
+            if candle[0] < last_ms:
+                continue  # bu arada yayından gelmiş
+            if candle[0] == last_ms:
+                rows[-1] = candle
+                continue
+            if step and candle[0] != last_ms + step:
+                self.window_gaps += 1
+                del self.windows[key]
+                return False
+            rows.append(candle)
+            last_ms = candle[0]
+        self.extended += 1
+        return True
+
+    def retain(self, table: str, requirements: dict):
+        """
+        requirements: { (coin_id, interval): candle_count } — bu tablo ve intervaller için
+        gereken tam küme. Pencere uzunluğunu en büyük candle_count'a ayarlar, istenmeyenleri bırakır.
+        """
+        intervals = {interval for _, interval in requirements}
+        for key in [k for k in self.windows if k[0] == table and k[2] in intervals]:
+            need = requirements.get((key[1], key[2]))
+            if need is None:
+                del self.windows[key]
+                self.trimmed += 1
+            elif self.windows[key].maxlen != need:
+                # Büyürse pencere eksik kalır; bir sonraki get() tam okumaya düşer
+                self.windows[key] = deque(self.windows[key], maxlen=need)
+
+    def seed(self, table: str, coin_id: str, interval: str, df: pd.DataFrame, maxlen: int):
+        """DB'den okunan (timestamp ASC) DataFrame ile pencereyi kurar."""
+        if df is None or df.empty:
+            return
+        key = (table, coin_id, interval)
+        rows = deque(_df_rows(df), maxlen=max(maxlen, len(df)))
+
+        # DB sorgusu sürerken yayından gelmiş daha yeni mumları koru
+        old = self.windows.get(key)
+        if old:
+            last_ms = rows[-1][0]
+            step = INTERVAL_MS.get(interval)
+            for candle in old:
+                if candle[0] > last_ms:
+                    if step and candle[0] != last_ms + step:
+                        break
+                    rows.append(candle)
+                    last_ms = candle[0]
+        self.windows[key] = rows
+
+    def stats(self) -> dict:
+        return {
+            "windows": len(self.windows),
+            "messages": self.messages,
+            "gaps": self.gaps,
+            "hits": self.hits,
+            "misses": self.misses,
+            "extended": self.extended,
+            "window_gaps": self.window_gaps,
+            "trimmed": self.trimmed,
+        }
+
+
+candle_feed = CandleFeed()
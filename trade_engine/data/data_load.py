@@ -4,14 +4,70 @@ import time
 import pandas as pd
 from sqlalchemy import text
 from trade_engine.config import get_engine  # lazy & fork-safe engine
+from trade_engine.data.candle_feed import candle_feed, CANDLE_WINDOWS_ENABLED, INTERVAL_MS, from_ms, to_ms
 
-async def fetch_all_candles(coin_requirements: dict[tuple[str, str], int], table_name: str = "binance_data"):
+async def fetch_all_candles(coin_requirements: dict[tuple[str, str], int], table_name: str = "binance_data",
+                            min_timestamp=None):
     """
     coin_requirements: { (coin_id, interval): candle_count }
+    min_timestamp: tick'in mum zamanı; pencere bundan eskiyse DB'ye gidilir
     Dönüş: { (coin_id, interval): DataFrame }
+
+    Sıra: bellekteki pencere güncelse sorgu yok; pencere var ama eskiyse sadece
+    son mumdan yeni satırlar tek sorguda çekilir; pencere yoksa / boşluk çıktıysa /
+    pencere candle_count mumdan fazla geride kaldıysa tam pencere okunur.
     """
     semaphore = asyncio.Semaphore(15)  # Aynı anda en fazla 15 istek
 
+    coin_data_dict: dict[tuple[str, str], pd.DataFrame] = {}
+    to_extend = {}  # key -> son mumun açılışı (ms)
+    to_fetch = {}
+    min_ms = to_ms(min_timestamp) if min_timestamp is not None else None
+    if CANDLE_WINDOWS_ENABLED:
+        candle_feed.retain(table_name, coin_requirements)
+
+    for key, candle_count in coin_requirements.items():
+        df = None
+        if CANDLE_WINDOWS_ENABLED:
+            df = candle_feed.get(table_name, key[0], key[1], candle_count, min_timestamp)
+        if df is not None:
+            coin_data_dict[key] = df
+            continue
+        last_ms = candle_feed.last_open_ms(table_name, key[0], key[1], candle_count) if CANDLE_WINDOWS_ENABLED else None
+        step = INTERVAL_MS.get(key[1])
+        if last_ms is not None and min_ms is not None and step and min_ms - last_ms > candle_count * step:
+            last_ms = None  # pencerenin tamamı eskimiş: artımlı okuma en eski mumları getirirdi
+        if last_ms is not None:
+            to_extend[key] = last_ms
+        else:
+            to_fetch[key] = candle_count
+
+    # 1) Artımlı: (coin, interval) başına sadece yeni mumlar, tek round-trip
+    if to_extend:
+        loop = asyncio.get_event_loop()
+        new_rows = await loop.run_in_executor(
+            None, get_candles_since,
+            {key: (from_ms(ms), coin_requirements[key]) for key, ms in to_extend.items()}, table_name,
+        )
+        for key in to_extend:
+            coin_id, interval = key
+            rows = new_rows.get(key) if new_rows is not None else None
+            if (
+                new_rows is None
+                # LIMIT'e takıldıysa (ASC) en yeni mumlar gelmemiş olabilir
+                or (rows is not None and len(rows) >= coin_requirements[key])
+                or not candle_feed.extend(table_name, coin_id, interval, rows)
+            ):
+                to_fetch[key] = coin_requirements[key]  # okuma hatası / boşluk / çok geride: tam pencere
+                continue
+            # Tick'in mumu henüz yazılmadıysa eski pencereyle döner; tazelik kontrolü run_trade_engine'de
+            df = candle_feed.snapshot(table_name, coin_id, interval, coin_requirements[key])
+            if df is not None:
+                coin_data_dict[key] = df
+            else:
+                to_fetch[key] = coin_requirements[key]
+
+    # 2) Tam pencere
     async def fetch_one(key, candle_count):
         coin_id, interval = key
         async with semaphore:
@@ -20,11 +76,12 @@ async def fetch_all_candles(coin_requirements: dict[tuple[str, str], int], table
             # print(f"⏱️ {coin_id}-{interval}: {time.time() - t0:.2f}s")
             return key, df
 
-    tasks = [fetch_one(key, count) for key, count in coin_requirements.items()]
+    tasks = [fetch_one(key, count) for key, count in to_fetch.items()]
     results = await asyncio.gather(*tasks)
 
-    coin_data_dict: dict[tuple[str, str], pd.DataFrame] = {}
     for (coin_id, interval), df in results:
+        if CANDLE_WINDOWS_ENABLED:
+            candle_feed.seed(table_name, coin_id, interval, df, coin_requirements[(coin_id, interval)])
         if len(df) >= coin_requirements[(coin_id, interval)]:
             coin_data_dict[(coin_id, interval)] = df
         else:
@@ -34,6 +91,46 @@ async def fetch_all_candles(coin_requirements: dict[tuple[str, str], int], table
     return coin_data_dict
 
 
+def get_candles_since(since: dict, table_name: str = "binance_data"):
+    """
+    since: { (coin_id, interval): (son görülen timestamp, en fazla satır) }
+    Her anahtar için timestamp'i daha yeni mumları tek sorguda (LATERAL) çeker.
+    Dönüş: { (coin_id, interval): DataFrame (timestamp ASC) }; hata olursa None.
+    """
+    keys = list(since)
+    sql = text(f"""
+        SELECT k.cid AS coin_id, k.iv AS interval, c.timestamp, c.open, c.high, c.low, c.close, c.volume
+        FROM unnest(CAST(:coins AS text[]), CAST(:intervals AS text[]),
+                    CAST(:since AS timestamp[]), CAST(:limits AS int[])) AS k(cid, iv, since, lim)
+        CROSS JOIN LATERAL (
+            SELECT b.timestamp, b.open, b.high, b.low, b.close, b.volume
+            FROM public.{table_name} b
+            WHERE b.coin_id = k.cid AND b.interval = k.iv AND b.timestamp > k.since
+            ORDER BY b.timestamp ASC
+            LIMIT k.lim
+        ) c
+        ORDER BY k.cid, k.iv, c.timestamp
+    """)
+
+    try:
+        eng = get_engine()
+        with eng.connect() as conn:
+            df = pd.read_sql_query(sql, conn, params={
+                "coins": [k[0] for k in keys],
+                "intervals": [k[1] for k in keys],
+                "since": [since[k][0] for k in keys],
+                "limits": [int(since[k][1]) for k in keys],
+            })
+    except Exception as e:
+        print(f"Artımlı veri çekme hatası: {e}")
+        return None
+
+    return {
+        key: group.drop(columns=["coin_id", "interval"]).reset_index(drop=True)
+        for key, group in df.groupby(["coin_id", "interval"], sort=False)
+    }
+
+
 async def get_candles_async(coin_id: str, interval: str, candle_count: int, table_name: str = "binance_data") -> pd.DataFrame:
     loop = asyncio.get_event_loop()
     return await loop.run_in_executor(None, get_candles, coin_id, interval, candle_count, table_name)
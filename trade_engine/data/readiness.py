@@ -0,0 +1,125 @@
+# trade_engine/data/readiness.py
+"""
+Tick verisi için hazır olma bariyeri.
+
+data_engine her yazdığı kapanmış mumu `candle_feed` NOTIFY'ı ile yayınlar;
+candle_feed aboneliği her mum için `readiness.mark` çağırır. run_trade_engine
+DB'de henüz tick mumu olmayan (coin, interval) anahtarları için burada bekler:
+    - her anahtar için bir future; ilgili mum yazılınca çözülür
+    - tek bir ortak deadline; dolunca beklenenlerin eksik kalanı raporlanır
+Böylece sabit aralıklı tekrar sorgu (polling) yerine sadece gelen anahtarlar
+yeniden okunur.
+
+Yayında mesaj kaçarsa (candle_feed.reset) bekleyen herkes uyandırılır; kimin
+yazıldığını artık bilemediğimiz için çağıran taraf DB'den kontrol eder.
+CANDLE_FEED_ENABLED kapalıysa bariyer kullanılmaz; run_trade_engine sadece eksik
+anahtarları READINESS_POLL_SEC aralıkla deadline'a kadar yeniden okur.
+"""
+import asyncio
+import os
+import time
+
+READINESS_DEADLINE_SEC = float(os.getenv("READINESS_DEADLINE_SEC", "5"))
+# candle_feed kapalıysa bariyer sinyal alamaz: eksik anahtarlar bu aralıkla DB'den yeniden okunur
+READINESS_POLL_SEC = float(os.getenv("READINESS_POLL_SEC", "0.5"))
+
+
+class ReadinessBarrier:
+    def __init__(self):
+        self.latest = {}    # (table, coin_id, interval) -> yazılan son mumun open_ms'i
+        self.waiters = {}   # (table, coin_id, interval) -> [(min_ms, future), ...]
+
+        # Sayaçlar
+        self.waits = 0
+        self.timeouts = 0
+
+    def mark(self, table: str, coin_id: str, interval: str, open_ms: int):
+        key = (table, coin_id, interval)
+        if open_ms > self.latest.get(key, -1):
+            self.latest[key] = open_ms
+        waiting = self.waiters.get(key)
+        if not waiting:
+            return
+        remaining = []
+        for min_ms, fut in waiting:
+            if open_ms >= min_ms:
+                if not fut.done():
+                    fut.set_result(True)
+            elif not fut.done():
+                remaining.append((min_ms, fut))
+        if remaining:
+            self.waiters[key] = remaining
+        else:
+            del self.waiters[key]
+
+    def wake_all(self):
+        """Yayın sürekliliği bozuldu: bekleyenler DB'den kontrol etsin."""
+        for waiting in self.waiters.values():
+            for _, fut in waiting:
+                if not fut.done():
+                    fut.set_result(False)
+        self.waiters.clear()
+
+    def is_ready(self, table: str, coin_id: str, interval: str, min_ms: int) -> bool:
+        return self.latest.get((table, coin_id, interval), -1) >= min_ms
+
+    async def wait(self, table: str, keys, min_ms: int, timeout: float = READINESS_DEADLINE_SEC):
+        """
+        keys: [(coin_id, interval), ...]; hepsi için open_ms >= min_ms mum yazılana
+        ya da ortak deadline dolana kadar bekler.
+        Dönüş: (sinyal gelen anahtarlar, deadline'da hâlâ bekleyen anahtarlar)
+        """
+        loop = asyncio.get_running_loop()
+        self.waits += 1
+        futures = {}
+        signaled = set()
+        for coin_id, interval in keys:
+            if self.is_ready(table, coin_id, interval, min_ms):
+                signaled.add((coin_id, interval))
+                continue
+            fut = loop.create_future()
+            self.waiters.setdefault((table, coin_id, interval), []).append((min_ms, fut))
+            futures[fut] = (coin_id, interval)
+
+        if futures:
+            deadline = time.monotonic() + timeout
+            pending = set(futures)
+            while pending:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=left, return_when=asyncio.FIRST_COMPLETED)
+                signaled.update(futures[f] for f in done)
+                if any(f.result() is False for f in done):
+                    # wake_all: kalanlar da DB'den kontrol edilsin
+                    signaled.update(futures[f] for f in pending)
+                    pending = set()
+            for fut in pending:
+                fut.cancel()
+            self._forget(table, futures)
+            if pending:
+                self.timeouts += 1
+            return signaled, {futures[f] for f in pending}
+        return signaled, set()
+
+    def _forget(self, table: str, futures: dict):
+        for fut, (coin_id, interval) in futures.items():
+            key = (table, coin_id, interval)
+            waiting = self.waiters.get(key)
+            if waiting:
+                waiting = [(m, f) for m, f in waiting if f is not fut]
+                if waiting:
+                    self.waiters[key] = waiting
+                else:
+                    del self.waiters[key]
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self.latest),
+            "waiting": sum(len(w) for w in self.waiters.values()),
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+        }
+
+
+readiness = ReadinessBarrier()
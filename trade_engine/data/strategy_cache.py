@@ -0,0 +1,204 @@
+# trade_engine/data/strategy_cache.py
+"""
+Strateji ve indikatör kodları için süreç içi, versiyonlu önbellek.
+
+run_trade_engine eskiden her bot için load_strategy + load_indicators çağırıyordu
+(bot başına 3 sorgu). Artık tick'in tüm botları için:
+    - botlar: load_active_bots (tek sorgu, değişmedi)
+    - önbellekte olmayan stratejiler ve indikatörleri: tek set-based sorgu
+
+Önbellek `strategies` / `indicators` tablolarındaki trigger'ların
+`strategy_code_changed` NOTIFY'ı ile satır bazında geçersiz kılınır
+(payload: "strategies:<id>" / "indicators:<id>"). Her geçersiz kılmada versiyon
+artar; sorgu sürerken değişiklik gelirse okunan satırlar önbelleğe yazılmaz.
+LISTEN bağlantısı koparsa / trigger kurulamazsa önbellek tamamen boşaltılır ve
+STRATEGY_CACHE_TTL_SEC sonunda kendiliğinden yenilenir.
+"""
+import os
+import time
+import logging
+from typing import List, Dict, Any
+
+from sqlalchemy import text, bindparam, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from trade_engine.config import get_engine
+from trade_engine.data.indicator_load import _parse_pg_array_text
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_CACHE_CHANNEL = "strategy_code_changed"
+STRATEGY_CACHE_TTL_SEC = float(os.getenv("STRATEGY_CACHE_TTL_SEC", "900"))
+
+_WATCHED_TABLES = ("strategies", "indicators")
+
+
+def _normalize_ids(indicator_ids) -> List[int]:
+    """indicator_ids (int[] / '{1,2}' / None) -> sırası korunmuş, tekrarsız [int]"""
+    if indicator_ids is None:
+        return []
+    if isinstance(indicator_ids, str):
+        ids = _parse_pg_array_text(indicator_ids)
+    else:
+        try:
+            ids = [int(x) for x in indicator_ids if x is not None]
+        except Exception:
+            ids = []
+    return list(dict.fromkeys(ids))
+
+
+class StrategyCache:
+    def __init__(self, ttl: float = STRATEGY_CACHE_TTL_SEC):
+        self.ttl = ttl
+        self.strategies = {}   # strategy_id -> (code, [indicator_id, ...])
+        self.indicators = {}   # indicator_id -> {"id", "name", "code"}
+        self.version = 0
+        self.loaded_at = time.monotonic()
+
+        # Sayaçlar
+        self.queries = 0
+        self.invalidations = 0
+
+    # ---------------- geçersiz kılma ----------------
+    def reset(self, reason: str = ""):
+        if self.strategies or self.indicators:
+            logger.info(f"🧹 Strateji önbelleği boşaltıldı ({reason}).")
+        self.strategies.clear()
+        self.indicators.clear()
+        self.version += 1
+        self.loaded_at = time.monotonic()
+
+    def handle(self, payload: str):
+        """LISTEN strategy_code_changed bildirimi."""
+        table, _, row_id = (payload or "").partition(":")
+        try:
+            row_id = int(row_id)
+        except ValueError:
+            self.reset(f"bilinmeyen bildirim: {payload[:100]}")
+            return
+        self.invalidations += 1
+        self.version += 1
+        if table == "strategies":
+            self.strategies.pop(row_id, None)
+        elif table == "indicators":
+            self.indicators.pop(row_id, None)
+        else:
+            self.reset(f"bilinmeyen tablo: {table}")
+
+    # ---------------- okuma ----------------
+    def _fetch(self, strategy_ids: List[int], indicator_ids: List[int]):
+        """Eksik stratejileri ve (onların + ek olarak istenen) indikatörleri tek sorguda çeker."""
+        stmt = (
+            text("""
+                WITH s AS (
+                    SELECT id, code, indicator_ids
+                    FROM public.strategies
+                    WHERE id = ANY(:sids)
+                )
+                SELECT 's' AS kind, s.id, NULL::text AS name, s.code, s.indicator_ids::text AS indicator_ids
+                FROM s
+                UNION ALL
+                SELECT 'i' AS kind, i.id, i.name, i.code, NULL::text
+                FROM public.indicators i
+                WHERE i.id = ANY(:iids)
+                   OR i.id IN (SELECT unnest(s.indicator_ids::int[]) FROM s)
+            """)
+            .bindparams(bindparam("sids", type_=ARRAY(Integer)), bindparam("iids", type_=ARRAY(Integer)))
+        )
+        eng = get_engine()
+        with eng.connect() as conn:
+            rows = conn.execute(stmt, {"sids": strategy_ids, "iids": indicator_ids}).fetchall()
+        self.queries += 1
+
+        strategies, indicators = {}, {}
+        for r in rows:
+            m = r._mapping
+            if m["kind"] == "s":
+                strategies[m["id"]] = (m["code"], _normalize_ids(m["indicator_ids"]))
+            else:
+                indicators[m["id"]] = {"id": m["id"], "name": m["name"], "code": m["code"]}
+        return strategies, indicators
+
+    def get_many(self, strategy_ids) -> Dict[int, Dict[str, Any]]:
+        """
+        Dönüş: { strategy_id: {"strategy_code": str|None, "indicators": [ {id, name, code}, ... ]} }
+        Bulunamayan strateji için kod None, indikatör listesi boş olur (eski loader'larla aynı).
+        """
+        if self.ttl and time.monotonic() - self.loaded_at > self.ttl:
+            self.reset("TTL")
+
+        wanted = list(dict.fromkeys(strategy_ids))
+        strategies, indicators = self.strategies, self.indicators
+        missing_s = [sid for sid in wanted if sid not in strategies]
+        missing_i = sorted({
+            iid for sid in wanted if sid in strategies
+            for iid in strategies[sid][1] if iid not in indicators
+        })
+
+        if missing_s or missing_i:
+            version = self.version
+            try:
+                new_s, new_i = self._fetch(missing_s, missing_i)
+            except Exception as e:
+                print(f"Veritabanı hatası: {e}")
+                new_s, new_i = {}, {}
+            if version == self.version:
+                strategies.update(new_s)
+                indicators.update(new_i)
+            else:
+                # Sorgu sürerken kod değişti: bu tick okunanı kullan, önbelleğe yazma
+                strategies = {**strategies, **new_s}
+                indicators = {**indicators, **new_i}
+
+        out = {}
+        for sid in wanted:
+            code, ids = strategies.get(sid, (None, []))
+            out[sid] = {
+                "strategy_code": code,
+                "indicators": [indicators[i] for i in ids if i in indicators],
+            }
+        return out
+
+    def stats(self) -> dict:
+        return {
+            "strategies": len(self.strategies),
+            "indicators": len(self.indicators),
+            "version": self.version,
+            "queries": self.queries,
+            "invalidations": self.invalidations,
+        }
+
+
+def ensure_change_triggers():
+    """strategies / indicators üzerinde satır bazlı NOTIFY trigger'larını kurar (idempotent)."""
+    eng = get_engine()
+    with eng.begin() as conn:
+        conn.execute(text(f"""
+            CREATE OR REPLACE FUNCTION notify_{STRATEGY_CACHE_CHANNEL}()
+            RETURNS trigger
+            LANGUAGE plpgsql
+            AS $function$
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    PERFORM pg_notify('{STRATEGY_CACHE_CHANNEL}', TG_TABLE_NAME || ':' || OLD.id);
+                ELSE
+                    PERFORM pg_notify('{STRATEGY_CACHE_CHANNEL}', TG_TABLE_NAME || ':' || NEW.id);
+                END IF;
+                RETURN NULL;
+            END;
+            $function$
+        """))
+        for table in _WATCHED_TABLES:
+            exists = conn.execute(
+                text("SELECT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = :name)"),
+                {"name": f"trg_{table}_code_changed"},
+            ).scalar()
+            if not exists:
+                conn.execute(text(f"""
+                    CREATE TRIGGER trg_{table}_code_changed
+                    AFTER INSERT OR UPDATE OR DELETE ON public.{table}
+                    FOR EACH ROW EXECUTE FUNCTION notify_{STRATEGY_CACHE_CHANNEL}()
+                """))
+
+
+strategy_cache = StrategyCache()
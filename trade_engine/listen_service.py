@@ -1,16 +1,27 @@
 import asyncio
+import json
 import sys
 import time
+from datetime import datetime
 import psycopg
 import asyncpg
 import os
 from trade_engine.order_engine.core.order_execution_service import OrderExecutionService, OrderRequest
 
 from trade_engine.data.last_data_load import load_last_data
+from trade_engine.data.candle_feed import candle_feed, CANDLE_FEED_ENABLED, FEED_CHANNEL, to_ms
+from trade_engine.data.strategy_cache import strategy_cache, ensure_change_triggers, STRATEGY_CACHE_CHANNEL
+from trade_engine.data.bot_context_cache import bot_context_cache, ensure_bot_context_triggers, BOT_CONTEXT_CHANNEL
 from trade_engine.process.trade_engine import run_trade_engine
 # listen_service.py (üst importlara ekle)
 from trade_engine.process.process import run_all_bots_async, handle_rent_expiry_closures  # NEW
+from trade_engine.process.worker_pool import strategy_pool
+from trade_engine.process.quarantine import bot_quarantine
+from trade_engine.config import pg_pool_stats
+from trade_engine.process.scheduler import TickScheduler, INTERVAL_SEC
+from trade_engine.log.sink import bot_log_sink
 from trade_engine.process.save import save_result_to_json, aggregate_results_by_bot_id    # NEW
+from trade_engine import metrics
 
 # LOGGING DEFINITION
 import logging
@@ -24,35 +35,24 @@ supported_intervals = [
     "6h", "8h", "12h", "1d", "3d", "1w", "1M"
 ]
 
-# Kilitleri ve durumları (interval, market_type) ikilisiyle (key string olarak) yönetelim:
+# Durumlar (interval, market_type) ikilisiyle (key string olarak) yönetilir:
 # Key formatı: "{interval}_{market_type}" örn: "1m_spot" veya "5m_futures"
 # Bu sayede Spot ve Futures birbirini bloklamaz.
 
 def get_key(interval, market_type):
     return f"{interval}_{market_type}"
 
-# Tüm olası kombinasyonlar için lock oluşturabiliriz veya dinamik yönetebiliriz.
-# Dinamik (defaultdict) veya demand-based daha esnek olur ama burada manuel tanımlayalım.
-lock_keys = []
-for i in supported_intervals:
-    lock_keys.append(get_key(i, "spot"))
-    lock_keys.append(get_key(i, "futures"))
-
-interval_locks = {k: asyncio.Lock() for k in lock_keys}
-
-# Öncelikli interval: 1m (Spot ve Futures için ayrı ayrı öncelik)
-priority_intervals = {"spot": "1m", "futures": "1m"}
-priority_locks = {"spot": asyncio.Lock(), "futures": asyncio.Lock()}
-
-queued_keys = set()  # 🔐 Kuyrukta bekleyen işlem anahtarları
 processed_timestamps = {}  # 🕒 Key -> Timestamp (Deduplication)
+watermark_keys = set()  # 🌊 JSON (completeness watermark) bildirimi gelmiş anahtarlar
 
 order_service = OrderExecutionService()
 
-async def dispatch_orders_to_engine(result_dict):
+async def dispatch_orders_to_engine(result_dict, traces=None):
     """
     Strateji sonuçlarını (result_dict) tarar, OrderRequest nesnelerine çevirir
     ve yeni Execution Service kuyruğuna atar.
+
+    traces: metrikler açıksa {bot_id: {"tick", "close"}} — emirlere gecikme izi eklenir.
     """
     if not result_dict:
         return
@@ -66,6 +66,7 @@ async def dispatch_orders_to_engine(result_dict):
         
         # aggregate_results_by_bot_id çıktısının liste döndürdüğü senaryosu:
         iterator = trades if isinstance(trades, list) else [trades]
+        trace = traces.get(int(bot_id)) if traces else None
         
         for trade in iterator:
             # Trade objesi bir dict mi yoksa class mı kontrolü (genelde dict döner)
@@ -107,18 +108,38 @@ async def dispatch_orders_to_engine(result_dict):
                 reduce_only=trade.get("reduce_only", False),
                 position_side=position_side, 
                 # stop_price vs. eklenebilir eğer strateji veriyorsa
+                trace=dict(trace, submitted=time.monotonic()) if trace else None,
             )
 
             # Kuyruğa at (Fire and Forget)
             await order_service.submit_order(req)
 
+def parse_payload(payload: str):
+    """
+    İki payload formatı desteklenir:
+      - JSON (data_engine completeness watermark):
+        {"interval": "1m", "ts": "...", "ratio": 0.98, "complete": false, ...}
+      - Düz metin "1m" (eski BTCUSDT-lider NOTIFY ve DB trigger'ı)
+    Dönüş: (interval, candle_ts | None, watermark dict | None)
+    """
+    payload = payload.strip()
+    if payload.startswith("{"):
+        try:
+            data = json.loads(payload)
+            return data["interval"], datetime.fromisoformat(data["ts"]), data
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"⚠ Geçersiz watermark payload: {payload[:200]} ({e})")
+            return None, None, None
+    return payload, None, None
+
 async def handle_notification(notify):
     """
-    Kanal ve payload bilgisine göre ilgili mantığı tetikler.
+    Kanal ve payload bilgisine göre tick'i zamanlayıcıya bırakır.
     """
-    payload = notify.payload
     channel = notify.channel
-    interval = payload.strip()
+    interval, candle_ts, watermark = parse_payload(notify.payload)
+    if not interval:
+        return
 
     # Kanal -> Market Tipi Eşleşmesi
     if channel == "new_data":
@@ -130,107 +151,145 @@ async def handle_notification(notify):
         return
 
     key = get_key(interval, market_type)
-    
-    # Dinamik olarak lock oluşturma (eğer listede yoksa)
-    if key not in interval_locks:
-        interval_locks[key] = asyncio.Lock()
 
-    # Eğer zaten kuyruktaysa tekrar eklenmesin
-    if key in queued_keys:
-        logger.debug(f"🔁 {key} zaten sırada bekliyor.")
+    if watermark is not None:
+        watermark_keys.add(key)
+    elif key in watermark_keys:
+        # Watermark aktifken düz bildirim (DB trigger'ı) erken gelir; tick'i watermark başlatır
         return
 
-    queued_keys.add(key)
-    p_lock = priority_locks[market_type]
-    p_interval = priority_intervals[market_type]
-
-    # Öncelikli interval (1m) kontrolü (Kendi market tipinde)
-    if interval == p_interval:
-        if p_lock.locked():
-             # Öncelikli işlem zaten çalışıyorsa kuyruğa alma, düşür
-             # (Opsiyonel: Veya bekle? Mevcut mantık discard ediyor)
-            logger.warning(f"❌❌❌ {key} (Öncelikli) zaten çalışıyor.")
-            queued_keys.discard(key)
-            return
-        async with p_lock:
-             await execute_bot_logic(interval, market_type)
-    else:
-        # Diğer intervaller, 1m çalışıyorsa bekler
-        while p_lock.locked():
-            logger.debug(f"⏸ {key} için bekleniyor... (öncelikli {p_interval} çalışıyor)")
-            await asyncio.sleep(1)
-        await execute_bot_logic(interval, market_type)
+    # Öncelik / eşzamanlılık / birleştirme zamanlayıcıda (trade_engine/process/scheduler.py)
+    tick_scheduler.submit(interval, market_type, candle_ts, watermark)
 
-    # İş bittikten sonra sıradan çıkar
-    queued_keys.discard(key)
+async def prepare_tick(tick):
+    """
+    Tick'in mum zamanını, botlarını, stratejilerini ve mum verisini hazırlar.
+    Aynı mum daha önce işlendiyse None döner.
 
-async def execute_bot_logic(interval, market_type):
+    candle_ts/watermark: completeness watermark bildiriminden gelir. Verilirse mum zamanı
+    DB'den okunmaz ve hazır olma bariyerinde beklenmez (yazım zaten tamamlandı
+    ya da deadline doldu).
+    """
+    prepare_t = time.perf_counter()
+    interval, market_type = tick.interval, tick.market_type
+    candle_ts, watermark = tick.candle_ts, tick.watermark
     key = get_key(interval, market_type)
-    lock = interval_locks[key]
 
-    if lock.locked():
-        logger.warning(f"❌❌❌ {key} zaten çalışıyor.")
-        return
+    # Table name belirleme
+    table_name = "binance_futures" if market_type == "futures" else "binance_data"
 
-    async with lock:
-        start_time = time.time()
-        
-        try:
-            # Table name belirleme
-            table_name = "binance_futures" if market_type == "futures" else "binance_data"
-
-            last_time = load_last_data(interval, table_name=table_name)
-            
-            # 🔥 DEDUPLICATION CHECK 🔥
-            # Her market tipi için ayrı timestamp takibi
-            # processed_timestamps key'i de unique olmalı: get_key kullanıyoruz
-            if key in processed_timestamps and processed_timestamps[key] == str(last_time):
-                # logger.debug(f"🔁 {key} için {last_time} zaten işlendi. Atlanıyor.")
-                return
-
-            logger.info(f"🚀 Yeni {market_type.upper()} verisi. {interval} botları çalıştırılıyor... (TS: {last_time})")
-            processed_timestamps[key] = str(last_time)
-
-            # 1) Strateji + veri + bot listesi (Market Type Filtreli)
-            strategies_with_indicators, coin_data_dict, bots = await run_trade_engine(
-                interval, 
-                min_timestamp=last_time, 
-                market_type=market_type
-            )
+    if candle_ts is not None:
+        last_time = candle_ts
+    else:
+        last_time = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: load_last_data(interval, table_name=table_name)
+        )
+
+    # 🔥 DEDUPLICATION CHECK 🔥
+    # Her market tipi için ayrı timestamp takibi
+    # Geç gelen (daha eski mumlu) bildirimler de atlanır
+    prev_time = processed_timestamps.get(key)
+    if prev_time is not None and last_time is not None and last_time <= prev_time:
+        # logger.debug(f"🔁 {key} için {last_time} zaten işlendi. Atlanıyor.")
+        return None
+
+    if watermark is not None and not watermark.get("complete", True):
+        logger.warning(
+            f"⏰ {key} {last_time}: deadline doldu, {watermark.get('written')}/{watermark.get('expected')} "
+            f"sembol yazılmış (oran: {watermark.get('ratio')}). Eksikler: {watermark.get('missing', [])[:5]}"
+        )
+
+    logger.info(f"🚀 Yeni {market_type.upper()} verisi. {interval} botları çalıştırılıyor... (TS: {last_time})")
+    processed_timestamps[key] = last_time
+
+    # Gecikme izi: mum zamanı açılış zamanıdır, kapanış = açılış + interval
+    trace = None
+    if metrics.METRICS_ENABLED and last_time is not None:
+        close = to_ms(last_time) / 1000 + INTERVAL_SEC.get(interval, 60)
+        trace = {"tick": metrics.tick_id(interval, market_type, last_time), "close": close}
+        metrics.observe("candle_to_notify", tick.received_at - close, trace["tick"])
+
+    # Strateji + veri + bot listesi (Market Type Filtreli)
+    strategies_with_indicators, coin_data_dict, bots = await run_trade_engine(
+        interval,
+        min_timestamp=last_time,
+        market_type=market_type,
+        wait_for_data=watermark is None,
+    )
+    if trace is not None:
+        metrics.observe("prepare", time.perf_counter() - prepare_t, trace["tick"])
+    return key, last_time, strategies_with_indicators, coin_data_dict, bots, trace
+
+async def run_tick_batch(batch):
+    """
+    Zamanlayıcının verdiği, aynı marketteki bir veya birden çok tick'i çalıştırır.
+    Aynı anda kapanan intervallerin botları tek run_all_bots_async çağrısında birleşir.
+    """
+    start_time = time.time()
+    prepared = await asyncio.gather(*(prepare_tick(tick) for tick in batch), return_exceptions=True)
+
+    keys, bots, strategies_with_indicators, coin_data_dict = [], [], [], {}
+    traces_by_interval = {}  # interval -> {"tick", "close"} (metrikler açıksa)
+    last_time = None
+    for tick, item in zip(batch, prepared):
+        if isinstance(item, BaseException):
+            logger.error(f"❌ {get_key(tick.interval, tick.market_type)} hazırlanırken hata: {item}")
+            continue
+        if item is None:
+            continue
+        key, tick_time, tick_strategies, tick_data, tick_bots, trace = item
+        keys.append(key)
+        if trace is not None:
+            traces_by_interval[tick.interval] = trace
+        if tick_strategies and tick_data and tick_bots:
+            bots.extend(tick_bots)
+            strategies_with_indicators.extend(tick_strategies)
+            coin_data_dict.update(tick_data)  # anahtarlar (coin_id, interval): çakışmaz
+            last_time = tick_time if last_time is None else max(last_time, tick_time)
+
+    if not keys:
+        return
+    label = "+".join(keys)
+    tick_label = "+".join(t["tick"] for t in traces_by_interval.values()) or None
 
-            results = []
+    try:
+        results = []
 
-            # 2) Kiralık kapanışları (Sadece bir kanal üstlensin veya bağımsız olsun)
-            # Şu an karışıklık olmaması için sadece SPOT kanalı veya her ikisi de kontrol edebilir.
-            # Ancak process/handle_rent_expiry_closures zaten atomik update yapıyor.
-            # Her döngüde kontrol etmenin zararı azdır, CPU hariç.
-            # Şimdilik her tetiklemede kontrol edelim.
-            results = await handle_rent_expiry_closures(results)
+        # Kiralık kapanışlar (process/handle_rent_expiry_closures atomik update yapıyor)
+        results = await handle_rent_expiry_closures(results)
 
-            # 3) Botlar varsa, normal çalıştırmaları ekle
-            if strategies_with_indicators and coin_data_dict and bots:
+        # Botlar varsa, normal çalıştırmaları ekle
+        if bots:
+            intervals = "+".join(dict.fromkeys(bot['period'] for bot in bots))
+            with metrics.span("strategies", tick=tick_label):
                 bot_results = await run_all_bots_async(
-                    bots, strategies_with_indicators, coin_data_dict, last_time, interval
+                    bots, strategies_with_indicators, coin_data_dict, last_time, intervals
                 )
-                # flatten edilmiş liste bekliyoruz; birleştir
-                if bot_results:
-                    results.extend(bot_results)
-            else:
-                pass
-                # logger.info(f"ℹ {key}: Bot çalıştırma atlandı (eksik veri ya da aktif bot yok).")
-
-            # 4) Sonuçları grupla + JSON'a kaydet (sadece varsa)
-            result_dict = aggregate_results_by_bot_id(results)
-            if result_dict:
-                # Köprü fonksiyonunu çağırıyoruz. Servis nesnesini (order_service) gönderiyoruz.
-                await dispatch_orders_to_engine(result_dict)
-            
-            elapsed = time.time() - start_time
-            if results:
-                logger.info(f"✅ {key} tamamlandı. Süre: {elapsed:.2f} sn. (Semboller: {len(coin_data_dict)}, Sonuç: {len(results)})")
-
-        except Exception as e:
-            logger.error(f"❌ {key} çalıştırılırken hata: {e}")
+            # flatten edilmiş liste bekliyoruz; birleştir
+            if bot_results:
+                results.extend(bot_results)
+
+        # Sonuçları grupla + emir motoruna ilet (sadece varsa)
+        result_dict = aggregate_results_by_bot_id(results)
+        if result_dict:
+            # Köprü fonksiyonunu çağırıyoruz. Servis nesnesini (order_service) gönderiyoruz.
+            traces = None
+            if traces_by_interval:
+                traces = {
+                    int(bot["id"]): traces_by_interval[bot["period"]]
+                    for bot in bots if bot.get("period") in traces_by_interval
+                }
+            with metrics.span("dispatch", tick=tick_label):
+                await dispatch_orders_to_engine(result_dict, traces)
+
+        elapsed = time.time() - start_time
+        if results:
+            logger.info(f"✅ {label} tamamlandı. Süre: {elapsed:.2f} sn. (Semboller: {len(coin_data_dict)}, Sonuç: {len(results)})")
+
+    except Exception as e:
+        logger.error(f"❌ {label} çalıştırılırken hata: {e}")
+
+tick_scheduler = TickScheduler(run_tick_batch)
 
 import logging
 from trade_engine.order_engine.exchanges.binance.stream import BinanceStreamer
@@ -247,6 +306,29 @@ async def listen_for_notifications():
 
     await order_service.start(futures_workers=5, spot_workers=2)
 
+    # bot_logs toplu yazıcısı (havuzdan önce: worker'lar loglarını görev sonucuyla döndürür)
+    bot_log_sink.start()
+
+    # Strateji worker havuzunu ilk tick'ten önce ısıt
+    try:
+        await strategy_pool.start()
+    except Exception as e:
+        logger.error(f"❌ Strateji havuzu başlatılamadı (ilk tick'te tekrar denenecek): {e}")
+
+    # Strateji/indikatör kod değişikliği bildirimleri (önbellek geçersiz kılma)
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, ensure_change_triggers)
+    except Exception as e:
+        strategy_cache.ttl = 60  # bildirim gelmeyecek: önbellek dakikada bir yenilensin
+        logger.warning(f"⚠ Strateji değişiklik trigger'ları kurulamadı, önbellek TTL 60 sn: {e}")
+
+    # Bot ayarı / holdings / positions değişiklik bildirimleri (bot context önbelleği)
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, ensure_bot_context_triggers)
+    except Exception as e:
+        bot_context_cache.enabled = False  # bildirim gelmeyecek: context her tick toplu okunsun
+        logger.warning(f"⚠ Bot context trigger'ları kurulamadı, önbellek devre dışı: {e}")
+
     # --- PRICE CACHE BAŞLAT (STREAMER) ---
     # Order Service filtreleri yüklediği için oradan sembolleri alabiliriz
     spot_symbols = []
@@ -264,6 +346,23 @@ async def listen_for_notifications():
     # Streamer'ı arka planda başlat
     asyncio.create_task(streamer.start())
 
+    asyncio.create_task(tick_scheduler.run())
+
+    # Aşama gecikme histogramları + bileşen sayaçları (METRICS_PORT verilmezse kapalı)
+    if metrics.METRICS_ENABLED:
+        metrics.register_collector("tick_scheduler", tick_scheduler.stats)
+        metrics.register_collector("strategy_pool", strategy_pool.stats)
+        metrics.register_collector("strategy_cache", strategy_cache.stats)
+        metrics.register_collector("bot_context_cache", bot_context_cache.stats)
+        metrics.register_collector("candle_feed", candle_feed.stats)
+        metrics.register_collector("bot_log_sink", bot_log_sink.stats)
+        metrics.register_collector("bot_quarantine", bot_quarantine.stats)
+        metrics.register_collector("pg_pool", pg_pool_stats)
+        try:
+            await metrics.start_metrics_server()
+        except OSError as e:
+            logger.warning(f"⚠ Metrik sunucusu açılamadı: {e}")
+
     logger.info("🏁 Dinleyici, Emir Motoru ve Fiyat Akışı (Streamer) Aktif.")
     
     while True:
@@ -275,16 +374,35 @@ async def listen_for_notifications():
                     # 2. Futures (binance_futures) -> new_futures_data
                     await cur.execute("LISTEN new_data;")
                     await cur.execute("LISTEN new_futures_data;")
+                    if CANDLE_FEED_ENABLED:
+                        # Aynı bağlantı: mum yayını, tick bildiriminden önce sırayla işlenir
+                        await cur.execute(f"LISTEN {FEED_CHANNEL};")
+                        candle_feed.reset("dinleyici yeniden bağlandı")
+                    await cur.execute(f"LISTEN {STRATEGY_CACHE_CHANNEL};")
+                    strategy_cache.reset("dinleyici yeniden bağlandı")
+                    await cur.execute(f"LISTEN {BOT_CONTEXT_CHANNEL};")
+                    bot_context_cache.reset("dinleyici yeniden bağlandı")
                     
                     logger.info("📡 PostgreSQL'den tetikleme bekleniyor (Spot & Futures)...")
 
                     async for notify in conn.notifies():
                         # logger.info(f"🔔 Tetikleme: {notify.channel} -> {notify.payload}")
+                        if notify.channel == FEED_CHANNEL:
+                            await candle_feed.handle(notify.payload)
+                            continue
+                        if notify.channel == STRATEGY_CACHE_CHANNEL:
+                            strategy_cache.handle(notify.payload)
+                            continue
+                        if notify.channel == BOT_CONTEXT_CHANNEL:
+                            bot_context_cache.handle(notify.payload)
+                            continue
                         asyncio.create_task(handle_notification(notify))
 
         except (asyncio.CancelledError, KeyboardInterrupt):
             logger.info("⛔ Dinleyici durduruluyor...")
             streamer.stop() # Streamer'ı temizle
+            strategy_pool.shutdown()
+            bot_log_sink.stop()
             await order_service.stop() # Order Service'i ve açık sessionları kapat
             break
         except Exception as e:
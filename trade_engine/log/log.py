@@ -10,7 +10,8 @@ from psycopg2.extras import RealDictCursor, Json
 from psycopg2 import OperationalError, InterfaceError, DatabaseError
 
 # Merkezi DB yardımcıları (fork-safe, ssl/parametreler config'ten)
-from trade_engine.config import get_db_connection  # her çağrıda taze bağlantı
+from trade_engine.config import get_pg_pool  # process-local psycopg2 havuzu
+from trade_engine.log.sink import bot_log_sink
 
 BOT_LOG_LEVELS = {"info", "warning", "error"}
 
@@ -83,10 +84,13 @@ def add_bot_log(
     details: Optional[Dict[str, Any] | str] = None,
     # Eğer hâlihazırda açık bir connection/cursor varsa gönderilebilir (örn. bir transaction içinde)
     conn: Optional["psycopg2.extensions.connection"] = None,
-) -> int:
+) -> Optional[int]:
     """
     public.bot_logs tablosuna kayıt atar ve yeni kaydın id'sini döndürür.
 
+    Process'te toplu yazıcı (trade_engine/log/sink.py) açıksa ve conn verilmediyse
+    kayıt kuyruğa atılır, yazım arka planda toplu yapılır; bu durumda None döner.
+
     Kullanım:
         add_bot_log(level="error", bot_id=120, message="Emir gönderimi başarısız",
                     user_id=5, symbol="BTCUSDT", period="1m",
@@ -112,6 +116,13 @@ def add_bot_log(
             parsed = sanitize_json_payload(details)
             json_details = Json(parsed, dumps=json.dumps)
 
+    if conn is None and bot_log_sink.active:
+        bot_log_sink.submit((
+            user_id, bot_id, symbol, period, lvl, message,
+            json_details.dumps(json_details.adapted) if json_details is not None else None,
+        ))
+        return None
+
     sql = """
         INSERT INTO public.bot_logs (user_id, bot_id, symbol, period, level, message, details)
         VALUES (%s, %s, %s, %s, %s::bot_log_level, %s, %s)
@@ -130,7 +141,7 @@ def add_bot_log(
     own_conn = None
     try:
         if conn is None:
-            own_conn = get_db_connection()  # config'ten: sslmode/parametreler merkezi
+            own_conn = get_pg_pool().getconn()  # process-local havuz (config)
             conn = own_conn
 
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
@@ -153,25 +164,22 @@ def add_bot_log(
         raise
     finally:
         if own_conn is not None:
-            try:
-                conn.close()
-            except Exception:
-                pass
+            get_pg_pool().putconn(own_conn)
 
 
 # Basit yardımcılar (kısayol)
 
-def log_info(**kwargs) -> int:
+def log_info(**kwargs) -> Optional[int]:
     """add_bot_log için level='info' kısayolu."""
     kwargs["level"] = "info"
     return add_bot_log(**kwargs)
 
-def log_warning(**kwargs) -> int:
+def log_warning(**kwargs) -> Optional[int]:
     """add_bot_log için level='warning' kısayolu."""
     kwargs["level"] = "warning"
     return add_bot_log(**kwargs)
 
-def log_error(**kwargs) -> int:
+def log_error(**kwargs) -> Optional[int]:
     """add_bot_log için level='error' kısayolu."""
     kwargs["level"] = "error"
     return add_bot_log(**kwargs)
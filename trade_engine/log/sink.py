@@ -0,0 +1,222 @@
+# backend/trade_engine/log/sink.py
+"""
+bot_logs için tamponlu, toplu yazıcı.
+
+log_info / log_warning / log_error eskiden her satır için yeni bir psycopg2
+bağlantısı açıp INSERT + commit yapıyordu. Artık:
+
+- Ana process `bot_log_sink.start()` ile bir kuyruk ve yazıcı thread'i açar.
+- Strateji worker'ları kuyruğa yazmaz (`collect`): kayıtlar görev boyunca
+  worker'da biriktirilir ve görev sonucuyla birlikte ana process'e döner
+  (worker_pool._run_task); ana process onları `submit_many` ile kuyruğa atar.
+  Worker'lar arasında paylaşılan bir multiprocessing kuyruğu yoktur: asılı
+  kaldığı için SIGKILL ile öldürülen bir worker kuyruğun yazma kilidini
+  tutarken ölürse diğer worker'ların logları da dururdu. Öldürülen görevin
+  logları kaybolur; görev başına en fazla BOT_LOG_TASK_MAX satır tutulur.
+- Yazıcı thread kayıtları BOT_LOG_BATCH_SIZE satıra ya da BOT_LOG_FLUSH_MS
+  süresine kadar biriktirir ve tek bağlantı üzerinden çok satırlı INSERT ile yazar.
+- Geri basınç: kuyruk %80 dolunca `info` satırları düşürülür (enum'da debug yok,
+  en düşük seviye info); tamamen doluysa warning/error yazan taraf
+  BOT_LOG_BLOCK_SEC kadar bekler, sonra o satır da düşer (`submit_many` event
+  loop'tan çağrıldığı için beklemez). Düşen satırlar sayılır.
+- `stop()` kuyruğu boşaltıp son partiyi yazar (ana process çıkışında da çağrılır).
+
+Sink açılmamış process'lerde (script'ler, testler) log.py eskisi gibi satır
+satır senkron yazar.
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import threading
+import time
+
+from psycopg2.extras import execute_values
+
+from trade_engine.config import get_db_connection
+
+BOT_LOG_QUEUE_SIZE = int(os.getenv("BOT_LOG_QUEUE_SIZE", "20000"))
+BOT_LOG_BATCH_SIZE = int(os.getenv("BOT_LOG_BATCH_SIZE", "500"))
+BOT_LOG_FLUSH_MS = int(os.getenv("BOT_LOG_FLUSH_MS", "200"))
+BOT_LOG_BLOCK_SEC = float(os.getenv("BOT_LOG_BLOCK_SEC", "1.0"))
+BOT_LOG_TASK_MAX = int(os.getenv("BOT_LOG_TASK_MAX", "1000"))
+
+_SHED_RATIO = 0.8        # bu dolulukta info satırları düşer
+_STOP = None             # kuyruk sonu işareti
+_WRITE_RETRIES = 3
+
+INSERT_SQL = """
+    INSERT INTO public.bot_logs (user_id, bot_id, symbol, period, level, message, details)
+    VALUES %s
+"""
+INSERT_TEMPLATE = "(%s, %s, %s, %s, %s::bot_log_level, %s, %s::jsonb)"
+
+
+class BotLogSink:
+    def __init__(self):
+        self.queue = None         # queue.Queue (ana process; yazıcı thread okur)
+        self.pending = None       # worker: görev sonucuyla dönecek kayıtlar
+        self._owner = False       # yazıcı thread bu process'te mi
+        self._thread = None
+        self._conn = None
+
+        # Sayaçlar (process başına)
+        self.submitted = 0
+        self.dropped = {"info": 0, "warning": 0, "error": 0}
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+
+    # ---------------- kurulum ----------------
+    @property
+    def active(self) -> bool:
+        return self.queue is not None or self.pending is not None
+
+    def start(self):
+        """Ana process: kuyruğu ve yazıcı thread'i açar (idempotent)."""
+        if self.queue is None:
+            self.queue = queue.Queue(maxsize=BOT_LOG_QUEUE_SIZE)
+            self._owner = True
+            self._thread = threading.Thread(target=self._writer, name="bot-log-sink", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        return self.queue
+
+    def collect(self, enabled: bool = True):
+        """Worker: kayıtları biriktir, görev sonucuyla ana process'e dönsün (False ise senkron yazıma devam)."""
+        self.pending = [] if enabled else None
+        self._owner = False
+
+    def take(self) -> list:
+        """Worker: görev boyunca biriken kayıtları verir ve tamponu boşaltır."""
+        if not self.pending:
+            return []
+        records, self.pending = self.pending, []
+        return records
+
+    # ---------------- üretici tarafı ----------------
+    def _full_ratio(self) -> float:
+        return self.queue.qsize() / BOT_LOG_QUEUE_SIZE
+
+    def _drop(self, level: str, where: str = "kuyruğu"):
+        self.dropped[level] = self.dropped.get(level, 0) + 1
+        dropped = sum(self.dropped.values())
+        if dropped == 1 or dropped % 1000 == 0:
+            print(f"⚠️ bot_logs {where} dolu (pid {os.getpid()}): toplam {dropped} log satırı düşürüldü {self.dropped}")
+
+    def submit(self, record: tuple, block: bool = True) -> bool:
+        """record: (user_id, bot_id, symbol, period, level, message, details_json). Kuyruğa alındıysa True."""
+        level = record[4]
+        if self.pending is not None:
+            if len(self.pending) >= BOT_LOG_TASK_MAX:
+                self._drop(level, "görev tamponu")
+                return False
+            self.pending.append(record)
+            self.submitted += 1
+            return True
+        try:
+            if level == "info":
+                if self._full_ratio() >= _SHED_RATIO:
+                    raise queue.Full
+                self.queue.put_nowait(record)
+            elif block:
+                self.queue.put(record, timeout=BOT_LOG_BLOCK_SEC)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self._drop(level)
+            return False
+        self.submitted += 1
+        return True
+
+    def submit_many(self, records: list):
+        """Ana process: worker'dan görev sonucuyla dönen kayıtları kuyruğa atar (beklemez)."""
+        if self.queue is None:
+            return
+        for record in records:
+            self.submit(record, block=False)
+
+    # ---------------- yazıcı tarafı ----------------
+    def _write(self, rows: list):
+        for attempt in range(1, _WRITE_RETRIES + 1):
+            try:
+                if self._conn is None or self._conn.closed:
+                    self._conn = get_db_connection()
+                with self._conn.cursor() as cur:
+                    execute_values(cur, INSERT_SQL, rows, template=INSERT_TEMPLATE, page_size=len(rows))
+                self._conn.commit()
+                self.written += len(rows)
+                self.batches += 1
+                return
+            except Exception as e:
+                try:
+                    if self._conn is not None:
+                        self._conn.close()
+                except Exception:
+                    pass
+                self._conn = None
+                if attempt == _WRITE_RETRIES:
+                    self.failed += len(rows)
+                    print(f"❌ bot_logs toplu yazımı başarısız, {len(rows)} satır atlandı: {e}")
+                    return
+                time.sleep(0.2 * attempt)
+
+    def _writer(self):
+        flush_sec = BOT_LOG_FLUSH_MS / 1000
+        stopping = False
+        while not stopping:
+            rows = []
+            record = self.queue.get()
+            if record is _STOP:
+                break
+            rows.append(record)
+
+            # Partiyi doldur: en fazla BATCH_SIZE satır ya da FLUSH_MS süre
+            deadline = time.monotonic() + flush_sec
+            while len(rows) < BOT_LOG_BATCH_SIZE:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                try:
+                    record = self.queue.get(timeout=left)
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stopping = True
+                    break
+                rows.append(record)
+            self._write(rows)
+
+    def stop(self, timeout: float = 10.0):
+        """Ana process: kuyruktakileri yazıp thread'i kapatır."""
+        if not self._owner or self._thread is None:
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print("⚠️ bot_logs yazıcısı zamanında kapanmadı; kuyrukta kalan satırlar kaybolabilir.")
+        self._thread = None
+        self._owner = False
+        self.queue = None
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": dict(self.dropped),
+            "failed": self.failed,
+        }
+
+
+bot_log_sink = BotLogSink()
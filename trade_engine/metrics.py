@@ -0,0 +1,201 @@
+# trade_engine/metrics.py
+"""
+Tick gecikmesi için hafif span ölçümü ve Prometheus uyumlu /metrics uç noktası.
+
+Mum kapanışından emir onayına kadar yol:
+    candle_to_notify   mum kapanışı (borsa) -> tick bildirimi alındı
+    queue              bildirim -> zamanlayıcının tick'i başlatması
+    prepare            prepare_tick (bot/strateji/mum verisi)
+    strategies         run_all_bots_async (worker'lar + sonuç kontrolü)
+    dispatch           dispatch_orders_to_engine
+    order_queue        emir kuyruğa girdi -> order worker aldı
+    order_exchange     borsaya POST -> cevap
+    order_pipeline     _execute_pipeline toplamı
+    close_to_ack       mum kapanışı -> emir onayı (uçtan uca)
+Her aşama `trade_engine_stage_seconds{stage=...}` histogramına düşer. Tick id
+ve bot id etiket yapılmaz (kardinalite); son spanlar tick/bot anahtarıyla bir
+halka tamponda tutulur ve /traces?tick=...&bot=... ile okunur.
+
+METRICS_PORT verilmezse ölçüm kapalıdır: span() paylaşılan no-op context döner,
+observe() ilk satırda çıkar.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlsplit, parse_qs
+
+logger = logging.getLogger("StrategyEngine")
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0") or 0)
+METRICS_ENABLED = METRICS_PORT > 0
+METRICS_TRACE_BUFFER = int(os.getenv("METRICS_TRACE_BUFFER", "5000"))
+
+PREFIX = "trade_engine"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_NAME_RE = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self.series = {}  # etiket değeri -> [bucket sayaçları..., toplam, adet]
+
+    def observe(self, label: str, value: float):
+        row = self.series.get(label)
+        if row is None:
+            row = self.series[label] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                row[i] += 1
+                break
+        row[-2] += value
+        row[-1] += 1
+
+    def render(self, label_name: str) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label, row in sorted(self.series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{label_name}="{label}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label_name}="{label}",le="+Inf"}} {row[-1]}')
+            lines.append(f'{self.name}_sum{{{label_name}="{label}"}} {row[-2]:.6f}')
+            lines.append(f'{self.name}_count{{{label_name}="{label}"}} {row[-1]}')
+        return lines
+
+
+stage_seconds = Histogram(f"{PREFIX}_stage_seconds", "Tick hattı aşama süreleri (sn)")
+_spans = deque(maxlen=METRICS_TRACE_BUFFER)   # (bitiş epoch, aşama, tick id, bot id, süre)
+_collectors = {}                              # ad -> fn() -> dict (gauge olarak yayınlanır)
+
+
+# ---------------- ölçüm ----------------
+def observe(stage: str, seconds: float, tick=None, bot_id=None):
+    if not METRICS_ENABLED:
+        return
+    stage_seconds.observe(stage, max(0.0, seconds))
+    if tick is not None or bot_id is not None:
+        _spans.append((time.time(), stage, tick, bot_id, seconds))
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+@contextmanager
+def _span(stage: str, tick, bot_id):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - t0, tick, bot_id)
+
+
+def span(stage: str, tick=None, bot_id=None):
+    """`with span("prepare", tick=tick_id):` — kapalıyken paylaşılan no-op context."""
+    if not METRICS_ENABLED:
+        return _NO_SPAN
+    return _span(stage, tick, bot_id)
+
+
+def tick_id(interval: str, market_type: str, candle_ts) -> str:
+    """Tick anahtarı: "<interval>_<market>@<mum açılış zamanı>"."""
+    ts = candle_ts.isoformat() if hasattr(candle_ts, "isoformat") else candle_ts
+    return f"{interval}_{market_type}@{ts}"
+
+
+def register_collector(name: str, fn):
+    """fn() dict döndürmeli; sayısal alanlar /metrics'te gauge olarak yayınlanır."""
+    _collectors[name] = fn
+
+
+# ---------------- yayın ----------------
+def _flatten(prefix: str, value, out: list):
+    if isinstance(value, bool):
+        out.append((prefix, int(value)))
+    elif isinstance(value, (int, float)):
+        out.append((prefix, value))
+    elif isinstance(value, dict):
+        for k, v in value.items():
+            _flatten(f"{prefix}_{k}", v, out)
+
+
+def render() -> str:
+    lines = stage_seconds.render("stage")
+    for name, fn in _collectors.items():
+        try:
+            values = []
+            _flatten(f"{PREFIX}_{name}", fn(), values)
+        except Exception as e:
+            logger.warning(f"⚠ Metrik toplayıcı hatası ({name}): {e}")
+            continue
+        for key, v in values:
+            metric = _NAME_RE.sub("_", key)
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {v}")
+    return "\n".join(lines) + "\n"
+
+
+def traces(tick=None, bot_id=None, limit: int = 500) -> list:
+    out = []
+    for ended, stage, t, b, seconds in reversed(_spans):
+        if tick is not None and t != tick:
+            continue
+        if bot_id is not None and str(b) != str(bot_id):
+            continue
+        out.append({"ended": ended, "stage": stage, "tick": t, "bot_id": b, "seconds": round(seconds, 6)})
+        if len(out) >= limit:
+            break
+    return out
+
+
+async def _handle(reader, writer):
+    try:
+        request = await asyncio.wait_for(reader.readline(), timeout=5)
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass  # başlıklar okunup atılır
+        parts = request.decode("latin-1").split()
+        target = urlsplit(parts[1] if len(parts) > 1 else "/")
+        if target.path == "/metrics":
+            status, ctype, body = "200 OK", "text/plain; version=0.0.4", render()
+        elif target.path == "/traces":
+            q = parse_qs(target.query)
+            status, ctype = "200 OK", "application/json"
+            body = json.dumps(traces(q.get("tick", [None])[0], q.get("bot", [None])[0]), default=str)
+        else:
+            status, ctype, body = "404 Not Found", "text/plain", "not found\n"
+        data = body.encode()
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\nContent-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(port: int = METRICS_PORT):
+    """METRICS_PORT verildiyse /metrics ve /traces için HTTP sunucusunu açar."""
+    if not METRICS_ENABLED:
+        return None
+    host = os.getenv("METRICS_HOST", "0.0.0.0")
+    server = await asyncio.start_server(_handle, host=host, port=port)
+    logger.info(f"📈 Metrikler: http://{host}:{port}/metrics")
+    return server
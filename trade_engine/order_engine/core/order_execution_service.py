@@ -9,6 +9,7 @@ from dataclasses import dataclass
 
 # --- Proje İçi Bağımlılıklar ---
 from trade_engine.config import asyncpg_connection
+from trade_engine import metrics
 from trade_engine.order_engine.data_access.repos.symbol_filters import SymbolFilterRepo
 from trade_engine.order_engine.data_access.repos import crud
 from trade_engine.order_engine.core.price_store import price_store
@@ -161,6 +162,8 @@ class OrderRequest:
     #09.12.25
     callback_rate: Optional[float] = None   # Trailing Stop için %
     working_type: str = "CONTRACT_PRICE"    # MARK_PRICE veya CONTRACT_PRICE
+    # Gecikme izi (metrikler açıksa): {"tick", "close" (mum kapanışı epoch), "submitted" (monotonic)}
+    trace: Optional[dict] = None
 
 @dataclass
 class SessionContext:
@@ -257,6 +260,9 @@ class OrderExecutionService:
             try:
                 # 1. Kuyruktan Emir Al
                 req: OrderRequest = await queue.get()
+                if req.trace:
+                    metrics.observe("order_queue", time.monotonic() - req.trace["submitted"],
+                                    req.trace["tick"], req.bot_id)
                 
                 # 2. 🔥 RATE LIMITER KONTROLÜ
                 await limiter.acquire()
@@ -439,9 +445,17 @@ class OrderExecutionService:
             return
 
         # ADIM 6: Ateşleme (Network)
+        post_t = time.perf_counter()
         success, response_data = await session.exchange._post_signed(endpoint, payload)
+        acked_at = time.time()
 
         elapsed = (time.perf_counter() - start_t) * 1000
+        if req.trace:
+            tick = req.trace["tick"]
+            metrics.observe("order_exchange", time.perf_counter() - post_t, tick, req.bot_id)
+            metrics.observe("order_pipeline", elapsed / 1000, tick, req.bot_id)
+            if success and req.trace.get("close"):
+                metrics.observe("close_to_ack", acked_at - req.trace["close"], tick, req.bot_id)
         status_icon = "✅" if success else "❌"
         logger.info(f"{status_icon} [BOT:{req.bot_id}] [{req.trade_type.upper()}] {req.symbol} {req.side} | {elapsed:.2f}ms")
 
@@ -0,0 +1,33 @@
+"""
+Hızlı JSON çözümleyici (websocket frame'leri için).
+
+orjson kuruluysa onu, değilse standart json modülünü kullanır
+(BINANCE_JSON_BACKEND=auto|orjson|json). trade_engine container'ı data_engine'i
+görmediği için data_engine/kline_decoder.py'deki seçimin küçük bir kopyasıdır.
+"""
+import json
+import os
+
+
+def _select_backend(name: str):
+    if name in ("auto", "orjson"):
+        try:
+            import orjson
+            return "orjson", orjson.loads
+        except ImportError:
+            pass
+    return "json", json.loads
+
+
+BACKEND, loads = _select_backend(os.getenv("BINANCE_JSON_BACKEND", "auto").strip().lower())
+
+
+def decode_book_ticker(frame):
+    """bookTicker frame -> (symbol, bid, ask); bookTicker değilse None."""
+    data = loads(frame)
+    if "data" in data and "stream" in data:  # combined stream
+        data = data["data"]
+    symbol = data.get("s")
+    if symbol is None or "b" not in data:
+        return None
+    return symbol, float(data["b"]), float(data["a"])
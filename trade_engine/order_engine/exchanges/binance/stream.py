@@ -1,9 +1,10 @@
 import asyncio
-import json
+import os
 import websockets
 import time
 import ssl
 from trade_engine.order_engine.core.price_store import price_store, PriceTicker
+from trade_engine.order_engine.exchanges.binance.fast_json import decode_book_ticker
 
 class BinanceStreamer:
     def __init__(self, spot_symbols: list = None, futures_symbols: list = None):
@@ -19,8 +20,9 @@ class BinanceStreamer:
         self.running = False
 
         # --- URL TANIMLAMALARI ---
-        self.SPOT_WS_URL = "wss://stream.binance.com:9443/ws"
-        self.FUTURES_WS_URL = "wss://fstream.binance.com/ws"
+        # Yük testi için env ile yerel replay sunucusuna (data_engine/replay_server.py) yönlendirilebilir
+        self.SPOT_WS_URL = os.getenv("BINANCE_SPOT_WS_URL", "wss://stream.binance.com:9443/ws")
+        self.FUTURES_WS_URL = os.getenv("BINANCE_FUTURES_WS_URL", "wss://fstream.binance.com/ws")
         
         # --- MARGIN NOTU ---
         # Margin işlemleri (Isolated/Cross) Binance'de SPOT piyasa likiditesini kullanır.
@@ -61,8 +63,8 @@ class BinanceStreamer:
         
         while self.running:
             try:
-                # SSL Context Configuration
-                ssl_context = ssl._create_unverified_context()
+                # SSL Context Configuration (ws:// replay sunucusunda ssl verilmemeli)
+                ssl_context = ssl._create_unverified_context() if url.startswith("wss://") else None
                 async with websockets.connect(url, ssl=ssl_context) as ws:
                     print(f"✅ Binance {market_type} Bağlandı!")
                     
@@ -77,14 +79,12 @@ class BinanceStreamer:
     def _process_message(self, message, market_type):
         """Gelen veriyi parse eder ve RAM'e (PriceStore) yazar."""
         try:
-            data = json.loads(message)
+            decoded = decode_book_ticker(message)
             
             # Veri formatı (Spot ve Futures bookTicker yapısı aynıdır):
             # s: Symbol, b: Best Bid, a: Best Ask
-            if 's' in data:
-                symbol = data['s']
-                bid = float(data['b'])
-                ask = float(data['a'])
+            if decoded is not None:
+                symbol, bid, ask = decoded
                 
                 ticker = PriceTicker(
                     bid=bid,
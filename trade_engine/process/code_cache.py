@@ -0,0 +1,100 @@
+# trade_engine/process/code_cache.py
+"""
+Worker başına derlenmiş kod (code object) önbelleği.
+
+run_bot her indikatör ve strateji için `exec` çağırıyor; kaynak metin her
+tick'te aynı olduğundan derleme (parse + compile) bir kez yapılır.
+
+- Anahtar (dosya adı, kaynağın SHA-1 özeti): `strategies` / `indicators` satırı
+  değişince yeni içerik yeni anahtar demektir, eski code object bir daha
+  kullanılmaz ve LRU sırasıyla düşer (ayrı bir invalidation mesajına gerek yok).
+  Dosya adı code object'e gömülü olduğundan (traceback etiketi) anahtara dahildir.
+- Worker açılışında aktif botların strateji/indikatör kodları, çağıranların
+  kullandığı dosya adlarıyla önceden derlenir.
+- Sayaçlar (hit, miss, derleme süresi, kazanılan süre) görev bazında okunur ve
+  tick özetinde raporlanır.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+
+CODE_CACHE_MAX = 4096
+
+_cache = OrderedDict()  # (dosya adı, sha1) -> (code object, derleme süresi sn)
+
+# Son take_stats()'tan beri
+_hits = 0
+_misses = 0
+_compile_sec = 0.0
+_saved_sec = 0.0
+
+
+def _key(source: str, filename: str) -> tuple:
+    return filename, hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+
+def compile_cached(source: str, filename: str = "<strategy>"):
+    """Kaynağın code object'ini döner; önbellekte yoksa derler (SyntaxError aynen yükselir)."""
+    global _hits, _misses, _compile_sec, _saved_sec
+    key = _key(source, filename)
+    entry = _cache.get(key)
+    if entry is not None:
+        _cache.move_to_end(key)
+        _hits += 1
+        _saved_sec += entry[1]
+        return entry[0]
+
+    t0 = time.perf_counter()
+    code = compile(source, filename, "exec")
+    elapsed = time.perf_counter() - t0
+    _misses += 1
+    _compile_sec += elapsed
+
+    _cache[key] = (code, elapsed)
+    if len(_cache) > CODE_CACHE_MAX:
+        _cache.popitem(last=False)
+    return code
+
+
+def take_stats() -> tuple:
+    """(hit, miss, derleme sn, kazanılan sn) — okuyunca sıfırlanır."""
+    global _hits, _misses, _compile_sec, _saved_sec
+    stats = (_hits, _misses, _compile_sec, _saved_sec)
+    _hits = _misses = 0
+    _compile_sec = _saved_sec = 0.0
+    return stats
+
+
+def prewarm() -> int:
+    """Aktif botların strateji ve indikatör kodlarını derler; derlenen kaynak sayısını döner."""
+    from sqlalchemy import text
+    from trade_engine.config import get_engine
+
+    sql = text("""
+        WITH s AS (
+            SELECT id, code, indicator_ids
+            FROM public.strategies
+            WHERE id IN (SELECT strategy_id FROM public.bots WHERE active)
+        )
+        SELECT '<strategy ' || id || '>' AS filename, code FROM s
+        UNION
+        SELECT '<indicator ' || i.id || '>', i.code
+        FROM public.indicators i
+        WHERE i.id IN (SELECT unnest(s.indicator_ids::int[]) FROM s)
+    """)
+    try:
+        with get_engine().connect() as conn:
+            sources = [(r[0], r[1]) for r in conn.execute(sql) if r[1]]
+    except Exception as e:
+        print(f"⚠️ Kod önbelleği ön ısıtması atlandı: {e}")
+        return 0
+
+    compiled = 0
+    for filename, source in sources:
+        try:
+            compile_cached(source, filename)
+            compiled += 1
+        except SyntaxError:
+            pass  # bot çalışınca run_bot hatayı loglar
+    take_stats()  # ön ısıtma tick istatistiklerine sayılmasın
+    return compiled
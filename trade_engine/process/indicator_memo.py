@@ -0,0 +1,198 @@
+# trade_engine/process/indicator_memo.py
+"""
+Tick içi, botlar arası indikatör sonucu paylaşımı (worker başına).
+
+Aynı indikatör kodu aynı coin/interval mumları üzerinde her bot için baştan
+çalışıyordu. Burada her indikatörün çıktısı (df ve tanımladığı global isimler)
+şu anahtarla saklanır:
+    (indikatör zinciri özeti, market, coin, interval, mum sayısı, son mum zamanı, son kapanış)
+
+- Zincir özeti, listede o indikatöre kadar olan kodların özetidir: önceki
+  indikatörlerin tanımladıkları sonraki indikatörün girdisi sayılır.
+  Motorda `input.*` her zaman varsayılanı döndüğü için parametreler koda dahildir.
+- Bot'a özgü ya da rastgele sonuç verebilecek kod (time, get_percentage,
+  get_current_usd, np.random, ...) statik olarak elenir. Bir zincir ilk kez
+  görüldüğünde ayrıca iki kez çalıştırılıp karşılaştırılır; sonuç farklıysa
+  o zincir bir daha bellekten verilmez.
+- Saklanan sonuç salt-okunur tutulur: bot'a df kopyası verilir, tanımlanan
+  fonksiyonlar bot'un kendi globals'ına yeniden bağlanır.
+- Zincirde ilk saklanamayan indikatörden sonrası eskisi gibi çalıştırılır.
+"""
+import ast
+import hashlib
+import os
+import types
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from trade_engine.process.code_cache import compile_cached
+
+INDICATOR_MEMO_ENABLED = os.getenv("INDICATOR_MEMO_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+INDICATOR_MEMO_MAX = int(os.getenv("INDICATOR_MEMO_MAX", "512"))
+
+# Bot'a özgü / zamana bağlı / rastgele sonuç verebilecek isimler
+_IMPURE_NAMES = {"time", "asyncio", "random", "datetime", "get_percentage", "get_initial_usd", "get_current_usd"}
+_IMPURE_ATTRS = {"random", "now", "today", "utcnow", "perf_counter", "monotonic"}
+_SCALARS = (int, float, str, bool, type(None), np.generic)
+
+_memo = OrderedDict()   # anahtar -> (df, {isim: değer})
+_pure = {}              # kod özeti -> statik kontrol sonucu
+_verified = {}          # zincir özeti -> iki çalıştırmada aynı sonucu verdi mi
+
+# Son take_stats()'tan beri
+_hits = 0
+_misses = 0
+_skipped = 0
+
+
+def _sha1(s: str) -> str:
+    return hashlib.sha1(s.encode("utf-8")).hexdigest()
+
+
+def _is_pure(code_hash: str, source: str) -> bool:
+    verdict = _pure.get(code_hash)
+    if verdict is None:
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            verdict = False
+        else:
+            verdict = True
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Name) and node.id in _IMPURE_NAMES:
+                    verdict = False
+                elif isinstance(node, ast.Attribute) and node.attr in _IMPURE_ATTRS:
+                    verdict = False
+                elif isinstance(node, (ast.Import, ast.ImportFrom, ast.Global, ast.Nonlocal)):
+                    verdict = False
+                if not verdict:
+                    break
+        _pure[code_hash] = verdict
+    return verdict
+
+
+def _capture(g: dict, before: dict):
+    """exec sonrası değişen globals'ı saklanabilir kopyaya çevirir; saklanamıyorsa None."""
+    produced = {}
+    for name, val in g.items():
+        if name in ("df", "__builtins__") or before.get(name, _capture) is val:
+            continue
+        if isinstance(val, types.FunctionType) or isinstance(val, _SCALARS):
+            produced[name] = val
+        elif isinstance(val, (pd.Series, pd.DataFrame, np.ndarray)):
+            produced[name] = val.copy()
+        elif isinstance(val, tuple) and all(isinstance(v, _SCALARS) for v in val):
+            produced[name] = val
+        else:
+            return None  # sınıf, liste, sözlük vb.: paylaşmak güvenli değil
+    df = g.get("df")
+    if not isinstance(df, pd.DataFrame):
+        return None
+    return df.copy(), produced
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, types.FunctionType):
+        return isinstance(b, types.FunctionType) and a.__code__ == b.__code__
+    if isinstance(a, (pd.Series, pd.DataFrame)):
+        return type(a) is type(b) and a.equals(b)
+    if isinstance(a, np.ndarray):
+        return isinstance(b, np.ndarray) and np.array_equal(a, b, equal_nan=a.dtype.kind == "f")
+    return a == b or (a != a and b != b)  # NaN == NaN
+
+
+def _same_entry(x, y) -> bool:
+    return x[0].equals(y[0]) and x[1].keys() == y[1].keys() and all(_same(v, y[1][k]) for k, v in x[1].items())
+
+
+def _apply(entry, g: dict):
+    df, produced = entry
+    g["df"] = df.copy()
+    for name, val in produced.items():
+        if isinstance(val, types.FunctionType):
+            # Fonksiyon bu bot'un globals'ını (df, get_percentage, ...) görmeli
+            fn = types.FunctionType(val.__code__, g, val.__name__, val.__defaults__, val.__closure__)
+            fn.__kwdefaults__ = val.__kwdefaults__
+            g[name] = fn
+        elif isinstance(val, (pd.Series, pd.DataFrame, np.ndarray)):
+            g[name] = val.copy()
+        else:
+            g[name] = val
+
+
+def _exec(indicator, g: dict):
+    exec(compile_cached(indicator["code"], f"<indicator {indicator.get('id')}>"), g)
+
+
+def run_indicators(indicator_list, g: dict, market: str, coin_id: str, interval: str):
+    """indicator_list'i sırayla g (allowed_globals) üzerinde çalıştırır; uygun olanlar bellekten gelir."""
+    global _hits, _misses, _skipped
+    df = g.get("df")
+    if not INDICATOR_MEMO_ENABLED or not isinstance(df, pd.DataFrame) or df.empty:
+        for indicator in indicator_list:
+            _exec(indicator, g)
+        return
+
+    last = df.iloc[-1]
+    base = (market, coin_id, interval, len(df), str(last.get("timestamp")), float(last.get("close", float("nan"))))
+
+    chain = ""
+    for i, indicator in enumerate(indicator_list):
+        code = indicator["code"]
+        code_hash = _sha1(code)
+        chain = _sha1(chain + code_hash)
+        if not _is_pure(code_hash, code) or _verified.get(chain) is False:
+            break
+
+        key = (chain, *base)
+        entry = _memo.get(key)
+        if entry is not None:
+            _memo.move_to_end(key)
+            _apply(entry, g)
+            _hits += 1
+            continue
+
+        before = dict(g)
+        replica = None
+        if chain not in _verified:
+            replica = dict(g)
+            replica["df"] = g["df"].copy()
+
+        _exec(indicator, g)
+        _misses += 1
+        entry = _capture(g, before)
+        if entry is not None and replica is not None:
+            _exec(indicator, replica)
+            other = _capture(replica, before)
+            _verified[chain] = other is not None and _same_entry(entry, other)
+            if not _verified[chain]:
+                entry = None
+        if entry is None:
+            _verified[chain] = False
+            indicator_list = indicator_list[i + 1:]
+            _skipped += len(indicator_list)
+            for rest in indicator_list:
+                _exec(rest, g)
+            return
+
+        _memo[key] = entry
+        if len(_memo) > INDICATOR_MEMO_MAX:
+            _memo.popitem(last=False)
+    else:
+        return
+
+    # Saklanamayan indikatörden itibaren eski yol
+    rest = indicator_list[i:]
+    _skipped += len(rest)
+    for indicator in rest:
+        _exec(indicator, g)
+
+
+def take_stats() -> tuple:
+    """(bellekten, hesaplanan, atlanan) — okuyunca sıfırlanır."""
+    global _hits, _misses, _skipped
+    stats = (_hits, _misses, _skipped)
+    _hits = _misses = _skipped = 0
+    return stats
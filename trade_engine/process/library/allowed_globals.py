@@ -6,9 +6,9 @@ import pandas as pd
 import time
 import asyncio
 import ta
-from trade_engine.process.library.get_percentage import get_percentage
-from trade_engine.process.library.get_initial_usd import get_initial_usdt
-from trade_engine.process.library.get_current_usd import get_current_usdt
+from trade_engine.process.library.get_percentage import get_percentage, percentage_from
+from trade_engine.process.library.get_initial_usd import get_initial_usdt, initial_usdt_from
+from trade_engine.process.library.get_current_usd import get_current_usdt, current_usdt_from
 
 def empty(*args, **kwargs):
     pass
@@ -36,7 +36,23 @@ def safe_import(name, globals=None, locals=None, fromlist=(), level=0):
         return __import__(name, globals, locals, fromlist, level)
     raise ImportError(f"Modül yükleme izni yok: {name}")
 
-def allowed_globals_(df, bot_id):
+def _bot_value_helpers(bot_id, snapshot=None):
+    """get_percentage / get_initial_usd / get_current_usd: tick snapshot'ı varsa sözlükten, yoksa DB'den."""
+    if snapshot is None:
+        return (
+            lambda: get_percentage(bot_id),
+            lambda: get_initial_usdt(bot_id),
+            lambda: get_current_usdt(bot_id),
+        )
+    values = snapshot.values
+    return (
+        lambda: percentage_from(values.get("fullness"), values.get("current_usd_value")),
+        lambda: initial_usdt_from(values.get("initial_usd_value")),
+        lambda: current_usdt_from(values.get("current_usd_value")),
+    )
+
+def allowed_globals_(df, bot_id, snapshot=None):
+    get_percentage_, get_initial_usd_, get_current_usd_ = _bot_value_helpers(bot_id, snapshot)
 
     python_keywords = {
         "nonlocal": None,
@@ -110,9 +126,9 @@ def allowed_globals_(df, bot_id):
                 "ta": ta,
 
                 # ✅ Grafik oluşturma fonksiyonu (plot)
-                "get_percentage": (lambda: get_percentage(bot_id)),
-                "get_initial_usd": (lambda: get_initial_usdt(bot_id)),
-                "get_current_usd": (lambda: get_current_usdt(bot_id)),
+                "get_percentage": get_percentage_,
+                "get_initial_usd": get_initial_usd_,
+                "get_current_usd": get_current_usd_,
                 "plot": lambda *args, **kwargs: empty(*args, **kwargs),
                 "mark": lambda *args, **kwargs: empty(*args, **kwargs),
                 "input": EmptyClass(),
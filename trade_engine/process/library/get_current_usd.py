@@ -3,6 +3,19 @@ from decimal import Decimal, InvalidOperation
 from sqlalchemy import text
 from trade_engine.config import get_engine
 
+def current_usdt_from(value) -> float:
+    """bots.current_usd_value değerini float'a çevirir; geçersiz / sıfır değerde 0.0 (tick snapshot'ı da kullanır)."""
+    try:
+        current = Decimal(str(value)) if value is not None else Decimal("0")
+    except (InvalidOperation, ValueError, TypeError):
+        current = Decimal("0")
+
+    if current <= 0:
+        return 0.0
+
+    print("Current:", current)
+    return float(current)
+
 def get_current_usdt(bot_id: int) -> float:
     """
     bots.current_usd_value alanlarından
@@ -26,18 +39,7 @@ def get_current_usdt(bot_id: int) -> float:
         if not row:
             return 0.0
 
-        current = row.get("current_usd_value")
-
-        try:
-            current = Decimal(str(current)) if current is not None else Decimal("0")
-        except (InvalidOperation, ValueError, TypeError):
-            current = Decimal("0")
-
-        if current <= 0:
-            return 0.0
-
-        print("Current:", current)
-        return float(current)
+        return current_usdt_from(row.get("current_usd_value"))
 
     except Exception:
         return 0.0
\ No newline at end of file
@@ -3,6 +3,19 @@ from decimal import Decimal, InvalidOperation
 from sqlalchemy import text
 from trade_engine.config import get_engine
 
+def initial_usdt_from(value) -> float:
+    """bots.initial_usd_value değerini float'a çevirir; geçersiz / sıfır değerde 0.0 (tick snapshot'ı da kullanır)."""
+    try:
+        initial = Decimal(str(value)) if value is not None else Decimal("0")
+    except (InvalidOperation, ValueError, TypeError):
+        initial = Decimal("0")
+
+    if initial <= 0:
+        return 0.0
+
+    print("Initial:", initial)
+    return float(initial)
+
 def get_initial_usdt(bot_id: int) -> float:
     """
     bots.initial_usd_value alanlarından
@@ -26,18 +39,7 @@ def get_initial_usdt(bot_id: int) -> float:
         if not row:
             return 0.0
 
-        initial = row.get("initial_usd_value")
-
-        try:
-            initial = Decimal(str(initial)) if initial is not None else Decimal("0")
-        except (InvalidOperation, ValueError, TypeError):
-            initial = Decimal("0")
-
-        if initial <= 0:
-            return 0.0
-
-        print("Initial:", initial)
-        return float(initial)
+        return initial_usdt_from(row.get("initial_usd_value"))
 
     except Exception:
         return 0.0
\ No newline at end of file
@@ -4,6 +4,26 @@ from sqlalchemy import text
 from trade_engine.config import get_engine
 
 
+def percentage_from(fullness, current) -> float:
+    """(fullness / current_usd_value) * 100; geçersiz / sıfır değerde 0.0 (tick snapshot'ı da kullanır)."""
+    try:
+        fullness_dec = Decimal(str(fullness)) if fullness is not None else Decimal("0")
+    except (InvalidOperation, ValueError, TypeError):
+        fullness_dec = Decimal("0")
+
+    try:
+        current_dec = Decimal(str(current)) if current is not None else Decimal("0")
+    except (InvalidOperation, ValueError, TypeError):
+        current_dec = Decimal("0")
+
+    if current_dec <= 0:
+        return 0.0
+
+    pct = (fullness_dec / current_dec) * Decimal("100")
+    print("Percentage:", pct)
+    return float(pct)
+
+
 def get_percentage(bot_id: int) -> float:
     """
     bots.fullness ve bots.current_usd_value alanlarından
@@ -28,25 +48,7 @@ def get_percentage(bot_id: int) -> float:
         if not row:
             return 0.0
 
-        fullness = row.get("fullness")
-        current = row.get("current_usd_value")
-
-        try:
-            fullness_dec = Decimal(str(fullness)) if fullness is not None else Decimal("0")
-        except (InvalidOperation, ValueError, TypeError):
-            fullness_dec = Decimal("0")
-
-        try:
-            current_dec = Decimal(str(current)) if current is not None else Decimal("0")
-        except (InvalidOperation, ValueError, TypeError):
-            current_dec = Decimal("0")
-
-        if current_dec <= 0:
-            return 0.0
-
-        pct = (fullness_dec / current_dec) * Decimal("100")
-        print("Percentage:", pct)
-        return float(pct)
+        return percentage_from(row.get("fullness"), row.get("current_usd_value"))
 
     except Exception:
         return 0.0
\ No newline at end of file
@@ -0,0 +1,140 @@
+# trade_engine/process/market_snapshot.py
+"""
+Tick başına, ana process'te bir kez kurulan piyasa/bot anlık görüntüsü.
+
+run_bot her coin için `_get_min_qty` ve `_get_last_price_1m` ile, strateji
+kodu da `get_percentage` / `get_initial_usd` / `get_current_usd` ile her çağrıda
+DB'ye gidiyordu (her biri yeni bağlantı). Artık tick başında toplu sorgularla:
+    - son 1m fiyatlar      (binance_last_price / binance_futures_last_price)
+    - min_qty              (symbol_filters)
+    - bot değerleri        (bots.fullness, current_usd_value, initial_usd_value)
+okunur; her bot görevine sadece kendi coin'leri ve değerleri (`BotSnapshot`)
+gider ve bu aramalar sözlük okumasına döner.
+
+Bot context'i (holdings/positions, bot_context_cache) verilirse bot değerleri
+oradan alınır, bots sorgusu atlanır; context de BotSnapshot ile
+control_the_results'a gider.
+
+Snapshot kurulamazsa run_bot ve allowed_globals eski (satır satır) yola döner.
+"""
+from psycopg2.extras import RealDictCursor
+
+from trade_engine.config import psycopg2_connection
+
+LAST_PRICE_TABLES = {
+    "spot": "binance_last_price",
+    "futures": "binance_futures_last_price",
+}
+
+
+def _float_or_none(v):
+    try:
+        return float(v) if v is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class BotSnapshot:
+    """Bir bot görevine giden, salt-okunur dilim (picklable, küçük)."""
+
+    __slots__ = ("trade_type", "last_prices", "min_qty", "values", "context")
+
+    def __init__(self, trade_type: str, last_prices: dict, min_qty: dict, values: dict, context=None):
+        self.trade_type = trade_type
+        self.last_prices = last_prices  # symbol -> son 1m kapanış
+        self.min_qty = min_qty          # symbol -> min_qty
+        self.values = values            # fullness, current_usd_value, initial_usd_value
+        self.context = context          # load_bot_context sözlüğü; None ise worker DB'den okur
+
+    def last_price(self, symbol: str):
+        return self.last_prices.get(symbol)
+
+    def min_quantity(self, symbol: str):
+        return self.min_qty.get(symbol)
+
+
+class MarketSnapshot:
+    def __init__(self, last_prices: dict, min_qty: dict, bot_values: dict, contexts: dict = None):
+        self.last_prices = last_prices  # (trade_type, symbol) -> float
+        self.min_qty = min_qty          # (trade_type, symbol) -> float
+        self.bot_values = bot_values    # bot_id -> {fullness, current_usd_value, initial_usd_value}
+        self.contexts = contexts or {}  # bot_id -> bot context
+
+    def for_bot(self, bot: dict) -> BotSnapshot:
+        trade_type = _trade_type(bot)
+        stocks = bot.get("stocks") or []
+        return BotSnapshot(
+            trade_type,
+            {s: self.last_prices[(trade_type, s)] for s in stocks if (trade_type, s) in self.last_prices},
+            {s: self.min_qty[(trade_type, s)] for s in stocks if (trade_type, s) in self.min_qty},
+            self.bot_values.get(bot["id"], {}),
+            self.contexts.get(bot["id"]),
+        )
+
+
+def _trade_type(bot: dict) -> str:
+    return "spot" if str(bot.get("bot_type", "")).lower() == "spot" else "futures"
+
+
+def build_market_snapshot(bots, contexts: dict = None) -> MarketSnapshot:
+    """Tick'in botları için fiyat, min_qty ve bot değerlerini tek bağlantıda toplu okur."""
+    contexts = contexts or {}
+    symbols = {}  # trade_type -> {symbol}
+    for bot in bots:
+        symbols.setdefault(_trade_type(bot), set()).update(bot.get("stocks") or [])
+    bot_values = {bot_id: ctx["values"] for bot_id, ctx in contexts.items() if "values" in ctx}
+    bot_ids = [bot["id"] for bot in bots if bot["id"] not in bot_values]
+
+    last_prices, min_qty = {}, {}
+    with psycopg2_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            for trade_type, syms in symbols.items():
+                if not syms:
+                    continue
+                cur.execute(
+                    f"""
+                    SELECT DISTINCT ON (coin_id) coin_id, close
+                    FROM public.{LAST_PRICE_TABLES[trade_type]}
+                    WHERE coin_id = ANY(%s) AND "interval" = '1m'
+                    ORDER BY coin_id, "timestamp" DESC
+                    """,
+                    (sorted(syms),),
+                )
+                for row in cur.fetchall():
+                    px = _float_or_none(row["close"])
+                    if px is not None:
+                        last_prices[(trade_type, row["coin_id"])] = px
+
+            all_syms = sorted(set().union(*symbols.values())) if symbols else []
+            if all_syms:
+                cur.execute(
+                    """
+                    SELECT DISTINCT ON (binance_symbol, trade_type) binance_symbol, trade_type, min_qty
+                    FROM symbol_filters
+                    WHERE binance_symbol = ANY(%s) AND trade_type = ANY(%s)
+                    ORDER BY binance_symbol, trade_type, updated_at DESC NULLS LAST, id DESC
+                    """,
+                    (all_syms, sorted(symbols)),
+                )
+                for row in cur.fetchall():
+                    qty = _float_or_none(row["min_qty"])
+                    if qty is not None:
+                        min_qty[(row["trade_type"], row["binance_symbol"])] = qty
+
+            if bot_ids:
+                cur.execute(
+                    """
+                    SELECT id, fullness, current_usd_value, initial_usd_value
+                    FROM bots
+                    WHERE id = ANY(%s)
+                    """,
+                    (bot_ids,),
+                )
+                for row in cur.fetchall():
+                    bot_values[row["id"]] = {
+                        "fullness": row["fullness"],
+                        "current_usd_value": row["current_usd_value"],
+                        "initial_usd_value": row["initial_usd_value"],
+                    }
+
+    return MarketSnapshot(last_prices, min_qty, bot_values, contexts)
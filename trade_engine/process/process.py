@@ -1,17 +1,22 @@
 # backend/trade_engine/process/process.py
 import asyncio
-from concurrent.futures import ProcessPoolExecutor
-from os import cpu_count
 
 from psycopg2.extras import RealDictCursor
 
 # Projedeki mevcut API'ler
 from trade_engine.process.save import save_result_to_json, aggregate_results_by_bot_id
 from trade_engine.process.run_bot import run_bot
+from trade_engine.process.worker_pool import strategy_pool, BotBudgetExceeded
+from trade_engine.process.quarantine import bot_quarantine
+from trade_engine.log.telegram.telegram_service import notify_user_by_telegram
+from trade_engine.process.shared_frames import PublishedFrames
+from trade_engine.process.market_snapshot import build_market_snapshot
 from trade_engine.data.bot_features import load_bot_holding, load_bot_positions
+from trade_engine.data.bot_context_cache import bot_context_cache
+from trade_engine.control.control_the_results import evaluate_results_batch, write_control_logs, send_control_notices
 
 # DB bağlantısı (fork-safe, config'ten)
-from trade_engine.config import psycopg2_connection
+from trade_engine.config import psycopg2_connection, pg_pool_stats
 
 
 def _get_last_price_1m(symbol: str, trade_type: str = "spot"):
@@ -179,54 +184,161 @@ async def handle_rent_expiry_closures(_: list) -> list:
     return flat_orders
 
 
+async def control_results_batch(results_per_bot, snapshot, interval):
+    """
+    Worker'ların ertelediği kontrolü (run_bot -> "control") tüm botlar için tek
+    seferde yapar; sonuçları aksiyonlarla değiştirir. Loglar ve Telegram
+    bildirimleri hesap bittikten sonra toplu uygulanır.
+    """
+    pending = [
+        res for res in results_per_bot
+        if isinstance(res, dict) and res.get("status") == "success" and "control" in res
+    ]
+    if not pending:
+        return
+
+    items = []
+    for res in pending:
+        control = res.pop("control")
+        items.append({
+            "user_id": control["user_id"],
+            "bot_id": res["bot_id"],
+            "results": res["results"],
+            "min_usd": control["min_usd"],
+            "ctx": snapshot.contexts.get(res["bot_id"]) if snapshot is not None else None,
+        })
+
+    loop = asyncio.get_running_loop()
+    actions_by_bot, logs, notices, errors = await loop.run_in_executor(None, evaluate_results_batch, items)
+
+    for res in pending:
+        bot_id = res["bot_id"]
+        if bot_id in errors:
+            print(f"❌ Bot {bot_id} sonuç kontrolü hatası:\n{errors[bot_id]}")
+            res.pop("results", None)
+            res.update({"status": "error", "error": errors[bot_id]})
+            logs.append({"level": "error", "bot_id": bot_id, "message": "Bot çalıştırma hatası",
+                         "symbol": None, "details": {"error": errors[bot_id]}})
+        else:
+            res["results"] = actions_by_bot.get(bot_id, [])
+
+    # bot_logs kuyruğu doluyken submit bekleyebilir: loglar executor'da, bildirimler loop'ta
+    await loop.run_in_executor(None, write_control_logs, logs)
+    send_control_notices(notices)
+    n_actions = sum(len(a) for a in actions_by_bot.values())
+    print(f"🧮 [{interval}] Sonuç kontrolü: {len(items)} bot, {n_actions} aksiyon, "
+          f"{len(logs)} log, {len(notices)} bildirim")
+
+
+async def handle_budget_violations(bots, results_per_bot, interval):
+    """Bütçeyi aşan botları kaydeder; tekrarlayanları karantinaya alıp kullanıcıya bildirir."""
+    loop = asyncio.get_running_loop()
+    for bot, res in zip(bots, results_per_bot):
+        if not isinstance(res, BotBudgetExceeded):
+            continue
+        print(f"⏱️ [{interval}] Bot {bot['id']} bütçe aşımı: {res}")
+        if not bot_quarantine.record(bot, res):
+            continue
+        print(f"🚫 [{interval}] Bot {bot['id']} karantinaya alındı: {bot_quarantine.quarantined[bot['id']]}")
+        await loop.run_in_executor(None, bot_quarantine.persist, bot)
+        msg = (
+            f"🚫 <b>Bot Durduruldu</b>\n\n"
+            f"🤖 Bot: <b>#{bot['id']}</b>\n"
+            f"⏱️ Strateji tekrar tekrar kaynak sınırını aştı ({res.kind}).\n\n"
+            f"ℹ️ Diğer botları geciktirmemesi için bot pasife alındı. Stratejiyi düzelttikten sonra yeniden başlatabilirsiniz."
+        )
+        loop.create_task(notify_user_by_telegram(text=msg, bot_id=int(bot['id'])))
+
+
 async def run_all_bots_async(bots, strategies_with_indicators, coin_data_dict, last_time, interval):
     #print("bots:", bots)
+    # Karantinadaki botlar (DB'de pasife alınamamış olsalar bile) çalıştırılmaz
+    runnable = [(b, s) for b, s in zip(bots, strategies_with_indicators) if not bot_quarantine.is_quarantined(b['id'])]
+    if len(runnable) != len(bots):
+        print(f"🚫 [{interval}] {len(bots) - len(runnable)} karantinadaki bot atlandı.")
+        bots = [b for b, _ in runnable]
+        strategies_with_indicators = [s for _, s in runnable]
+    # Kalıcı (warm) havuz: worker'lar tick'ler arasında yaşar, importlar bir kez yapılır
+    # Mum pencereleri tick başına bir kez shared memory'ye yazılır; botlara sadece manifest gider
+    # Fiyat / min_qty / bot değerleri tick başına toplu okunur; botlara kendi dilimleri gider
+    # Bot context'inin sabit kısmı önbellekten gelir (sadece değişen botlar okunur); dakikalık değerler tek sorgu
     loop = asyncio.get_running_loop()
-
-    max_workers = min(len(bots), max(1, int(cpu_count() / 2)))  # En az 1 worker
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        tasks = []
+    try:
+        contexts = await loop.run_in_executor(None, bot_context_cache.get_many, [bot["id"] for bot in bots])
+    except Exception as e:
+        print(f"⚠️ [{interval}] Bot context önbelleği okunamadı, botlar DB'den okuyacak: {e}")
+        contexts = {}
+    try:
+        snapshot = await loop.run_in_executor(None, build_market_snapshot, bots, contexts)
+    except Exception as e:
+        print(f"⚠️ [{interval}] Piyasa snapshot'ı kurulamadı, botlar DB'den okuyacak: {e}")
+        snapshot = None
+
+    frames = PublishedFrames(coin_data_dict)
+    try:
+        calls = []
         for bot, strategy_info in zip(bots, strategies_with_indicators):
             strategy_code = strategy_info['strategy_code']
             indicator_list = strategy_info['indicators']
 
             required_keys = [(coin_id, bot['period']) for coin_id in bot['stocks']]
-            filtered_coin_data = {
-                key: coin_data_dict.get(key)
-                for key in required_keys
-                if key in coin_data_dict
-            }
-
-            task = loop.run_in_executor(
-                executor, run_bot, bot, strategy_code, indicator_list, filtered_coin_data
-            )
-            tasks.append(task)
-
-        # 1) Normal bot sonuçları
-        results_per_bot = await asyncio.gather(*tasks)
-
-        # 2) Normal sonuçları FLAT listeye indir
-        all_results = []
-        for res in results_per_bot:
-            if isinstance(res, dict):
-                if "results" in res and isinstance(res["results"], list):
-                    all_results.extend(res["results"])
-                else:
-                    all_results.append(res)
-            elif isinstance(res, list):
-                all_results.extend(res)
-
-        # 3) Kiralık kapanışlarını FLAT ekle
-        rent_close_orders = await handle_rent_expiry_closures([])
-        if rent_close_orders:
-            all_results.extend(rent_close_orders)
-
-        # 4) Grupla -> { "<bot_id>": [ {order}, ... ] }
-        result_dict = aggregate_results_by_bot_id(all_results)
-
-        # 5) Kaydet
-        #if result_dict:
-            #print("result_dict: ", result_dict)
-            #await save_result_to_json(result_dict, last_time, interval)
-
-        return all_results
+            bot_snapshot = snapshot.for_bot(bot) if snapshot is not None else None
+            calls.append((run_bot, (bot, strategy_code, indicator_list, frames.for_keys(required_keys), bot_snapshot)))
+
+        # 1) Normal bot sonuçları (çöken worker tüm tick'i düşürmesin; hata nesnesi yerinde döner)
+        cache_stats = strategy_pool.new_tick_stats()
+        results_per_bot = await strategy_pool.run_many(calls, stats=cache_stats)
+    finally:
+        frames.release()
+
+    lookups = cache_stats["hits"] + cache_stats["misses"]
+    if lookups:
+        print(f"🧠 [{interval}] Kod önbelleği: hit {cache_stats['hits'] / lookups:.1%} ({cache_stats['hits']}/{lookups}), "
+              f"derleme {cache_stats['compile_sec'] * 1000:.1f} ms, kazanılan CPU {cache_stats['saved_sec'] * 1000:.1f} ms")
+    indicator_runs = cache_stats["indicator_hits"] + cache_stats["indicator_misses"] + cache_stats["indicator_skipped"]
+    if indicator_runs:
+        print(f"♻️ [{interval}] İndikatör paylaşımı: {indicator_runs} çalıştırmanın {cache_stats['indicator_hits']} tanesi "
+              f"bellekten (dedup {cache_stats['indicator_hits'] / indicator_runs:.1%}), "
+              f"{cache_stats['indicator_misses']} hesaplandı, {cache_stats['indicator_skipped']} paylaşıma uygun değil")
+
+    if cache_stats["db_waits"]:
+        main_db = pg_pool_stats()
+        print(f"🔌 [{interval}] DB havuzu: worker'larda {cache_stats['db_checkouts']} checkout, "
+              f"{cache_stats['db_waits']} bekleme ({cache_stats['db_wait_sec'] * 1000:.0f} ms); "
+              f"ana process {main_db.get('in_use', 0)}/{main_db.get('max', 0)} kullanımda, "
+              f"toplam {main_db.get('waits', 0)} bekleme")
+
+    # Bütçe aşımları (CPU/süre/bellek/asılı) -> karantina
+    await handle_budget_violations(bots, results_per_bot, interval)
+
+    # Sonuç kontrolü (hedef/aksiyon hesabı) tüm botlar için toplu
+    await control_results_batch(results_per_bot, snapshot, interval)
+
+    # 2) Normal sonuçları FLAT listeye indir
+    all_results = []
+    for bot, res in zip(bots, results_per_bot):
+        if isinstance(res, BaseException):
+            print(f"❌ Bot {bot['id']} worker hatası: {res!r}")
+            all_results.append({"bot_id": bot['id'], "status": "error", "error": repr(res)})
+        elif isinstance(res, dict):
+            if "results" in res and isinstance(res["results"], list):
+                all_results.extend(res["results"])
+            else:
+                all_results.append(res)
+        elif isinstance(res, list):
+            all_results.extend(res)
+
+    # 3) Kiralık kapanışlarını FLAT ekle
+    rent_close_orders = await handle_rent_expiry_closures([])
+    if rent_close_orders:
+        all_results.extend(rent_close_orders)
+
+    # 4) Grupla -> { "<bot_id>": [ {order}, ... ] }
+    result_dict = aggregate_results_by_bot_id(all_results)
+
+    # 5) Kaydet
+    #if result_dict:
+        #print("result_dict: ", result_dict)
+        #await save_result_to_json(result_dict, last_time, interval)
+
+    return all_results
@@ -0,0 +1,112 @@
+# trade_engine/process/quarantine.py
+"""
+Bütçe ihlali yapan botların karantinası.
+
+Worker havuzu bir botun görevini CPU / süre / bellek bütçesi aşıldığı ya da
+asılı kaldığı için kestiğinde (BotBudgetExceeded) ihlal buraya yazılır. Bir bot
+STRATEGY_QUARANTINE_WINDOW_SEC içinde STRATEGY_QUARANTINE_AFTER ihlale ulaşırsa:
+    - bu process'te bir daha çalıştırılmaz (DB güncellemesi başarısız olsa bile)
+    - bots.active = FALSE yapılır (kullanıcı düzelttikten sonra yeniden açar;
+      pasife alma DB'ye yazıldıktan sonra bot yeniden aktif yüklenirse karantina
+      kalkar, bkz. release_reactivated)
+    - bot_logs'a ihlal geçmişiyle bir hata kaydı düşülür
+Bildirim (Telegram) çağıran tarafın işidir.
+"""
+import os
+import time
+from collections import deque
+
+from trade_engine.config import psycopg2_connection
+from trade_engine.log.log import log_error, log_warning
+
+STRATEGY_QUARANTINE_AFTER = int(os.getenv("STRATEGY_QUARANTINE_AFTER", "3"))
+STRATEGY_QUARANTINE_WINDOW_SEC = float(os.getenv("STRATEGY_QUARANTINE_WINDOW_SEC", "3600"))
+
+
+class BotQuarantine:
+    def __init__(self, after: int = STRATEGY_QUARANTINE_AFTER, window: float = STRATEGY_QUARANTINE_WINDOW_SEC):
+        self.after = max(1, after)
+        self.window = window
+        self.violations = {}   # bot_id -> deque[(monotonic, kind)]
+        self.quarantined = {}  # bot_id -> [kind, ...]
+        self.persisted = {}    # bot_id -> monotonic (bots.active = FALSE commit edildiği an)
+
+    def is_quarantined(self, bot_id: int) -> bool:
+        return bot_id in self.quarantined
+
+    def record(self, bot: dict, violation) -> bool:
+        """İhlali yazar ve bot_logs'a uyarı atar. Bot bu ihlalle karantinaya girdiyse True."""
+        bot_id = bot["id"]
+        now = time.monotonic()
+        history = self.violations.setdefault(bot_id, deque())
+        history.append((now, violation.kind))
+        while history and now - history[0][0] > self.window:
+            history.popleft()
+
+        log_warning(
+            bot_id=bot_id, user_id=bot.get("user_id"),
+            message="Strateji kaynak bütçesini aştı",
+            symbol=None, period=bot.get("period"),
+            details={"kind": violation.kind, "detail": violation.detail,
+                     "violations": len(history), "limit": self.after},
+        )
+        if len(history) < self.after or bot_id in self.quarantined:
+            return False
+        self.quarantined[bot_id] = [kind for _, kind in history]
+        return True
+
+    def persist(self, bot: dict) -> bool:
+        """
+        Karantinayı DB'ye işler: bots.active = FALSE + bot_logs kaydı (bloklayan; executor'da çağrılır).
+        DB güncellemesi commit edildiyse True; başarısızsa bot bu process'te karantinada kalır.
+        """
+        bot_id = bot["id"]
+        kinds = self.quarantined.get(bot_id, [])
+        ok = False
+        try:
+            with psycopg2_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("UPDATE public.bots SET active = FALSE WHERE id = %s;", (bot_id,))
+                conn.commit()
+            self.persisted[bot_id] = time.monotonic()
+            ok = True
+        except Exception as e:
+            print(f"❌ Bot {bot_id} karantinası DB'ye yazılamadı (bu process'te yine de çalıştırılmayacak): {e}")
+        log_error(
+            bot_id=bot_id, user_id=bot.get("user_id"),
+            message="Bot karantinaya alındı ve durduruldu",
+            symbol=None, period=bot.get("period"),
+            details={"violations": kinds, "window_sec": self.window},
+        )
+        return ok
+
+    def release(self, bot_id: int):
+        self.quarantined.pop(bot_id, None)
+        self.violations.pop(bot_id, None)
+        self.persisted.pop(bot_id, None)
+
+    def release_reactivated(self, bots, loaded_at: float) -> list:
+        """
+        load_active_bots çıktısında yeniden görünen karantina botlarını serbest bırakır.
+        Sadece pasife alma commit edildikten sonra başlamış bir okumada aktif görünen
+        botlar (kullanıcı yeniden başlatmış) bırakılır; serbest bırakılan id'leri döndürür.
+        """
+        if not self.persisted:
+            return []
+        released = []
+        for bot in bots:
+            persisted_at = self.persisted.get(bot["id"])
+            if persisted_at is not None and loaded_at > persisted_at:
+                self.release(bot["id"])
+                released.append(bot["id"])
+        return released
+
+    def stats(self) -> dict:
+        return {
+            "quarantined": len(self.quarantined),
+            "persisted": len(self.persisted),
+            "bots_with_violations": len(self.violations),
+        }
+
+
+bot_quarantine = BotQuarantine()
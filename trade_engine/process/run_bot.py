@@ -3,6 +3,9 @@ from trade_engine.control.control_the_results import control_the_results
 from trade_engine.log.log import log_info, log_warning, log_error
 from psycopg2.extras import RealDictCursor
 from trade_engine.config import psycopg2_connection
+from trade_engine.process.shared_frames import resolve as resolve_frames
+from trade_engine.process.code_cache import compile_cached
+from trade_engine.process.indicator_memo import run_indicators
 import math
 
 
@@ -67,7 +70,10 @@ def _get_min_qty(symbol: str, trade_type: str):
             return float(row["min_qty"]) if row and row.get("min_qty") is not None else None
 
 
-def run_bot(bot, strategy_code, indicator_list, coin_data_dict):
+def run_bot(bot, strategy_code, indicator_list, coin_data_dict, snapshot=None):
+    # coin_data_dict: {(coin_id, period): DataFrame} ya da shared memory manifesti (SharedFrames)
+    # snapshot: tick'in BotSnapshot'ı (fiyat, min_qty, bot değerleri); None ise DB'den okunur
+    coin_data_dict = resolve_frames(coin_data_dict)
 
     order_fields = {
         "order_type": "", "stop_loss": 0.0, "take_profit": 0.0, "price": 0.0, "limit_price": 0.0, "trigger_price": 0.0, 
@@ -110,6 +116,7 @@ def run_bot(bot, strategy_code, indicator_list, coin_data_dict):
                 return a != b
 
         enter_on_start = bool(bot.get('enter_on_start', False))
+        market = 'spot' if str(bot.get('bot_type', '')).lower() == 'spot' else 'futures'
 
         for coin_id in bot['stocks']:
             if coin_id not in df_dict:
@@ -124,12 +131,13 @@ def run_bot(bot, strategy_code, indicator_list, coin_data_dict):
                 })
                 continue
 
-            allowed_globals = allowed_globals_(df_dict[coin_id], bot['id'])
+            allowed_globals = allowed_globals_(df_dict[coin_id], bot['id'], snapshot)
 
-            for indicator in indicator_list:
-                exec(indicator['code'], allowed_globals)
+            # İndikatörler: deterministik olanlar aynı tick'te aynı mumlar için bir kez hesaplanır
+            run_indicators(indicator_list, allowed_globals, market, coin_id, bot['period'])
 
-            exec(strategy_code, allowed_globals)
+            # Derlenmiş code object'ler worker içinde içerik özetine göre önbellekte
+            exec(compile_cached(strategy_code, f"<strategy {bot.get('strategy_id')}>"), allowed_globals)
 
             result_df = allowed_globals['df']
             last_positions = (
@@ -195,20 +203,34 @@ def run_bot(bot, strategy_code, indicator_list, coin_data_dict):
 
         min_usd_map = {}
         for coin_id in bot['stocks']:
-            min_qty = _get_min_qty(coin_id, trade_type)
+            if snapshot is not None:
+                min_qty = snapshot.min_quantity(coin_id)
+                last_px = snapshot.last_price(coin_id)
+            else:
+                min_qty = _get_min_qty(coin_id, trade_type)
+                last_px = _get_last_price_1m(coin_id, trade_type)
             #print("coin_id, trade_type, min_qty:", coin_id, trade_type, min_qty)
-            last_px = _get_last_price_1m(coin_id, trade_type)
             if min_qty is not None and last_px is not None:
                 min_usd_map[coin_id] = float(min_qty) * float(last_px)
 
         effective_min_arg = build_effective_min_arg(min_usd_map, floor=10.0)
 
         #print("effective_min_arg:", effective_min_arg)
+        if snapshot is not None:
+            # Tick yolu: kontrol, tüm botlar için ana process'te toplu yapılır
+            # (process.control_results_batch); ham sonuçlar ve eşik geri döner.
+            return {
+                "bot_id": bot['id'],
+                "status": "success",
+                "results": results,
+                "control": {"user_id": bot.get('user_id'), "min_usd": effective_min_arg},
+            }
+
         results = control_the_results(
             bot.get('user_id'),
             bot['id'],
             results,
-            min_usd=effective_min_arg
+            min_usd=effective_min_arg,
         )
 
         return {
@@ -217,6 +239,8 @@ def run_bot(bot, strategy_code, indicator_list, coin_data_dict):
             "results": results
         }
 
+    except MemoryError:
+        raise  # worker bellek tavanı: havuz bunu bütçe ihlali olarak raporlar
     except Exception as e:
         import traceback
         error_msg = f"{str(e)}\n{traceback.format_exc()}"
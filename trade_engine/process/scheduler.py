@@ -0,0 +1,197 @@
+# trade_engine/process/scheduler.py
+"""
+Interval/market tick'leri için deadline'lı zamanlayıcı.
+
+Eskiden 1m mutlak öncelikliydi; diğer intervaller 1m bitene kadar sleep(1)
+döngüsünde bekliyor, aynı anahtar kuyruktaysa yeni bildirim düşüyordu.
+Şimdi:
+- Bekleyen her (interval, market) tick'i bir deadline ile öncelik kuyruğuna
+  girer (earliest-deadline-first). Deadline intervalin uzunluğuyla orantılıdır,
+  böylece 1m doğal olarak önce çalışır ama 1h birkaç saniye aç kalmaz.
+- Aynı anahtar için bekleyen tick varsa yeni bildirim onunla birleşir (en yeni
+  mum zamanı kalır); aynı anahtar aynı anda iki kez çalışmaz.
+- Bağımsız tick'ler TICK_SCHEDULER_MAX_CONCURRENT sınırına kadar paralel çalışır
+  (strateji worker havuzu ortak olduğu için CPU bütçesi bu sınırla ifade edilir).
+- Aynı anda kapanan (TICK_MERGE_WINDOW_MS içinde gelen) aynı marketteki tick'ler
+  tek bir çalıştırmada birleştirilir: tek snapshot, tek shared memory bloğu, tek
+  worker partisi.
+- Kuyrukta bekleme süresi interval bazında tutulur (`stats`).
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import deque
+
+from trade_engine import metrics
+
+logger = logging.getLogger("StrategyEngine")
+
+TICK_SCHEDULER_MAX_CONCURRENT = int(os.getenv("TICK_SCHEDULER_MAX_CONCURRENT", "2"))
+TICK_MERGE_WINDOW_MS = int(os.getenv("TICK_MERGE_WINDOW_MS", "150"))
+
+INTERVAL_SEC = {
+    "1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800,
+    "1h": 3600, "2h": 7200, "4h": 14400, "6h": 21600, "8h": 28800,
+    "12h": 43200, "1d": 86400, "3d": 259200, "1w": 604800, "1M": 2592000,
+}
+
+
+def deadline_for(interval: str) -> float:
+    """Tick'in kuyruğa girişinden itibaren başlaması gereken süre (sn)."""
+    return min(max(5.0, INTERVAL_SEC.get(interval, 60) * 0.1), 120.0)
+
+
+class Tick:
+    __slots__ = ("interval", "market_type", "candle_ts", "watermark", "enqueued", "received_at", "deadline", "merged")
+
+    def __init__(self, interval, market_type, candle_ts, watermark, now):
+        self.interval = interval
+        self.market_type = market_type
+        self.candle_ts = candle_ts
+        self.watermark = watermark
+        self.enqueued = now
+        self.received_at = time.time()  # bildirimin geldiği epoch (mum kapanışı gecikmesi için)
+        self.deadline = now + deadline_for(interval)
+        self.merged = 0  # birleşen bildirim sayısı
+
+    @property
+    def key(self):
+        return self.interval, self.market_type
+
+
+class TickScheduler:
+    def __init__(self, runner, max_concurrent: int = TICK_SCHEDULER_MAX_CONCURRENT,
+                 merge_window_ms: int = TICK_MERGE_WINDOW_MS):
+        """runner: async fn(list[Tick]) — aynı marketteki bir veya birden çok tick'i çalıştırır."""
+        self.runner = runner
+        self.max_concurrent = max(1, max_concurrent)
+        self.merge_window = merge_window_ms / 1000
+
+        self.pending = {}       # key -> Tick
+        self._heap = []         # (deadline, seq, key)
+        self._seq = itertools.count()
+        self.running = set()    # çalışan anahtarlar
+        self._tasks = set()
+        self._wakeup = asyncio.Event()
+
+        # Sayaçlar
+        self.delays = {}        # interval -> deque[kuyruk bekleme sn]
+        self.dispatched = 0
+        self.batches = 0
+        self.coalesced = 0
+        self.late = 0
+
+    # ---------------- giriş ----------------
+    def submit(self, interval: str, market_type: str, candle_ts=None, watermark=None):
+        now = time.monotonic()
+        key = (interval, market_type)
+        tick = self.pending.get(key)
+        if tick is not None:
+            # Aynı anahtar zaten bekliyor: en yeni mum zamanı ve watermark kalsın
+            tick.merged += 1
+            self.coalesced += 1
+            if candle_ts is None or tick.candle_ts is None or candle_ts >= tick.candle_ts:
+                tick.candle_ts, tick.watermark = candle_ts, watermark
+            return
+        tick = Tick(interval, market_type, candle_ts, watermark, now)
+        self.pending[key] = tick
+        heapq.heappush(self._heap, (tick.deadline, next(self._seq), key))
+        self._wakeup.set()
+
+    # ---------------- dağıtım ----------------
+    def _pop_ready(self, now: float):
+        """Başlatılabilir en erken deadline'lı tick + birleştirilebilecekler; yoksa (None, bekleme)."""
+        skipped = []
+        batch = None
+        wait = None
+        while self._heap:
+            deadline, seq, key = heapq.heappop(self._heap)
+            tick = self.pending.get(key)
+            if tick is None or tick.deadline != deadline:
+                continue  # eski kayıt
+            if key in self.running:
+                skipped.append((deadline, seq, key))  # aynı anahtar bitince çalışır
+                continue
+            ready_at = tick.enqueued + self.merge_window
+            if ready_at > now:
+                # Aynı anda kapanan diğer intervallerin bildirimleri gelsin
+                skipped.append((deadline, seq, key))
+                wait = ready_at - now if wait is None else min(wait, ready_at - now)
+                continue
+            batch = [tick]
+            del self.pending[key]
+            break
+        for item in skipped:
+            heapq.heappush(self._heap, item)
+
+        if batch is None:
+            return None, wait
+
+        # Aynı market, aynı anda kapanmış (birleştirme penceresi içinde gelmiş) diğer tick'ler
+        first = batch[0]
+        for key, tick in list(self.pending.items()):
+            if (tick.market_type == first.market_type and key not in self.running
+                    and abs(tick.enqueued - first.enqueued) <= self.merge_window):
+                batch.append(self.pending.pop(key))
+        return batch, None
+
+    def _record(self, batch, now: float):
+        self.batches += 1
+        for tick in batch:
+            self.dispatched += 1
+            delay = now - tick.enqueued
+            self.delays.setdefault(tick.interval, deque(maxlen=500)).append(delay)
+            metrics.observe("queue", delay)
+            if now > tick.deadline:
+                self.late += 1
+                logger.warning(f"⏰ {tick.interval}_{tick.market_type} deadline aşıldı: kuyrukta {delay:.2f} sn beklendi.")
+
+    async def _run_batch(self, batch):
+        keys = [tick.key for tick in batch]
+        self.running.update(keys)
+        try:
+            await self.runner(batch)
+        except Exception as e:
+            logger.error(f"❌ Tick partisi hatası ({', '.join(f'{i}_{m}' for i, m in keys)}): {e}")
+        finally:
+            self.running.difference_update(keys)
+            self._tasks.discard(asyncio.current_task())  # run() uyanınca slot boş görünsün
+            self._wakeup.set()
+
+    async def run(self):
+        while True:
+            self._wakeup.clear()
+            wait = None
+            while len(self._tasks) < self.max_concurrent:
+                now = time.monotonic()
+                batch, wait = self._pop_ready(now)
+                if batch is None:
+                    break
+                self._record(batch, now)
+                task = asyncio.create_task(self._run_batch(batch))
+                self._tasks.add(task)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        def pct(values, q):
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+        return {
+            "pending": len(self.pending),
+            "running": len(self.running),
+            "dispatched": self.dispatched,
+            "batches": self.batches,
+            "coalesced": self.coalesced,
+            "late": self.late,
+            "queue_delay_sec": {
+                interval: {"p50": pct(d, 0.5), "p95": pct(d, 0.95), "max": round(max(d), 3)}
+                for interval, d in self.delays.items() if d
+            },
+        }
@@ -0,0 +1,197 @@
+# trade_engine/process/shared_frames.py
+"""
+Tick'in mum pencerelerini strateji worker'larına shared memory üzerinden verir.
+
+Ana process her tick'te tüm (coin_id, interval) serilerini tek bir
+`multiprocessing.shared_memory` bloğuna kolon bazlı yazar:
+    float kolonlar -> (kolon sayısı x satır) float64 blok (pandas'ın kendi blok düzeni)
+    datetime kolonlar -> int64 (ns) dizi
+Her bot görevine sadece küçük bir manifest (blok adı + ofsetler) pickle edilir;
+IPC hacmi bot x mum yerine benzersiz seri sayısıyla orantılıdır.
+
+Worker bloğu salt-okunur map eder ve DataFrame'leri kopyasız kurar (bir tick
+içinde aynı worker'da aynı seri tekrar kurulmaz). run_bot stratejiye vermeden
+önce DataFrame'i kendisi kopyalar; salt-okunur diziler stratejiye sızmaz.
+
+Blok tick sonunda unlink edilir; kolonu float/datetime olmayan seriler ya da
+shared memory açılamazsa (ör. küçük /dev/shm) eski yol (pickle) kullanılır.
+"""
+import os
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+STRATEGY_SHARED_FRAMES = os.getenv("STRATEGY_SHARED_FRAMES", "true").strip().lower() in ("1", "true", "yes")
+
+_ALIGN = 64  # her dizi cache line sınırında başlasın
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _layout(df: pd.DataFrame):
+    """Paylaşılabilir seri ise (float kolonlar, datetime kolonlar, bayt) döner; değilse None."""
+    float_cols, time_cols = [], []
+    for col, dtype in df.dtypes.items():
+        if dtype == np.float64:
+            float_cols.append(col)
+        elif dtype == "datetime64[ns]":
+            time_cols.append(col)
+        else:
+            return None
+    n = len(df)
+    size = _aligned(len(float_cols) * n * 8) + len(time_cols) * _aligned(n * 8)
+    return float_cols, time_cols, size
+
+
+class SharedFrames:
+    """Bir botun göreceği serilerin manifesti (picklable, birkaç yüz bayt)."""
+
+    __slots__ = ("block", "entries", "inline")
+
+    def __init__(self, block: str | None, entries: dict, inline: dict):
+        self.block = block      # shared memory adı
+        self.entries = entries  # key -> (n, columns, float_cols, float_off, [(col, off), ...])
+        self.inline = inline    # key -> DataFrame (paylaşılamayan seriler, pickle ile)
+
+    def get(self, key, default=None):
+        if key in self.inline:
+            return self.inline[key]
+        if key not in self.entries:
+            return default
+        return _attach(self.block).frame(key, self.entries[key])
+
+    def __contains__(self, key):
+        return key in self.entries or key in self.inline
+
+    def keys(self):
+        return list(self.entries) + list(self.inline)
+
+
+class PublishedFrames:
+    """Ana process tarafı: tick boyunca bloğun sahibi."""
+
+    def __init__(self, coin_data_dict: dict, enabled: bool = STRATEGY_SHARED_FRAMES):
+        self.shm = None
+        self.entries = {}
+        self.inline = {}
+        self.bytes = 0
+
+        layouts = {}
+        for key, df in coin_data_dict.items():
+            layout = _layout(df) if (enabled and df is not None) else None
+            if layout is None:
+                self.inline[key] = df
+            else:
+                layouts[key] = layout
+
+        total = sum(size for _, _, size in layouts.values())
+        try:
+            if not total:
+                raise OSError("paylaşılacak satır yok")
+            self.shm = shared_memory.SharedMemory(create=True, size=total)
+        except OSError as e:
+            if total:
+                print(f"⚠️ Shared memory açılamadı ({total / 2**20:.1f} MB), pickle kullanılacak: {e}")
+            self.inline.update({key: coin_data_dict[key] for key in layouts})
+            layouts = {}
+
+        offset = 0
+        for key, (float_cols, time_cols, size) in layouts.items():
+            df = coin_data_dict[key]
+            n = len(df)
+            float_off = offset
+            if float_cols:
+                block = np.ndarray((len(float_cols), n), dtype=np.float64, buffer=self.shm.buf, offset=offset)
+                block[:] = df[float_cols].to_numpy(dtype=np.float64).T
+                offset += _aligned(len(float_cols) * n * 8)
+            time_offs = []
+            for col in time_cols:
+                arr = np.ndarray(n, dtype=np.int64, buffer=self.shm.buf, offset=offset)
+                arr[:] = df[col].to_numpy(dtype="datetime64[ns]").view(np.int64)
+                time_offs.append((col, offset))
+                offset += _aligned(n * 8)
+            self.entries[key] = (n, list(df.columns), float_cols, float_off, time_offs)
+        self.bytes = offset
+
+    def for_keys(self, keys) -> SharedFrames:
+        keys = [k for k in keys if k in self.entries or k in self.inline]
+        return SharedFrames(
+            self.shm.name if self.shm is not None else None,
+            {k: self.entries[k] for k in keys if k in self.entries},
+            {k: self.inline[k] for k in keys if k in self.inline},
+        )
+
+    def release(self):
+        if self.shm is not None:
+            try:
+                self.shm.close()
+                self.shm.unlink()
+            except (OSError, BufferError) as e:
+                print(f"⚠️ Shared memory bırakılamadı: {e}")
+            self.shm = None
+
+
+# ---------------- worker tarafı ----------------
+class _Attached:
+    def __init__(self, name: str):
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.frames = {}
+
+    def frame(self, key, entry) -> pd.DataFrame:
+        df = self.frames.get(key)
+        if df is not None:
+            return df
+        n, columns, float_cols, float_off, time_offs = entry
+        buf = self.shm.buf
+        if float_cols:
+            block = np.ndarray((len(float_cols), n), dtype=np.float64, buffer=buf, offset=float_off)
+            block.flags.writeable = False
+            # (satır x kolon) görünümü pandas'ın blok düzeniyle aynı: kopya yok
+            df = pd.DataFrame(block.T, columns=float_cols, copy=False)
+        else:
+            df = pd.DataFrame(index=pd.RangeIndex(n))
+        for col, off in time_offs:
+            arr = np.ndarray(n, dtype="datetime64[ns]", buffer=buf, offset=off)
+            arr.flags.writeable = False
+            df.insert(min(columns.index(col), len(df.columns)), col, arr)
+        if list(df.columns) != columns:
+            df = df[columns]
+        self.frames[key] = df
+        return df
+
+    def close(self) -> bool:
+        self.frames.clear()
+        try:
+            self.shm.close()
+            return True
+        except BufferError:
+            return False  # DataFrame'ler hâlâ yaşıyor; sonra tekrar denenir
+
+
+_ATTACHED = OrderedDict()  # blok adı -> _Attached (aynı anda birkaç interval tick'i olabilir)
+_MAX_ATTACHED = 4
+
+
+def _attach(name: str) -> _Attached:
+    att = _ATTACHED.get(name)
+    if att is not None:
+        _ATTACHED.move_to_end(name)
+        return att
+    att = _ATTACHED[name] = _Attached(name)
+    while len(_ATTACHED) > _MAX_ATTACHED:
+        old_name, old = next(iter(_ATTACHED.items()))
+        if not old.close():
+            break
+        del _ATTACHED[old_name]
+    return att
+
+
+def resolve(coin_data_dict) -> dict:
+    """run_bot girişinde: SharedFrames manifestini {key: DataFrame} sözlüğüne çevirir."""
+    if isinstance(coin_data_dict, SharedFrames):
+        return {key: coin_data_dict.get(key) for key in coin_data_dict.keys()}
+    return coin_data_dict
@@ -1,17 +1,64 @@
 import asyncio
 import logging
+import time
 from trade_engine.data.bot_load import load_active_bots
-from trade_engine.data.strategy_load import load_strategy
-from trade_engine.data.indicator_load import load_indicators
+from trade_engine.data.strategy_cache import strategy_cache
 from trade_engine.data.data_load import fetch_all_candles
+from trade_engine.data.candle_feed import to_ms, CANDLE_FEED_ENABLED
+from trade_engine.data.readiness import readiness, READINESS_DEADLINE_SEC, READINESS_POLL_SEC
+from trade_engine.process.quarantine import bot_quarantine
 
 logger = logging.getLogger(__name__)
 
-async def run_trade_engine(interval, min_timestamp=None, market_type="futures"):
+def _stale_keys(coin_requirements, coin_data_dict, min_ms: int) -> list:
+    """Verisi hiç olmayan ya da son mumu tick mumundan eski olan anahtarlar."""
+    stale = []
+    for key in coin_requirements:
+        df = coin_data_dict.get(key)
+        if df is None or df.empty or to_ms(df.iloc[-1]['timestamp']) < min_ms:
+            stale.append(key)
+    return stale
+
+
+async def _poll_stale(coin_requirements, coin_data_dict, stale, table_name, min_timestamp, min_ms):
+    """candle_feed yokken: sadece eksik anahtarları kısa aralıkla, deadline'a kadar yeniden okur."""
+    deadline = time.monotonic() + READINESS_DEADLINE_SEC
+    while stale:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            break
+        await asyncio.sleep(min(READINESS_POLL_SEC, left))
+        refreshed = await fetch_all_candles(
+            {key: coin_requirements[key] for key in stale}, table_name=table_name, min_timestamp=min_timestamp
+        )
+        coin_data_dict.update(refreshed)
+        stale = _stale_keys({key: None for key in stale}, coin_data_dict, min_ms)
+    return stale
+
+
+def _describe(key, coin_data_dict, min_timestamp) -> str:
+    df = coin_data_dict.get(key)
+    if df is None:
+        return f"{key[0]} (MISSING)"
+    if df.empty:
+        return f"{key[0]} (EMPTY)"
+    return f"{key[0]} ({df.iloc[-1]['timestamp']} < {min_timestamp})"
+
+
+async def run_trade_engine(interval, min_timestamp=None, market_type="futures", wait_for_data=True):
+    """
+    wait_for_data: tick mumu henüz yazılmamış anahtarlar için hazır olma bariyerinde
+    beklenir mi. Completeness watermark ile tetiklendiğinde False verilir; veri yazımı
+    zaten tamamlanmıştır (ya da deadline dolmuştur), eksikler sadece loglanır.
+    """
     # Determine table name based on market type
     table_name = "binance_futures" if market_type.lower() == "futures" else "binance_data"
 
+    loaded_at = time.monotonic()
     bots = load_active_bots(interval)
+    # Karantinada pasife alınmış ama kullanıcının yeniden açtığı botlar tekrar çalışır
+    for bot_id in bot_quarantine.release_reactivated(bots, loaded_at):
+        print(f"♻️ [{interval}] Bot {bot_id} yeniden aktif: karantina kaldırıldı.")
     
     # Filter bots by market_type
     # Using case-insensitive comparison and default to empty string if bot_type is missing
@@ -24,14 +71,15 @@ async def run_trade_engine(interval, min_timestamp=None, market_type="futures"):
     strategies_with_indicators = []
     coin_requirements = {}
 
-    for bot in bots:
-        strategy_code = load_strategy(bot['strategy_id'])
-        indicator_list = load_indicators(bot['strategy_id'])
+    # Tüm botların stratejileri/indikatörleri: önbellek + eksikler için tek sorgu
+    strategies = strategy_cache.get_many(bot['strategy_id'] for bot in bots)
 
+    for bot in bots:
+        strategy = strategies[bot['strategy_id']]
         strategies_with_indicators.append({
             'strategy_id': bot['strategy_id'],
-            'strategy_code': strategy_code,
-            'indicators': indicator_list
+            'strategy_code': strategy['strategy_code'],
+            'indicators': strategy['indicators']
         })
 
         for coin_id in bot['stocks']:
@@ -40,51 +88,38 @@ async def run_trade_engine(interval, min_timestamp=None, market_type="futures"):
             if key not in coin_requirements or coin_requirements[key] < bot['candle_count']:
                 coin_requirements[key] = bot['candle_count']
 
-    # --- RETRY LOOP FOR DATA CONSISTENCY ---
-    max_retries = 10
-    retry_delay = 0.5
-    
-    coin_data_dict = {}
-    
-    for attempt in range(max_retries):
-        coin_data_dict = await fetch_all_candles(coin_requirements, table_name=table_name)
-        
-        if not min_timestamp:
-            break
+    coin_data_dict = await fetch_all_candles(coin_requirements, table_name=table_name, min_timestamp=min_timestamp)
+    if not min_timestamp:
+        return strategies_with_indicators, coin_data_dict, bots
 
-        # Check if all required data is up-to-date
-        all_fresh = True
-        missing_coins = []
-        
-        for key, df in coin_data_dict.items():
-            if df.empty:
-                all_fresh = False
-                missing_coins.append(f"{key[0]} (EMPTY)")
-                continue
-                
-            last_ts = df.iloc[-1]['timestamp']
-            # Basic comparison: convert to string to handle type diffs (datetime vs Timestamp)
-            # or use >= if types are compatible.
-            # Convert both to string for safer comparison
-            if str(last_ts) < str(min_timestamp):
-                all_fresh = False
-                missing_coins.append(f"{key[0]} ({last_ts} < {min_timestamp})")
-        
-        # Check if any required key is completely missing from dict
-        for req_key in coin_requirements:
-            if req_key not in coin_data_dict:
-                all_fresh = False
-                missing_coins.append(f"{req_key[0]} (MISSING)")
-
-        if all_fresh:
-            if attempt > 0:
-                logger.info(f"✅ Data consistent after {attempt} retries.")
-            break
-        
-        if attempt < max_retries - 1:
-            logger.warning(f"⏳ Waiting for data consistency ({attempt+1}/{max_retries}). Missing/Stale: {missing_coins[:5]}...")
-            await asyncio.sleep(retry_delay)
+    # --- READINESS BARRIER ---
+    # Tick mumu henüz yazılmamış anahtarlar data_engine'in candle_feed yayınıyla beklenir;
+    # tek deadline, sonra sadece sinyal gelenler yeniden okunur. Yayın kapalıysa sinyal
+    # gelmez: eksikler kısa aralıklı DB okumasıyla beklenir.
+    min_ms = to_ms(min_timestamp)
+    stale = _stale_keys(coin_requirements, coin_data_dict, min_ms)
+    if stale and wait_for_data:
+        t0 = time.monotonic()
+        if CANDLE_FEED_ENABLED:
+            signaled, _ = await readiness.wait(table_name, stale, min_ms, READINESS_DEADLINE_SEC)
+            if signaled:
+                refreshed = await fetch_all_candles(
+                    {key: coin_requirements[key] for key in signaled}, table_name=table_name, min_timestamp=min_timestamp
+                )
+                coin_data_dict.update(refreshed)
         else:
-            logger.error(f"⚠ Max retries reached. Proceeding with potentially stale data. Missing/Stale: {missing_coins[:10]}")
+            await _poll_stale(coin_requirements, coin_data_dict, stale, table_name, min_timestamp, min_ms)
+        still_stale = _stale_keys(coin_requirements, coin_data_dict, min_ms)
+        waited = time.monotonic() - t0
+        if not still_stale:
+            logger.info(f"✅ {len(stale)} anahtar için veri {waited:.2f} sn beklendikten sonra hazır.")
+        stale = still_stale
+
+    if stale:
+        logger.warning(
+            f"⚠ Partial data set for this tick ({market_type} {interval} {min_timestamp}): "
+            f"{len(coin_requirements) - len(stale)}/{len(coin_requirements)} ready. "
+            f"Missing/Stale: {[_describe(key, coin_data_dict, min_timestamp) for key in sorted(stale)[:10]]}"
+        )
 
     return strategies_with_indicators, coin_data_dict, bots
\ No newline at end of file
@@ -0,0 +1,451 @@
+# trade_engine/process/worker_pool.py
+"""
+Strateji çalıştırma için kalıcı (warm) process havuzu.
+
+- Havuz strategy engine ile birlikte bir kez açılır; tick'ler ve intervaller
+  arasında yaşamaya devam eder (her tick'te spawn/import/teardown yok).
+- Worker'lar açılırken sandbox kütüphanelerini (pandas, numpy, ta) ve run_bot
+  bağımlılıklarını önceden import eder.
+- Her görev sonunda worker kendi görev sayısını ve RSS'ini bildirir; bir worker
+  STRATEGY_POOL_MAX_TASKS görevi ya da STRATEGY_POOL_MAX_RSS_MB belleği aşarsa
+  arka planda yeni (ısıtılmış) bir havuz kurulur ve hazır olunca yer değiştirilir.
+  Python 3.10 imajında max_tasks_per_child olmadığı için geri dönüşüm havuz bazında.
+- Bir worker çökerse (BrokenProcessPool) havuz aynı yolla yenilenir.
+
+Bot bütçeleri (tek bir patolojik strateji tick'i kilitlemesin):
+- Her görev worker içinde STRATEGY_BOT_CPU_SEC CPU ve STRATEGY_BOT_WALL_SEC duvar
+  saati süresiyle çalışır (setitimer + sinyal). Süre dolunca görev
+  BotBudgetExceeded ile kesilir; bu BaseException olduğu için strateji kodundaki
+  `except Exception` onu yutamaz.
+- Worker'ın adres alanı STRATEGY_WORKER_MEMORY_MB ile sınırlıdır (RLIMIT_AS);
+  büyük bir ayırma MemoryError olur ve görev "memory" ihlaliyle döner.
+- Sinyali yutan ya da C kodunda takılan görev için ana process bekçidir: görev
+  STRATEGY_BOT_HARD_SEC'i aşarsa worker'ı öldürülür, havuz yenilenir ve aynı
+  partide kırılan diğer görevler yeni havuzda bir kez tekrar çalıştırılır.
+İhlaller sonuç listesinde BotBudgetExceeded nesnesi olarak döner (karantina:
+trade_engine/process/quarantine.py).
+"""
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger("StrategyEngine")
+
+STRATEGY_POOL_WORKERS = int(os.getenv("STRATEGY_POOL_WORKERS", "0")) or max(1, (os.cpu_count() or 2) // 2)
+STRATEGY_POOL_MAX_TASKS = int(os.getenv("STRATEGY_POOL_MAX_TASKS", "2000"))
+STRATEGY_POOL_MAX_RSS_MB = int(os.getenv("STRATEGY_POOL_MAX_RSS_MB", "1024"))
+# forkserver: worker'lar LISTEN bağlantısı / event loop / thread'ler kopyalanmadan temiz başlar
+STRATEGY_POOL_START_METHOD = os.getenv("STRATEGY_POOL_START_METHOD", "forkserver")
+# Bot başına bütçeler (0 = kapalı)
+STRATEGY_BOT_CPU_SEC = float(os.getenv("STRATEGY_BOT_CPU_SEC", "10"))
+STRATEGY_BOT_WALL_SEC = float(os.getenv("STRATEGY_BOT_WALL_SEC", "20"))
+STRATEGY_BOT_HARD_SEC = float(os.getenv("STRATEGY_BOT_HARD_SEC", "30"))
+STRATEGY_WORKER_MEMORY_MB = int(os.getenv("STRATEGY_WORKER_MEMORY_MB", "4096"))
+
+_HAS_TIMERS = hasattr(signal, "setitimer")
+
+
+class BotBudgetExceeded(BaseException):
+    """Bot görevi zaman/bellek bütçesini aştı (kind: "cpu" | "wall" | "memory" | "hung")."""
+
+    def __init__(self, kind: str, detail: str = ""):
+        super().__init__(kind, detail)
+        self.kind = kind
+        self.detail = detail
+
+    def __str__(self):
+        return f"{self.kind} bütçesi aşıldı ({self.detail})" if self.detail else f"{self.kind} bütçesi aşıldı"
+
+
+# ---------------- worker tarafı ----------------
+_tasks_done = 0
+
+# _take_task_stats() çıktısının alanları; run_many(stats=...) bunları toplar
+TICK_STATS = ("hits", "misses", "compile_sec", "saved_sec", "indicator_hits", "indicator_misses", "indicator_skipped",
+              "db_checkouts", "db_waits", "db_wait_sec")
+_db_seen = (0, 0, 0.0)  # son okumada worker psycopg2 havuzunun (checkouts, waits, wait_sec) değeri
+_started_queue = None   # görev başlangıçları -> ana process bekçisi
+_budget_armed = False
+
+
+def _init_worker(collect_logs=False):
+    """Worker açılışında bir kez: ağır importlar + fork'tan kalma DB engine'ini bırak + bot loglarını biriktir."""
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+    import ta  # noqa: F401
+    import trade_engine.process.run_bot  # noqa: F401  (allowed_globals, control, log, shared_frames)
+    from trade_engine.config import dispose_engine
+    from trade_engine.process import code_cache
+
+    from trade_engine.log.sink import bot_log_sink
+
+    dispose_engine()
+    bot_log_sink.collect(collect_logs)
+    code_cache.prewarm()
+
+
+def _on_budget_signal(signum, frame):
+    if _budget_armed:
+        _disarm_budget()  # ikinci kez tetiklenip except bloğunu bölmesin
+        if signum == getattr(signal, "SIGPROF", None):
+            raise BotBudgetExceeded("cpu", f"{STRATEGY_BOT_CPU_SEC:g} sn CPU")
+        raise BotBudgetExceeded("wall", f"{STRATEGY_BOT_WALL_SEC:g} sn")
+
+
+def _arm_budget():
+    global _budget_armed
+    if not _HAS_TIMERS:
+        return
+    _budget_armed = True
+    if STRATEGY_BOT_CPU_SEC > 0:
+        signal.setitimer(signal.ITIMER_PROF, STRATEGY_BOT_CPU_SEC)
+    if STRATEGY_BOT_WALL_SEC > 0:
+        signal.setitimer(signal.ITIMER_REAL, STRATEGY_BOT_WALL_SEC)
+
+
+def _disarm_budget():
+    global _budget_armed
+    if not _HAS_TIMERS:
+        return
+    _budget_armed = False
+    signal.setitimer(signal.ITIMER_PROF, 0)
+    signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _limit_memory():
+    """Adres alanı tavanı (RLIMIT_AS). Importlardan sonra, mevcut boyutun yeterince üstündeyse uygulanır."""
+    if STRATEGY_WORKER_MEMORY_MB <= 0:
+        return
+    try:
+        import resource
+        limit = STRATEGY_WORKER_MEMORY_MB * 2**20
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        with open("/proc/self/statm") as f:
+            size = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+        if size >= limit * 0.8:
+            print(f"⚠️ Worker {os.getpid()} adres alanı zaten {size / 2**20:.0f} MB; "
+                  f"STRATEGY_WORKER_MEMORY_MB={STRATEGY_WORKER_MEMORY_MB} uygulanmadı.")
+            return
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ImportError, OSError, ValueError) as e:
+        print(f"⚠️ Worker {os.getpid()} bellek tavanı ayarlanamadı: {e}")
+
+
+def _bootstrap(started_queue, initializer, initargs):
+    """Her worker'ın asıl initializer'ı: bütçe sinyalleri + bellek tavanı + havuzun kendi initializer'ı."""
+    global _started_queue
+    _started_queue = started_queue
+    if initializer is not None:
+        initializer(*initargs)
+    if _HAS_TIMERS:
+        signal.signal(signal.SIGPROF, _on_budget_signal)
+        signal.signal(signal.SIGALRM, _on_budget_signal)
+    _limit_memory()
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # tepe değer (Linux'ta KB)
+
+
+def _take_task_stats() -> tuple:
+    """Worker'daki kod önbelleği, indikatör paylaşımı ve DB havuzu sayaçları (TICK_STATS sırasıyla)."""
+    global _db_seen
+    from trade_engine.config import pg_pool_stats
+    from trade_engine.process import code_cache, indicator_memo
+
+    db = pg_pool_stats()
+    now = (db.get("checkouts", 0), db.get("waits", 0), db.get("wait_sec", 0.0))
+    if now[0] < _db_seen[0]:
+        _db_seen = (0, 0, 0.0)  # havuz yeniden kuruldu
+    delta = tuple(n - s for n, s in zip(now, _db_seen))
+    _db_seen = now
+    return code_cache.take_stats() + indicator_memo.take_stats() + delta
+
+
+def _run_task(token, fn, args):
+    """
+    Görevi bütçeyle çalıştırır; sonuçla birlikte (pid, görev sayısı, RSS, tick sayaçları,
+    bot_logs kayıtları) döner. Bütçe aşımında sonuç BotBudgetExceeded nesnesidir.
+    """
+    from trade_engine.log.sink import bot_log_sink
+
+    global _tasks_done
+    if _started_queue is not None:
+        _started_queue.put_nowait((token, os.getpid()))
+    try:
+        try:
+            _arm_budget()
+            try:
+                result = fn(*args)
+            finally:
+                _disarm_budget()
+        except BotBudgetExceeded as e:
+            result = e
+        except MemoryError:
+            result = BotBudgetExceeded("memory", f"{STRATEGY_WORKER_MEMORY_MB} MB adres alanı")
+        return result, os.getpid(), _tasks_done + 1, _rss_bytes(), _take_task_stats(), bot_log_sink.take()
+    finally:
+        _tasks_done += 1
+
+
+def _warm():
+    time.sleep(0.05)  # görevler üst üste binsin ki her worker ayrı açılsın
+    return os.getpid()
+
+
+# ---------------- ana process tarafı ----------------
+class StrategyWorkerPool:
+    def __init__(self, max_workers: int = STRATEGY_POOL_WORKERS,
+                 max_tasks_per_worker: int = STRATEGY_POOL_MAX_TASKS,
+                 max_rss_mb: int = STRATEGY_POOL_MAX_RSS_MB,
+                 start_method: str = STRATEGY_POOL_START_METHOD, initializer=_init_worker,
+                 hard_sec: float = STRATEGY_BOT_HARD_SEC):
+        self.max_workers = max_workers
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.start_method = start_method
+        self.initializer = initializer
+        self.hard_sec = hard_sec
+
+        self._executor = None
+        self._starting = None   # ilk açılış (asyncio.Task)
+        self._rotating = None   # arka plan yenileme (asyncio.Task)
+        self.generation = 0
+
+        # Sayaçlar
+        self.tasks = 0
+        self.recycles = 0
+        self.broken = 0
+        self.worker_stats = {}  # pid -> (görev sayısı, rss)
+        self.violations = {"cpu": 0, "wall": 0, "memory": 0, "hung": 0}
+        self.killed = 0
+        self.retried = 0
+
+        # Bekçi: worker'lar görev başlangıcını bildirir
+        self._started = None    # multiprocessing.Queue
+        self._tokens = itertools.count()
+        self._running = {}      # token -> (pid, başlangıç monotonic)
+
+    def context(self):
+        try:
+            return multiprocessing.get_context(self.start_method)
+        except ValueError:
+            return multiprocessing.get_context()  # ör. Windows'ta forkserver yok
+
+    def _initargs(self) -> tuple:
+        if self.initializer is not _init_worker:
+            return ()
+        from trade_engine.log.sink import bot_log_sink
+        return (bot_log_sink.active,)  # sink açık değilse worker senkron yazar
+
+    async def _spawn(self) -> ProcessPoolExecutor:
+        t0 = time.perf_counter()
+        if self._started is None and self.hard_sec > 0:
+            self._started = self.context().Queue()
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=self.context(),
+            initializer=_bootstrap,
+            initargs=(self._started, self.initializer, self._initargs()),
+        )
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*(loop.run_in_executor(executor, _warm) for _ in range(self.max_workers)))
+        logger.info(f"🔥 Strateji havuzu hazır: {len(set(pids))} worker, "
+                    f"{time.perf_counter() - t0:.2f} sn ({self.start_method})")
+        return executor
+
+    async def start(self):
+        if self._executor is not None:
+            return
+        if self._starting is None:
+            self._starting = asyncio.create_task(self._spawn())
+        try:
+            executor = await self._starting
+        except Exception:
+            self._starting = None  # bir sonraki çağrı yeniden denesin
+            raise
+        if self._executor is None:
+            self._executor = executor
+            self.generation += 1
+
+    def _request_rotation(self, reason: str):
+        if self._rotating is None or self._rotating.done():
+            logger.info(f"♻️ Strateji havuzu yenileniyor: {reason}")
+            self._rotating = asyncio.create_task(self._rotate())
+
+    async def _rotate(self):
+        try:
+            new = await self._spawn()
+        except Exception as e:
+            logger.error(f"❌ Strateji havuzu yenilenemedi: {e}")
+            return
+        old, self._executor = self._executor, new
+        self.generation += 1
+        self.recycles += 1
+        self.worker_stats.clear()
+        if old is not None:
+            # Eski havuzdaki görevler biter, sonra worker'lar kapanır (bekleme yok)
+            old.shutdown(wait=False)
+
+    def _account(self, executor, pid: int, done: int, rss: int):
+        self.tasks += 1
+        self.worker_stats[pid] = (done, rss)
+        if executor is self._executor:
+            if done >= self.max_tasks_per_worker:
+                self._request_rotation(f"worker {pid} {done} görev çalıştırdı")
+            elif rss >= self.max_rss:
+                self._request_rotation(f"worker {pid} RSS {rss / 2**20:.0f} MB")
+
+    # ---------------- bekçi ----------------
+    def _drain_started(self):
+        try:
+            while True:
+                token, pid = self._started.get_nowait()
+                self._running[token] = (pid, time.monotonic())
+        except (queue.Empty, OSError, EOFError):
+            pass
+
+    def _kill_hung(self, tokens, hung: dict):
+        """Bekleyen görevlerden STRATEGY_BOT_HARD_SEC'i aşanların worker'ını öldürür."""
+        self._drain_started()
+        now = time.monotonic()
+        for token in tokens:
+            entry = self._running.get(token)
+            if entry is None or token in hung or now - entry[1] <= self.hard_sec:
+                continue
+            pid = entry[0]
+            hung[token] = pid
+            self.killed += 1
+            logger.error(f"⛔ Görev {self.hard_sec:g} sn'yi aştı, worker {pid} sonlandırılıyor.")
+            try:
+                os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+            except (ProcessLookupError, PermissionError):
+                pass
+
+    async def _supervise(self, futures: list, tokens: list) -> dict:
+        """Görevler bitene kadar bekler; asılı kalanların worker'ını öldürür. Dönüş: {token: pid}."""
+        hung = {}
+        pending = set(futures)
+        poll = min(1.0, self.hard_sec) if (self.hard_sec > 0 and self._started is not None) else None
+        token_of = dict(zip(futures, tokens))
+        while pending:
+            _, pending = await asyncio.wait(pending, timeout=poll)
+            if pending and poll is not None:
+                self._kill_hung([token_of[f] for f in pending], hung)
+        for token in tokens:
+            self._running.pop(token, None)
+        return hung
+
+    @staticmethod
+    def _submit(loop, executor, token, fn, args):
+        try:
+            return loop.run_in_executor(executor, _run_task, token, fn, args)
+        except BrokenProcessPool as e:
+            # Havuz zaten kırık (yenileme sürüyor/başarısız): sonuç yerinde hata dönsün
+            fut = loop.create_future()
+            fut.set_exception(e)
+            return fut
+
+    async def run_many(self, calls, stats: dict | None = None, retry: bool = True):
+        """
+        calls: [(fn, args), ...] — fn ve argümanlar picklable olmalı.
+        Sonuçları aynı sırayla döner; başarısız çağrının yerinde exception nesnesi olur,
+        bütçeyi aşan çağrının yerinde BotBudgetExceeded olur.
+        stats verilirse worker sayaçları (TICK_STATS) içine toplanır (bkz. new_tick_stats).
+        Worker'ların görev boyunca biriktirdiği bot_logs kayıtları burada yazıcı kuyruğuna atılır.
+        retry: worker öldürüldüğü/çöktüğü için kırılan masum görevler yeni havuzda bir kez tekrar çalışır.
+        """
+        from trade_engine.log.sink import bot_log_sink
+
+        await self.start()
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        tokens = [next(self._tokens) for _ in calls]
+        futures = [self._submit(loop, executor, token, fn, args) for token, (fn, args) in zip(tokens, calls)]
+        hung = await self._supervise(futures, tokens)
+
+        results = []
+        broken = []
+        for i, (token, fut) in enumerate(zip(tokens, futures)):
+            outcome = fut.exception() or fut.result()
+            if token in hung:
+                self.violations["hung"] += 1
+                results.append(BotBudgetExceeded("hung", f"{self.hard_sec:g} sn, worker {hung[token]} sonlandırıldı"))
+                continue
+            if isinstance(outcome, BaseException):
+                if isinstance(outcome, BrokenProcessPool):
+                    self.broken += 1
+                    broken.append(i)
+                results.append(outcome)
+                continue
+            result, pid, done, rss, counters, logs = outcome
+            self._account(executor, pid, done, rss)
+            if logs:
+                bot_log_sink.submit_many(logs)
+            if isinstance(result, BotBudgetExceeded):
+                self.violations[result.kind] = self.violations.get(result.kind, 0) + 1
+            if stats is not None:
+                for name, value in zip(TICK_STATS, counters):
+                    stats[name] += value
+            results.append(result)
+
+        if (broken or hung) and executor is self._executor:
+            self._request_rotation("worker sonlandırıldı" if hung else "worker çöktü")
+        if broken and retry:
+            # Yeni havuz hazır olsun, sonra kırılan görevler bir kez daha
+            if self._rotating is not None:
+                await asyncio.shield(self._rotating)
+            self.retried += len(broken)
+            again = await self.run_many([calls[i] for i in broken], stats=stats, retry=False)
+            for i, result in zip(broken, again):
+                results[i] = result
+        return results
+
+    async def run(self, fn, *args):
+        (result,) = await self.run_many([(fn, args)])
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    @staticmethod
+    def new_tick_stats() -> dict:
+        return dict.fromkeys(TICK_STATS, 0)
+
+    def shutdown(self):
+        for task in (self._starting, self._rotating):
+            if task is not None and not task.done():
+                task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._starting = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "generation": self.generation,
+            "tasks": self.tasks,
+            "recycles": self.recycles,
+            "broken": self.broken,
+            "violations": dict(self.violations),
+            "killed": self.killed,
+            "retried": self.retried,
+            "max_rss_mb": round(max((r for _, r in self.worker_stats.values()), default=0) / 2**20, 1),
+        }
+
+
+strategy_pool = StrategyWorkerPool()
@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+
+# Proje kök dizinini path'e ekle
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from trade_engine.config import get_db_connection, psycopg2_connection
+from trade_engine.data.bot_context_cache import (
+    BotContextCache, ensure_bot_context_triggers, BOT_CONTEXT_CHANNEL,
+)
+
+# Veritabanına bağlanır. minute_calculation'ın 1m'de yaptığı yeniden hesaplamayı
+# (positions_calculate + bot_updates) bir kez daha çalıştırır; bu hesaplama idempotenttir.
+
+
+def _drain(listen_conn, wait: float = 0.5) -> list:
+    time.sleep(wait)
+    listen_conn.poll()
+    notifies = [n.payload for n in listen_conn.notifies]
+    listen_conn.notifies.clear()
+    return notifies
+
+
+def test_cache_survives_minute_calculation():
+    ensure_bot_context_triggers()
+
+    with psycopg2_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id FROM public.bots WHERE active AND NOT COALESCE(deleted, false) LIMIT 50;")
+            bot_ids = [r[0] for r in cur.fetchall()]
+        conn.rollback()
+    if not bot_ids:
+        print("⚠ Aktif bot yok, test atlandı.")
+        return
+
+    listen_conn = get_db_connection()
+    listen_conn.autocommit = True
+    try:
+        with listen_conn.cursor() as cur:
+            cur.execute(f"LISTEN {BOT_CONTEXT_CHANNEL};")
+
+        cache = BotContextCache()
+        cache.get_many(bot_ids)
+        assert set(cache.contexts) == set(bot_ids), cache.stats()
+
+        # Dakikalık hesaplama: sadece current_usd_value / fullness / percentage / unrealized_pnl yazar
+        with psycopg2_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT positions_calculate();")
+                cur.execute("SELECT bot_updates();")
+                # Değeri aynı kalan ayar kolonu güncellemesi de bildirim üretmemeli
+                cur.execute("UPDATE public.bots SET api_id = api_id WHERE id = ANY(%s);", (bot_ids,))
+            conn.commit()
+
+        notifies = _drain(listen_conn)
+        for payload in notifies:
+            cache.handle(payload)
+        assert not notifies, f"dakikalık hesaplama bildirim üretti: {notifies[:10]}"
+
+        misses = cache.misses
+        contexts = cache.get_many(bot_ids)
+        assert cache.misses == misses, "önbellek dakikalık hesaplamadan sonra boşalmamalı"
+        assert set(contexts) == set(bot_ids)
+        print(f"✅ {len(bot_ids)} bot: dakikalık hesaplama sonrası önbellek korundu ({cache.stats()})")
+    finally:
+        listen_conn.close()
+
+
+def main():
+    print("🚀 Bot context önbelleği testi...")
+    test_cache_survives_minute_calculation()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import os
+import sys
+
+# Proje kök dizinini path'e ekle
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from trade_engine.log import sink as sink_module
+from trade_engine.log.sink import BotLogSink
+
+
+def _record(bot_id: int, level: str = "warning", message: str = "m") -> tuple:
+    return (1, bot_id, None, "1m", level, message, None)
+
+
+def test_worker_collects_records_for_task_result():
+    """Worker kuyruğa yazmaz; kayıtlar görev sonucuyla dönmek üzere biriktirilir."""
+    sink = BotLogSink()
+    sink.collect(True)
+    assert sink.active
+    for i in range(3):
+        assert sink.submit(_record(i))
+    assert [r[1] for r in sink.take()] == [0, 1, 2]
+    assert sink.take() == []
+
+    sink.collect(False)  # ana process'te sink yok: log.py senkron yazar
+    assert not sink.active
+
+
+def test_worker_buffer_is_capped_per_task():
+    sink = BotLogSink()
+    sink.collect(True)
+    limit = sink_module.BOT_LOG_TASK_MAX
+    for i in range(limit + 5):
+        sink.submit(_record(i))
+    assert len(sink.take()) == limit
+    assert sink.dropped["warning"] == 5
+    assert sink.submit(_record(0))  # sonraki görev yeniden yazabilir
+
+
+def test_submit_many_does_not_block_when_full():
+    """Ana process event loop'ta çağırır: kuyruk doluysa beklemeden düşürür."""
+    sink = BotLogSink()
+    sink.queue = sink_module.queue.Queue(maxsize=2)
+    sink.submit_many([_record(i, "error") for i in range(4)])
+    assert sink.queue.qsize() == 2
+    assert sink.dropped["error"] == 2
+
+
+def main():
+    print("🚀 bot_logs sink testleri...")
+    test_worker_collects_records_for_task_result()
+    test_worker_buffer_is_capped_per_task()
+    test_submit_many_does_not_block_when_full()
+    print("✅ Tamam")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+import sys
+
+# Proje kök dizinini path'e ekle
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from trade_engine.config import Psycopg2Pool
+from trade_engine.process.worker_pool import BotBudgetExceeded
+
+
+class FakeConn:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_budget_signal_during_connect_releases_slot():
+    """Bağlantı açılırken bütçe sinyali (BaseException) gelirse ayrılan yer geri verilmeli."""
+    pool = Psycopg2Pool(2)
+
+    def interrupted_connect():
+        raise BotBudgetExceeded("wall", "test")
+
+    pool._connect = interrupted_connect
+    for _ in range(3):  # havuz boyutundan fazla: sızıntı olsaydı üçüncüde beklerdi
+        try:
+            pool.getconn()
+        except BotBudgetExceeded:
+            pass
+        assert pool._size == 0, pool.stats()
+
+    pool._connect = FakeConn
+    conn = pool.getconn()
+    assert pool._size == 1
+    pool._discard(conn)
+
+
+def test_keyboard_interrupt_during_ping_releases_slot():
+    """Boşta bağlantı yoklanırken kesilirse de yer geri verilmeli."""
+    pool = Psycopg2Pool(1)
+    pool._size = 1
+    pool._idle.append((FakeConn(), -1e9))  # çok eski: SELECT 1 ile yoklanır
+
+    def interrupted_ping(conn):
+        raise KeyboardInterrupt
+
+    pool._alive = interrupted_ping
+    try:
+        pool.getconn()
+    except KeyboardInterrupt:
+        pass
+    assert pool._size == 0, pool.stats()
+
+
+def main():
+    print("🚀 Psycopg2Pool testleri...")
+    test_budget_signal_during_connect_releases_slot()
+    test_keyboard_interrupt_during_ping_releases_slot()
+    print("✅ Tamam")
+
+
+if __name__ == "__main__":
+    main()